@@ -1,18 +1,59 @@
 from flask import Flask
 from flask_cors import CORS
+from .cli import schema_cli, tenants_cli
 from .config import Config
 from .extensions import db, migrate
+from .routes.admin import admin_blueprint
 from .routes.api import api_blueprint
+from .routes.metrics import metrics_blueprint
+from .schemas.registry import schema_registry
+from .services.http_pool import http_clients
+from .services.job_queue import job_queue
+from .services.placement import placement_router
+from .services.tenant_index import tenant_index
+from .services.warm_pool import warm_pool
+from .utils.log import log_pipeline
+from .utils.profiling import profiler
 
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # Logging first so everything below can use it
+    log_pipeline.init_app(app)
+
     # Initialize extensions
     CORS(app)
+    db.init_app(app)
+    migrate.init_app(app, db)
+    http_clients.init_app(app)
+    job_queue.init_app(app)
+    profiler.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        # Jobs a previous process was running when it died would never finish
+        job_queue.fail_abandoned()
+
+    # Before anything that places or looks up tenants
+    placement_router.init_app(app)
+
+    # Compile the schema templates before the first onboarding needs them
+    schema_registry.preload()
+    if app.config.get('TENANT_INDEX_WARMUP'):
+        tenant_index.start_warmup()
+    # Starts the refill thread when WARM_POOL_SIZE > 0
+    warm_pool.init_app(app)
 
     # Register blueprints
     app.register_blueprint(api_blueprint, url_prefix='/api/v1')
+    app.register_blueprint(admin_blueprint, url_prefix='/api/v1/admin')
+    if app.config.get('METRICS_ENABLED'):
+        # Unprefixed, where Prometheus scrapers look by default
+        app.register_blueprint(metrics_blueprint)
+
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(tenants_cli)
 
     return app
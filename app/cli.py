@@ -0,0 +1,127 @@
+import json
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from .models import SchemaMigration, SchemaMigrationTenant
+from .services.orphan_sweep import OrphanSweeper
+from .services.placement import placement_router
+from .services.rebalance import Rebalancer
+from .services.schema_migration import migrate_schema
+
+schema_cli = AppGroup('schema', help='Manage the schema of existing tenants.')
+tenants_cli = AppGroup('tenants', help='Maintain provisioned tenants.')
+
+
+@schema_cli.command('migrate')
+@click.option('--to', 'version', help='Target schema version (default: SCHEMA_VERSION).')
+@click.option('--tenant', 'tenants', multiple=True, help='Only migrate these tenant_ids (repeatable).')
+@click.option('--dry-run', is_flag=True, help='Report the changes without applying them.')
+@click.option('--prune-fields', is_flag=True, help='Remove fields the template no longer has.')
+@click.option('--concurrency', type=int, default=None, help='Tenants migrated at once (default: MIGRATION_CONCURRENCY).')
+@click.option('--resume', help='Continue an interrupted migration by its ID.')
+@click.option('--report', type=click.File('w'), help='Write the changed and failed tenants as JSON.')
+def migrate(version, tenants, dry_run, prune_fields, concurrency, resume, report):
+    """Bring existing tenants' collections to a schema version, patching only what differs."""
+    def progress(result):
+        if result["status"] != SchemaMigrationTenant.UNCHANGED:
+            click.echo(json.dumps(result))
+
+    try:
+        migration = migrate_schema(version, tenants or None, dry_run=dry_run, prune=prune_fields,
+                                   concurrency=concurrency, resume=resume, on_result=progress)
+    except (ValueError, OSError) as e:
+        raise click.ClickException(str(e))
+
+    summary = migration.to_dict()
+    click.echo(json.dumps({"summary": summary}), err=True)
+    if report:
+        rows = (migration.tenants
+                .filter(SchemaMigrationTenant.status != SchemaMigrationTenant.UNCHANGED)
+                .order_by(SchemaMigrationTenant.tenant_id))
+        json.dump({"migration": summary, "tenants": [row.to_dict() for row in rows]}, report, indent=2)
+    if summary["tenants"].get(SchemaMigrationTenant.FAILED):
+        raise SystemExit(1)
+
+
+@schema_cli.command('migrations')
+@click.option('--limit', type=int, default=20)
+def list_migrations(limit):
+    """List recent schema migrations."""
+    for migration in SchemaMigration.query.order_by(SchemaMigration.created_at.desc()).limit(limit):
+        click.echo(json.dumps(migration.to_dict()))
+
+
+@tenants_cli.command('sweep-orphans')
+@click.option('--dry-run', is_flag=True, help='List the orphaned tenants without deleting them.')
+@click.option('--concurrency', type=int, default=None, help='Tenants deleted at once (default: BATCH_CONCURRENCY).')
+@click.option('--min-age', type=int, default=None,
+              help='Seconds a failed provisioning must be idle before it is swept (default: PROVISIONING_RUN_STALE).')
+@click.option('--tenant', 'tenants', multiple=True,
+              help='Delete these tenant_ids instead of searching for orphans (repeatable).')
+def sweep_orphans(dry_run, concurrency, min_age, tenants):
+    """Deprovision tenants left behind by failed provisionings, one NDJSON line per tenant."""
+    sweeper = OrphanSweeper(concurrency, min_age, current_app._get_current_object())
+    if tenants:
+        orphans = {tenant_id: "requested" for tenant_id in tenants}
+    else:
+        try:
+            orphans = sweeper.find_orphans()
+        except Exception as e:
+            raise click.ClickException(f"Could not search for orphans: {e}")
+
+    if dry_run:
+        for tenant_id, reason in sorted(orphans.items()):
+            click.echo(json.dumps({"tenant_id": tenant_id, "reason": reason}))
+        click.echo(json.dumps({"summary": {"orphans": len(orphans)}}), err=True)
+        return
+
+    started = time.perf_counter()
+    counts = {}
+    for result in sweeper.sweep(orphans):
+        result["reason"] = orphans[result["tenant_id"]]
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        click.echo(json.dumps(result))
+    click.echo(json.dumps({"summary": {
+        "orphans": len(orphans), **counts,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1)}}), err=True)
+    if counts.get("incomplete"):
+        raise SystemExit(1)
+
+
+@tenants_cli.command('sync-placements')
+def sync_placements():
+    """Record the backend of tenants that have none, e.g. after configuring POCKETBASE_URLS."""
+    try:
+        summary = placement_router.sync()
+    except Exception as e:
+        raise click.ClickException(f"Could not list the tenants: {e}")
+    click.echo(json.dumps({"summary": summary}))
+    if summary["duplicates"]:
+        raise SystemExit(1)
+
+
+@tenants_cli.command('rebalance')
+@click.option('--dry-run', is_flag=True, help='List the moves without making them.')
+@click.option('--limit', type=int, default=None, help='Move at most this many tenants.')
+@click.option('--concurrency', type=int, default=None, help='Tenants moved at once (default: BATCH_CONCURRENCY).')
+def rebalance(dry_run, limit, concurrency):
+    """Move tenants to the backend PLACEMENT_POLICY now gives them, one NDJSON line per tenant."""
+    rebalancer = Rebalancer(concurrency, current_app._get_current_object())
+    moves = rebalancer.plan(limit)
+    if dry_run:
+        for tenant_id, source, target in moves:
+            click.echo(json.dumps({"tenant_id": tenant_id, "from": source, "to": target}))
+        click.echo(json.dumps({"summary": {"moves": len(moves)}}), err=True)
+        return
+
+    started = time.perf_counter()
+    counts = {}
+    for result in rebalancer.run(moves):
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        click.echo(json.dumps(result))
+    click.echo(json.dumps({"summary": {
+        "moves": len(moves), **counts,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1)}}), err=True)
+    if counts.get("failed"):
+        raise SystemExit(1)
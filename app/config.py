@@ -5,6 +5,152 @@ load_dotenv('.env.example')
 
 
 class Config:
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL') or 'sqlite:///tenant_registration.db'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
     POCKETBASE_URL = os.getenv('POCKETBASE_URL', 'http://localhost:8090')
     POCKETBASE_ADMIN_EMAIL = os.getenv('POCKETBASE_ADMIN_EMAIL')
     POCKETBASE_ADMIN_PASSWORD = os.getenv('POCKETBASE_ADMIN_PASSWORD')
+
+    # Comma-separated PocketBase backends that new tenants are spread over (default:
+    # POCKETBASE_URL alone), all with the admin credentials above. Each tenant's
+    # backend is recorded; tenants created before sharding, which have no record, are
+    # on POCKETBASE_URL. PLACEMENT_POLICY is 'hash' (consistent hashing of the
+    # tenant_id over PLACEMENT_VNODES points per backend) or 'least_loaded' (the
+    # backend holding the fewest tenants). Lookups are cached for PLACEMENT_CACHE_TTL
+    # seconds, which bounds how long other workers route to a tenant's old backend
+    # after `flask tenants rebalance` moved it.
+    POCKETBASE_URLS = os.getenv('POCKETBASE_URLS') or ''
+    PLACEMENT_POLICY = os.getenv('PLACEMENT_POLICY') or 'hash'
+    PLACEMENT_VNODES = int(os.getenv('PLACEMENT_VNODES') or 128)
+    PLACEMENT_CACHE_TTL = float(os.getenv('PLACEMENT_CACHE_TTL') or 60)
+
+    # Max concurrent PocketBase admin calls while provisioning one tenant.
+    # 1 keeps the original serial behaviour.
+    PROVISIONING_CONCURRENCY = int(os.getenv('PROVISIONING_CONCURRENCY') or 8)
+
+    # 'import' creates a tenant's collections with one PUT /api/collections/import and
+    # falls back to 'collections' (one call per collection) if the import is rejected
+    PROVISIONING_STRATEGY = os.getenv('PROVISIONING_STRATEGY') or 'import'
+
+    # Journal completed provisioning steps in the database so a retry with the same
+    # Idempotency-Key resumes instead of starting over. Runs that stopped updating for
+    # PROVISIONING_RUN_STALE seconds are considered abandoned and can be resumed too.
+    # PROVISIONING_RESUME_BY_NAME also lets a request without a key resume a failed run
+    # of the same tenant name, if that run was active in the last PROVISIONING_RESUME_WINDOW
+    # seconds; names are not unique, so an older run may be an unrelated signup.
+    PROVISIONING_JOURNAL = (os.getenv('PROVISIONING_JOURNAL') or 'true').lower() in ('1', 'true', 'yes')
+    PROVISIONING_RESUME_BY_NAME = (os.getenv('PROVISIONING_RESUME_BY_NAME') or 'false').lower() in ('1', 'true', 'yes')
+    PROVISIONING_RESUME_WINDOW = int(os.getenv('PROVISIONING_RESUME_WINDOW') or 3600)
+    PROVISIONING_RUN_STALE = int(os.getenv('PROVISIONING_RUN_STALE') or 600)
+
+    # Directory under app/schema-collection/ holding the pb_schema.json to provision
+    SCHEMA_VERSION = os.getenv('SCHEMA_VERSION') or 'v1'
+
+    # Seconds before the admin token's `exp` at which it is refreshed in the background
+    TOKEN_REFRESH_MARGIN = int(os.getenv('TOKEN_REFRESH_MARGIN') or 300)
+
+    # Shared HTTP connection pool towards PocketBase
+    HTTP_POOL_MAX_CONNECTIONS = int(os.getenv('HTTP_POOL_MAX_CONNECTIONS') or 100)
+    HTTP_POOL_MAX_KEEPALIVE = int(os.getenv('HTTP_POOL_MAX_KEEPALIVE') or 20)
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY') or 30)
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT') or 5)
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT') or 30)
+    HTTP2 = os.getenv('HTTP2', '').lower() in ('1', 'true', 'yes')
+    HTTP_VERIFY_SSL = os.getenv('HTTP_VERIFY_SSL', '').lower() in ('1', 'true', 'yes')
+
+    # Admission control in front of each PocketBase instance: at most
+    # ADMISSION_MAX_IN_FLIGHT concurrent calls and ADMISSION_RATE calls per second
+    # (bursts of ADMISSION_BURST; 0 disables either limit). Calls over the limits
+    # wait in a FIFO queue of at most ADMISSION_MAX_QUEUE, for up to
+    # ADMISSION_QUEUE_TIMEOUT seconds. Point ADMISSION_SHARED_PATH at a SQLite file
+    # to enforce the limits across every worker process on the host.
+    ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT') or 32)
+    ADMISSION_RATE = float(os.getenv('ADMISSION_RATE') or 0)
+    ADMISSION_BURST = float(os.getenv('ADMISSION_BURST') or 0)
+    ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE') or 1000)
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT') or 10)
+    ADMISSION_SHARED_PATH = os.getenv('ADMISSION_SHARED_PATH') or None
+
+    # Per-operation timeouts (seconds) for PocketBase calls
+    POCKETBASE_TIMEOUT_READ = float(os.getenv('POCKETBASE_TIMEOUT_READ') or 10)
+    POCKETBASE_TIMEOUT_WRITE = float(os.getenv('POCKETBASE_TIMEOUT_WRITE') or 30)
+    POCKETBASE_TIMEOUT_IMPORT = float(os.getenv('POCKETBASE_TIMEOUT_IMPORT') or 120)
+    # Attempts per call (1 disables retries) and the jittered exponential backoff between them
+    POCKETBASE_RETRY_ATTEMPTS = int(os.getenv('POCKETBASE_RETRY_ATTEMPTS') or 3)
+    POCKETBASE_RETRY_BASE_DELAY = float(os.getenv('POCKETBASE_RETRY_BASE_DELAY') or 0.2)
+    POCKETBASE_RETRY_MAX_DELAY = float(os.getenv('POCKETBASE_RETRY_MAX_DELAY') or 5)
+    # Consecutive failures that open the circuit, and seconds before a probe is let through
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD') or 5)
+    CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT') or 30)
+
+    # Bloom-filter index of existing tenant_ids, warmed from vms_tenants at startup
+    TENANT_INDEX_WARMUP = (os.getenv('TENANT_INDEX_WARMUP') or 'true').lower() in ('1', 'true', 'yes')
+    TENANT_INDEX_CAPACITY = int(os.getenv('TENANT_INDEX_CAPACITY') or 500000)
+    TENANT_INDEX_ERROR_RATE = float(os.getenv('TENANT_INDEX_ERROR_RATE') or 0.001)
+    TENANT_INDEX_PAGE_SIZE = int(os.getenv('TENANT_INDEX_PAGE_SIZE') or 500)
+
+    # 'optimistic' inserts the tenant record directly and relies on a unique index on
+    # vms_tenants.tenant_id; 'check' looks the ID up first
+    TENANT_ID_MODE = os.getenv('TENANT_ID_MODE') or 'optimistic'
+    # 'random' (8 chars) or 'sortable' (time-ordered, 12 chars)
+    TENANT_ID_STRATEGY = os.getenv('TENANT_ID_STRATEGY') or 'random'
+
+    # Background provisioning jobs (POST /tenants without ?sync=true)
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS') or 4)
+    JOB_QUEUE_MAX = int(os.getenv('JOB_QUEUE_MAX') or 100)
+    JOB_PROGRESS_INTERVAL = float(os.getenv('JOB_PROGRESS_INTERVAL') or 0.5)
+
+    # Duplicate onboardings (same tenant name, ignoring case and spacing, and same
+    # Idempotency-Key if any) that arrive while the first is running share its job
+    # or result, as do those arriving up to ONBOARDING_COALESCE_WINDOW seconds after
+    # it succeeded. Per process; the provisioning journal covers the rest.
+    ONBOARDING_COALESCE = (os.getenv('ONBOARDING_COALESCE') or 'true').lower() in ('1', 'true', 'yes')
+    ONBOARDING_COALESCE_WINDOW = float(os.getenv('ONBOARDING_COALESCE_WINDOW') or 10)
+
+    # POST /tenants/batch and `create_collection.py --input`
+    BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY') or 8)
+    BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE') or 1000)
+
+    # `flask schema migrate`: tenants migrated at once, and results per checkpoint write
+    MIGRATION_CONCURRENCY = int(os.getenv('MIGRATION_CONCURRENCY') or 16)
+    MIGRATION_CHECKPOINT_EVERY = int(os.getenv('MIGRATION_CHECKPOINT_EVERY') or 50)
+
+    # Spare, fully provisioned collection sets that onboarding claims instead of
+    # provisioning (0 disables the pool). A background thread refills it with
+    # WARM_POOL_REFILL_CONCURRENCY builds at a time, at least every
+    # WARM_POOL_REFILL_INTERVAL seconds. Spares of another schema version, or older
+    # than WARM_POOL_MAX_AGE seconds (0: no limit), are deleted.
+    WARM_POOL_SIZE = int(os.getenv('WARM_POOL_SIZE') or 0)
+    WARM_POOL_REFILL_CONCURRENCY = int(os.getenv('WARM_POOL_REFILL_CONCURRENCY') or 2)
+    WARM_POOL_REFILL_INTERVAL = float(os.getenv('WARM_POOL_REFILL_INTERVAL') or 30)
+    WARM_POOL_MAX_AGE = int(os.getenv('WARM_POOL_MAX_AGE') or 0)
+
+    # Read-through cache in front of GET /tenants/<tenant_id>
+    TENANT_CACHE_SIZE = int(os.getenv('TENANT_CACHE_SIZE') or 1024)
+    TENANT_CACHE_TTL = float(os.getenv('TENANT_CACHE_TTL') or 30)
+
+    # Structured logs of the `app` package, written to stdout by a background thread.
+    # LOG_FORMAT is 'json' or 'text'. LOG_SAMPLE_* keep that fraction of the chatty
+    # per-collection records at the level; warnings and errors are never sampled.
+    LOG_LEVEL = os.getenv('LOG_LEVEL') or 'INFO'
+    LOG_FORMAT = os.getenv('LOG_FORMAT') or 'json'
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE') or 10000)
+    LOG_SAMPLE_DEBUG = float(os.getenv('LOG_SAMPLE_DEBUG') or 1.0)
+    LOG_SAMPLE_INFO = float(os.getenv('LOG_SAMPLE_INFO') or 1.0)
+
+    # Opt-in cProfile of /api/v1/tenants requests: those sent with an X-Profile-Token
+    # header matching PROFILING_TOKEN, plus a PROFILING_SAMPLE_RATE share of the rest.
+    # The newest PROFILING_KEEP .prof files are kept in PROFILING_DIR.
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PROFILING_TOKEN = os.getenv('PROFILING_TOKEN') or None
+    PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE') or 0)
+    PROFILING_DIR = os.getenv('PROFILING_DIR') or 'profiles'
+    PROFILING_KEEP = int(os.getenv('PROFILING_KEEP') or 50)
+
+    # Prometheus text-format metrics at GET /metrics (per process)
+    METRICS_ENABLED = (os.getenv('METRICS_ENABLED') or 'true').lower() in ('1', 'true', 'yes')
+
+    # Provisioning progress streams (?stream=sse|ndjson, GET /tenants/<id>/events)
+    PROGRESS_RETENTION = float(os.getenv('PROGRESS_RETENTION') or 300)
+    PROGRESS_HEARTBEAT = float(os.getenv('PROGRESS_HEARTBEAT') or 15)
+    PROGRESS_MAX_EVENTS = int(os.getenv('PROGRESS_MAX_EVENTS') or 5000)
@@ -0,0 +1,5 @@
+from .provisioning_job import ProvisioningJob
+from .provisioning_run import ProvisioningRun, ProvisioningStep
+from .schema_migration import SchemaMigration, SchemaMigrationTenant
+from .warm_spare import WarmSpare
+from .tenant_placement import TenantPlacement
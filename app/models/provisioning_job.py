@@ -0,0 +1,54 @@
+import uuid
+from datetime import datetime, timezone
+from ..extensions import db
+
+
+def utcnow():
+    # Naive UTC: SQLite drops tzinfo, so keep every value comparable
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class ProvisioningJob(db.Model):
+    """One background run of TenantService.create_tenant_configuration"""
+    __tablename__ = 'provisioning_jobs'
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    tenant_name = db.Column(db.String(255), nullable=False)
+    tenant_id = db.Column(db.String(32), index=True)
+    status = db.Column(db.String(16), nullable=False, default=QUEUED, index=True)
+    collections_total = db.Column(db.Integer)
+    collections_done = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # Bumped by every status and progress write; a live worker keeps it recent
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+    def to_dict(self):
+        def seconds(start, end):
+            if start is None or end is None:
+                return None
+            return round((end - start).total_seconds(), 3)
+
+        return {
+            "job_id": self.id,
+            "tenant_name": self.tenant_name,
+            "tenant_id": self.tenant_id,
+            "status": self.status,
+            "collections_total": self.collections_total,
+            "collections_done": self.collections_done,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "queued_seconds": seconds(self.created_at, self.started_at),
+            "run_seconds": seconds(self.started_at, self.finished_at),
+        }
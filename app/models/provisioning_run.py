@@ -0,0 +1,71 @@
+import uuid
+from ..extensions import db
+from .provisioning_job import utcnow
+
+
+class ProvisioningRun(db.Model):
+    """Journal header of one tenant provisioning, resumable until it succeeds"""
+    __tablename__ = 'provisioning_runs'
+
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    # The tenant was deprovisioned; a retry under the same key starts over
+    DELETED = 'deleted'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    idempotency_key = db.Column(db.String(255), unique=True)
+    tenant_name = db.Column(db.String(255), nullable=False, index=True)
+    tenant_id = db.Column(db.String(32), index=True)
+    plan_fingerprint = db.Column(db.String(64))
+    status = db.Column(db.String(16), nullable=False, default=RUNNING, index=True)
+    # Collection IDs chosen for an import, kept so a retried import reuses them
+    import_ids = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    attempts = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+    steps = db.relationship('ProvisioningStep', backref='run', lazy='select',
+                            cascade='all, delete-orphan', order_by='ProvisioningStep.id')
+
+    def to_dict(self):
+        return {
+            "run_id": self.id,
+            "idempotency_key": self.idempotency_key,
+            "tenant_name": self.tenant_name,
+            "tenant_id": self.tenant_id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "steps": [step.to_dict() for step in self.steps],
+            "result": self.result,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class ProvisioningStep(db.Model):
+    """One completed step of a provisioning run"""
+    __tablename__ = 'provisioning_steps'
+    __table_args__ = (db.UniqueConstraint('run_id', 'kind', 'template_id'),)
+
+    TENANT = 'tenant'
+    COLLECTION = 'collection'
+    RELATIONS = 'relations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.String(32), db.ForeignKey('provisioning_runs.id'), nullable=False)
+    kind = db.Column(db.String(16), nullable=False)
+    # Template collection ID; empty for the tenant record
+    template_id = db.Column(db.String(64), nullable=False, default='')
+    # tenant_id for the tenant record, the new PocketBase collection ID otherwise
+    target_id = db.Column(db.String(64))
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "template_id": self.template_id or None,
+            "target_id": self.target_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
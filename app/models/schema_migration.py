@@ -0,0 +1,72 @@
+import uuid
+from ..extensions import db
+from .provisioning_job import utcnow
+
+
+class SchemaMigration(db.Model):
+    """One rollout of a schema version to existing tenants, resumable with `flask schema migrate --resume`"""
+    __tablename__ = 'schema_migrations'
+
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    target_version = db.Column(db.String(64), nullable=False)
+    plan_fingerprint = db.Column(db.String(64))
+    dry_run = db.Column(db.Boolean, nullable=False, default=False)
+    prune_fields = db.Column(db.Boolean, nullable=False, default=False)
+    status = db.Column(db.String(16), nullable=False, default=RUNNING, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+    tenants = db.relationship('SchemaMigrationTenant', backref='migration', lazy='dynamic',
+                              cascade='all, delete-orphan')
+
+    def counts(self):
+        rows = (db.session.query(SchemaMigrationTenant.status, db.func.count())
+                .filter_by(migration_id=self.id)
+                .group_by(SchemaMigrationTenant.status))
+        return dict(rows.all())
+
+    def to_dict(self):
+        return {
+            "migration_id": self.id,
+            "target_version": self.target_version,
+            "plan_fingerprint": self.plan_fingerprint,
+            "dry_run": self.dry_run,
+            "prune_fields": self.prune_fields,
+            "status": self.status,
+            "tenants": self.counts(),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class SchemaMigrationTenant(db.Model):
+    """Checkpoint of one tenant within a schema migration"""
+    __tablename__ = 'schema_migration_tenants'
+    __table_args__ = (db.UniqueConstraint('migration_id', 'tenant_id'),)
+
+    MIGRATED = 'migrated'
+    UNCHANGED = 'unchanged'
+    # Dry runs only: changes that would be made
+    PLANNED = 'planned'
+    FAILED = 'failed'
+    # Tenants in one of these states are skipped when the migration is resumed
+    DONE = (MIGRATED, UNCHANGED)
+
+    id = db.Column(db.Integer, primary_key=True)
+    migration_id = db.Column(db.String(32), db.ForeignKey('schema_migrations.id'), nullable=False)
+    tenant_id = db.Column(db.String(32), nullable=False)
+    status = db.Column(db.String(16), nullable=False)
+    changes = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+    def to_dict(self):
+        return {
+            "tenant_id": self.tenant_id,
+            "status": self.status,
+            "changes": self.changes or [],
+            "error": self.error,
+        }
@@ -0,0 +1,21 @@
+from ..extensions import db
+from .provisioning_job import utcnow
+
+
+class TenantPlacement(db.Model):
+    """The PocketBase backend a tenant's record and collections live on"""
+    __tablename__ = 'tenant_placements'
+
+    # Unique across backends: placing a tenant_id is what reserves it
+    tenant_id = db.Column(db.String(32), primary_key=True)
+    backend = db.Column(db.String(255), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+    def to_dict(self):
+        return {
+            "tenant_id": self.tenant_id,
+            "backend": self.backend,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -0,0 +1,41 @@
+import uuid
+from ..extensions import db
+from .provisioning_job import utcnow
+
+
+class WarmSpare(db.Model):
+    """A fully provisioned collection set waiting for a tenant to claim it"""
+    __tablename__ = 'warm_spares'
+
+    BUILDING = 'building'
+    READY = 'ready'
+    # Claimed by an onboarding that is creating the tenant record
+    CLAIMED = 'claimed'
+    # Built for an outdated schema or left behind; its collections are being deleted
+    DISCARDED = 'discarded'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    # Reserved up front: the collections are already named vms_<tenant_id>_*
+    tenant_id = db.Column(db.String(32), nullable=False, unique=True)
+    # PocketBase backend the spare is built on; None before sharding
+    backend = db.Column(db.String(255))
+    schema_version = db.Column(db.String(64))
+    plan_fingerprint = db.Column(db.String(64), index=True)
+    status = db.Column(db.String(16), nullable=False, default=BUILDING, index=True)
+    # Template collection ID -> PocketBase collection ID
+    collections = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+    claimed_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "spare_id": self.id,
+            "tenant_id": self.tenant_id,
+            "backend": self.backend,
+            "schema_version": self.schema_version,
+            "plan_fingerprint": self.plan_fingerprint,
+            "status": self.status,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "claimed_at": self.claimed_at.isoformat() if self.claimed_at else None,
+        }
@@ -0,0 +1,82 @@
+from flask import Blueprint, jsonify, request
+from ..models import ProvisioningRun
+from ..services.admission import admission_stats
+from ..services.http_pool import http_clients
+from ..services.placement import placement_router
+from ..services.resilience import resilience_stats
+from ..services.tenant_service import tenant_config_cache
+from ..services.warm_pool import warm_pool
+from ..utils.log import log_pipeline
+from ..utils.profiling import profiler
+
+admin_blueprint = Blueprint('admin', __name__)
+
+
+@admin_blueprint.route('/admission', methods=['GET'])
+def get_admission_stats():
+    # Queue depth and waits per PocketBase instance; rejections answer 503 upstream
+    return jsonify(admission_stats())
+
+
+@admin_blueprint.route('/http-pool', methods=['GET'])
+def get_http_pool_stats():
+    return jsonify(http_clients.stats())
+
+
+@admin_blueprint.route('/logging', methods=['GET'])
+def get_logging_stats():
+    # A growing "dropped" count means the log sink cannot keep up
+    return jsonify(log_pipeline.stats())
+
+
+@admin_blueprint.route('/placement', methods=['GET'])
+def get_placement_stats():
+    """Configured PocketBase backends and how many tenants each holds"""
+    return jsonify(placement_router.stats())
+
+
+@admin_blueprint.route('/pocketbase-health', methods=['GET'])
+def get_pocketbase_health():
+    return jsonify(resilience_stats())
+
+
+@admin_blueprint.route('/profiles', methods=['GET'])
+def list_profiles():
+    top = min(request.args.get('top', 20, type=int), 100)
+    return jsonify({
+        "enabled": profiler.enabled,
+        "profiles": profiler.summaries(),
+        "top_frames": profiler.top_frames(top),
+    })
+
+
+@admin_blueprint.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    summary = profiler.get(profile_id)
+    if summary is None:
+        return jsonify({
+            "status": "error",
+            "message": "Profile not found"
+        }), 404
+    return jsonify(summary)
+
+
+@admin_blueprint.route('/provisioning-runs', methods=['GET'])
+def list_provisioning_runs():
+    # ?status=failed lists the half-provisioned tenants waiting for a retry
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    query = ProvisioningRun.query.order_by(ProvisioningRun.updated_at.desc())
+    if request.args.get('status'):
+        query = query.filter_by(status=request.args['status'])
+
+    return jsonify({"items": [run.to_dict() for run in query.limit(limit)]})
+
+
+@admin_blueprint.route('/tenant-cache', methods=['GET'])
+def get_tenant_cache_stats():
+    return jsonify(tenant_config_cache.stats())
+
+
+@admin_blueprint.route('/warm-pool', methods=['GET'])
+def get_warm_pool_stats():
+    return jsonify(warm_pool.stats())
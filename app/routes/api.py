@@ -1,18 +1,145 @@
-from flask import Blueprint, request, jsonify
-from ..services.tenant_service import TenantService
+import json
+import threading
+import time
+from functools import wraps
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context, url_for
+from ..extensions import db
+from ..models import ProvisioningJob
+from ..services.admission import get_admission
+from ..services.batch_service import BatchProvisioner
+from ..services.job_queue import QueueFullError, job_queue
+from ..services.placement import placement_router
+from ..services.progress import ProgressChannel, progress_broker, stream_channel
+from ..services.provisioning_journal import ProvisioningInProgressError
+from ..services.single_flight import onboarding_flights, onboarding_key
+from ..services.tenant_service import PROVISIONING_STRATEGIES, TenantService
+from ..services.warm_pool import SpareNotClaimedError
 from ..utils.decorators import validate_json
+from ..utils.helpers import is_truthy
 
 api_blueprint = Blueprint('api', __name__)
 
+STREAM_MIMETYPES = {'sse': 'text/event-stream', 'ndjson': 'application/x-ndjson'}
+
+
+def requested_stream_format():
+    """'sse' or 'ndjson' when the client asked for a progress stream"""
+    fmt = request.args.get('stream')
+    if fmt in STREAM_MIMETYPES:
+        return fmt
+    if request.accept_mimetypes.best == 'text/event-stream':
+        return 'sse'
+    return None
+
+
+def progress_response(channel: ProgressChannel, fmt: str, status=200):
+    response = Response(stream_channel(channel, fmt), status=status,
+                        mimetype=STREAM_MIMETYPES[fmt])
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def shed_load(f):
+    """Answer 503 with Retry-After while PocketBase calls are queueing past their limits.
+
+    New work would only wait out ADMISSION_QUEUE_TIMEOUT and fail, so the
+    client is told when to come back instead. A request about a tenant checks
+    the backend it is placed on; a new tenant may land on any backend (and
+    its ID is checked on POCKETBASE_URL), so all of them are checked.
+    """
+    @wraps(f)
+    def wrapped(*args, **kwargs):
+        tenant_id = kwargs.get('tenant_id')
+        if tenant_id is not None:
+            backends = [placement_router.backend_for(tenant_id)]
+        else:
+            backends = dict.fromkeys([placement_router.home, *placement_router.backends()])
+        saturated = [admission for admission in map(get_admission, backends) if admission.saturated()]
+        if saturated:
+            response = jsonify({
+                "status": "error",
+                "message": "PocketBase is saturated, retry later"
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(max(admission.retry_after() for admission in saturated))
+            return response
+        return f(*args, **kwargs)
+    return wrapped
+
+
+def requested_strategy(data=None):
+    """Provisioning strategy from the body or ?strategy=; None means the configured default"""
+    return (data or {}).get('strategy') or request.args.get('strategy')
+
+
+def invalid_strategy_response(strategy):
+    return jsonify({
+        "status": "error",
+        "message": f"strategy must be one of {', '.join(PROVISIONING_STRATEGIES)}"
+    }), 400
+
 
 @api_blueprint.route('/tenants', methods=['POST'])
 @validate_json({'name': str})
+@shed_load
 def create_tenant_config():
     data = request.get_json()
     tenant_name = data['name']
+    strategy = requested_strategy(data)
+    if strategy is not None and strategy not in PROVISIONING_STRATEGIES:
+        return invalid_strategy_response(strategy)
+    # Retries with the same key resume (or return) the original provisioning
+    idempotency_key = request.headers.get('Idempotency-Key')
+    # Duplicates arriving while the first request runs share its job or result
+    coalesce_key = (onboarding_key(tenant_name, idempotency_key)
+                    if current_app.config.get('ONBOARDING_COALESCE', True) else None)
+    coalesced = False
 
-    service = TenantService()
-    result = service.create_tenant_configuration(tenant_name)
+    # ?sync=true keeps the original blocking behaviour
+    if not is_truthy(request.args.get('sync')):
+        try:
+            if coalesce_key is None:
+                job = job_queue.submit(tenant_name, strategy, idempotency_key)
+            else:
+                job, coalesced = job_queue.submit_once(coalesce_key, tenant_name, strategy,
+                                                       idempotency_key)
+        except QueueFullError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 503
+
+        status_url = url_for('api.get_job', job_id=job.id)
+        stream_format = requested_stream_format()
+        # A coalesced job may have finished long enough ago for its events to be gone
+        channel = progress_broker.get(job.id) if stream_format else None
+        if channel is not None:
+            response = progress_response(channel, stream_format)
+        else:
+            response = jsonify({**job.to_dict(), "status_url": status_url})
+            response.status_code = 202
+        response.headers['Location'] = status_url
+        if coalesced:
+            response.headers['X-Coalesced'] = 'true'
+        return response
+
+    service = TenantService(strategy=strategy)
+
+    def provision():
+        return service.create_tenant_configuration(tenant_name, idempotency_key=idempotency_key)
+
+    try:
+        if coalesce_key is None:
+            result = provision()
+        else:
+            result, coalesced = onboarding_flights.do(coalesce_key, provision)
+    except ProvisioningInProgressError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 409
 
     if not result:
         return jsonify({
@@ -20,10 +147,158 @@ def create_tenant_config():
             "message": "Failed to create tenant configuration"
         }), 400
 
-    return jsonify(result), 201
+    response = jsonify(result)
+    response.status_code = 201
+    if coalesced:
+        response.headers['X-Coalesced'] = 'true'
+    return response
+
+
+@api_blueprint.route('/tenants/batch', methods=['POST'])
+@validate_json({'names': list})
+@shed_load
+def create_tenant_configs_batch():
+    tenant_names = request.get_json()['names']
+    max_size = current_app.config['BATCH_MAX_SIZE']
+
+    if not tenant_names or not all(isinstance(name, str) and name for name in tenant_names):
+        return jsonify({"error": "names must be a non-empty list of strings"}), 400
+    if len(tenant_names) > max_size:
+        return jsonify({"error": f"At most {max_size} tenants per batch"}), 400
+
+    strategy = requested_strategy()
+    if strategy is not None and strategy not in PROVISIONING_STRATEGIES:
+        return invalid_strategy_response(strategy)
+
+    provisioner = BatchProvisioner(request.args.get('concurrency', type=int), strategy,
+                                   current_app._get_current_object())
+
+    def stream():
+        # One NDJSON line per tenant as soon as it finishes, then a summary
+        started = time.perf_counter()
+        results = []
+        for result in provisioner.provision(tenant_names):
+            results.append(result)
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"summary": provisioner.summarize(results, started)}) + "\n"
+
+    return Response(stream_with_context(stream()), status=200,
+                    mimetype='application/x-ndjson')
 
 
 @api_blueprint.route('/tenants/<tenant_id>', methods=['GET'])
 def get_tenant_config(tenant_id):
-    # Implementation for getting tenant config
-    pass
+    service = TenantService()
+    found = service.get_tenant_configuration(tenant_id)
+
+    if not found:
+        return jsonify({
+            "status": "error",
+            "message": "Tenant not found"
+        }), 404
+
+    configuration, etag = found
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(configuration)
+    response.set_etag(etag)
+    # Clients must revalidate, which is a cheap 304 while the configuration is unchanged
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@api_blueprint.route('/tenants/<tenant_id>', methods=['DELETE'])
+@shed_load
+def delete_tenant_config(tenant_id):
+    service = TenantService()
+    try:
+        service.ensure_deletable(tenant_id)
+    except SpareNotClaimedError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 409
+    stream_format = requested_stream_format()
+    if not stream_format:
+        result = service.delete_tenant_configuration(tenant_id)
+        if result is None:
+            return jsonify({
+                "status": "error",
+                "message": "Tenant not found"
+            }), 404
+        # A partial deletion is safe to retry: the next call picks up what is left
+        return jsonify(result), 200 if result["status"] == "deleted" else 502
+
+    key = f"delete:{tenant_id}"
+    channel = progress_broker.open(key)
+    progress_broker.alias(tenant_id, key)
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                result = service.delete_tenant_configuration(tenant_id, channel.publish)
+                if result is None:
+                    channel.publish({"event": "tenant_not_found", "tenant_id": tenant_id})
+                else:
+                    channel.publish({"event": "deprovision_finished", **result})
+            except Exception as e:
+                channel.publish({"event": "deprovision_failed", "tenant_id": tenant_id,
+                                 "message": str(e)})
+            finally:
+                channel.close()
+
+    threading.Thread(target=run, name=f"delete-{tenant_id}", daemon=True).start()
+    return progress_response(channel, stream_format)
+
+
+@api_blueprint.route('/tenants/<tenant_id>/events', methods=['GET'])
+def get_tenant_events(tenant_id):
+    channel = progress_broker.get(tenant_id)
+    if channel is None:
+        return jsonify({
+            "status": "error",
+            "message": "No provisioning in progress for this tenant on this server"
+        }), 404
+
+    return progress_response(channel, requested_stream_format() or 'sse')
+
+
+@api_blueprint.route('/jobs/<job_id>/events', methods=['GET'])
+def get_job_events(job_id):
+    channel = progress_broker.get(job_id)
+    if channel is None:
+        return jsonify({
+            "status": "error",
+            "message": "No provisioning in progress for this job on this server"
+        }), 404
+
+    return progress_response(channel, requested_stream_format() or 'sse')
+
+
+@api_blueprint.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = db.session.get(ProvisioningJob, job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "Job not found"
+        }), 404
+
+    job_queue.fail_abandoned([job])
+    return jsonify(job.to_dict())
+
+
+@api_blueprint.route('/jobs', methods=['GET'])
+def list_jobs():
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    query = ProvisioningJob.query.order_by(ProvisioningJob.created_at.desc())
+    if request.args.get('status'):
+        query = query.filter_by(status=request.args['status'])
+    if request.args.get('tenant_id'):
+        query = query.filter_by(tenant_id=request.args['tenant_id'])
+
+    jobs = query.limit(limit).all()
+    job_queue.fail_abandoned(jobs)
+    return jsonify({"items": [job.to_dict() for job in jobs]})
@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+from ..services.metrics import CONTENT_TYPE, metrics
+
+metrics_blueprint = Blueprint('metrics', __name__)
+
+
+@metrics_blueprint.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import re
+import secrets
+import string
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+from .provisioning_planner import plan_collection_waves
+from ..utils import json_codec
+
+APP_PREFIX = "vms"  # Using 'vms' as the app prefix based on your example
+
+SUPPORTED_FIELD_KEYS = ("name", "type", "required",
+                        "presentable", "unique", "options")
+COLLECTION_RULE_KEYS = ("listRule", "viewRule", "createRule",
+                        "updateRule", "deleteRule")
+
+# PocketBase record and collection IDs: 15 lowercase alphanumeric characters
+COLLECTION_ID_ALPHABET = string.ascii_lowercase + string.digits
+COLLECTION_ID_LENGTH = 15
+
+
+def clean_field(field: Dict) -> Dict:
+    """Remove unsupported field properties for the PocketBase client."""
+    cleaned = {key: field[key] for key in SUPPORTED_FIELD_KEYS if key in field}
+    if cleaned.get("type") == "autodate":
+        cleaned["type"] = "date"  # Convert autodate to date
+    return cleaned
+
+
+def is_relation_field(field: Dict) -> bool:
+    """Check if a field is a relation field."""
+    return field["type"] == "relation" and "options" in field and "collectionId" in field["options"]
+
+
+def new_collection_id() -> str:
+    """Client-side collection ID in PocketBase's own format."""
+    return ''.join(secrets.choice(COLLECTION_ID_ALPHABET) for _ in range(COLLECTION_ID_LENGTH))
+
+
+def freeze(value: Any) -> Any:
+    """Return a read-only deep copy of a JSON value."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Return a mutable deep copy of a frozen JSON value."""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class PayloadTemplate(NamedTuple):
+    """A payload pre-rendered to JSON bytes, with slots for what changes per tenant."""
+    # Literal JSON around the slots: one more chunk than there are slots
+    chunks: Tuple[bytes, ...]
+    # None for the tenant_id, else the template ID whose tenant collection ID goes there
+    slots: Tuple[Optional[str], ...]
+
+    def render(self, tenant_id: str, id_mapping: Mapping[str, str]) -> Optional[bytes]:
+        """The payload bytes, or None when a slot's collection has no ID yet."""
+        parts = [self.chunks[0]]
+        for slot, chunk in zip(self.slots, self.chunks[1:]):
+            value = tenant_id if slot is None else id_mapping.get(slot)
+            if value is None:
+                return None
+            parts.append(json_codec.escape_string(value))
+            parts.append(chunk)
+        return b''.join(parts)
+
+
+class TemplateMarkers(NamedTuple):
+    """Placeholders a plan's payloads are rendered with before they become templates."""
+    tenant_id: str
+    # Template ID -> placeholder standing in for its tenant collection ID
+    collection_ids: Mapping[str, str]
+    pattern: "re.Pattern"
+    # Placeholder suffix -> slot
+    slots: Mapping[bytes, Optional[str]]
+
+
+def template_markers(template_ids) -> TemplateMarkers:
+    prefix = "x" + secrets.token_hex(8)
+    template_ids = list(template_ids)
+    slots = {f"c{n}".encode(): template_id for n, template_id in enumerate(template_ids)}
+    slots[b"t"] = None
+    return TemplateMarkers(
+        tenant_id=f"{prefix}t",
+        collection_ids={template_id: f"{prefix}c{n}" for n, template_id in enumerate(template_ids)},
+        pattern=re.compile(re.escape(prefix).encode() + rb"(t|c\d+)"),
+        slots=slots,
+    )
+
+
+def compile_template(build: Callable[[str, Mapping[str, str]], Any],
+                     markers: TemplateMarkers) -> PayloadTemplate:
+    """Render build(tenant_id, id_mapping) once with markers in place of the parts that vary."""
+    parts = markers.pattern.split(json_codec.dumps(build(markers.tenant_id, markers.collection_ids)))
+    return PayloadTemplate(chunks=tuple(parts[0::2]),
+                           slots=tuple(markers.slots[name] for name in parts[1::2]))
+
+
+class FieldPlan(NamedTuple):
+    name: str
+    # Cleaned field as the template defines it
+    skeleton: Mapping
+    # Template ID of the related collection when it is part of the same template
+    relation_target: Optional[str]
+    # Options sent once relation_target has a tenant collection ID (minus collectionId)
+    relation_options: Optional[Mapping]
+    # True when the relation sits on a cycle and is added with a PATCH after creation
+    deferred: bool
+
+    def render(self, id_mapping: Mapping[str, str]) -> Dict:
+        """Field payload with the relation pointed at the tenant's collection."""
+        if self.relation_target is None or self.relation_target not in id_mapping:
+            return thaw(self.skeleton)
+        field = thaw(self.skeleton)
+        field["options"] = {"collectionId": id_mapping[self.relation_target],
+                            **self.relation_options}
+        return field
+
+
+class CollectionPlan(NamedTuple):
+    template_id: str
+    base_name: str
+    # Everything in the create payload except name and schema
+    skeleton: Mapping
+    fields: Tuple[FieldPlan, ...]
+    has_deferred: bool
+    # create_payload, update_payload and import_payload as byte templates
+    create_template: Optional[PayloadTemplate] = None
+    update_template: Optional[PayloadTemplate] = None
+    import_template: Optional[PayloadTemplate] = None
+
+    def collection_name(self, tenant_id: str) -> str:
+        """Build the tenant-scoped name of the collection."""
+        return f"{APP_PREFIX}_{tenant_id}_{self.base_name}"
+
+    def create_payload(self, tenant_id: str, id_mapping: Mapping[str, str]) -> Dict:
+        """Create payload with every field except the deferred cyclic relations."""
+        payload = {"name": self.collection_name(tenant_id),
+                   "type": self.skeleton["type"],
+                   "schema": [field.render(id_mapping)
+                              for field in self.fields if not field.deferred]}
+        for key in COLLECTION_RULE_KEYS:
+            payload[key] = self.skeleton[key]
+        payload["options"] = thaw(self.skeleton["options"])
+        return payload
+
+    def update_payload(self, id_mapping: Mapping[str, str]) -> Dict:
+        """PATCH payload that adds the deferred relations once their targets exist."""
+        return {"schema": [field.render(id_mapping) for field in self.fields]}
+
+    def import_payload(self, tenant_id: str, id_mapping: Mapping[str, str]) -> Dict:
+        """Full collection for the import API: its own ID and every relation, cyclic ones included."""
+        payload = self.create_payload(tenant_id, id_mapping)
+        payload["id"] = id_mapping[self.template_id]
+        payload["schema"] = [field.render(id_mapping) for field in self.fields]
+        return payload
+
+    def create_body(self, tenant_id: str, id_mapping: Mapping[str, str]) -> bytes:
+        """create_payload as JSON bytes, rendered from the template when every relation resolves."""
+        body = self.create_template.render(tenant_id, id_mapping) if self.create_template else None
+        return body if body is not None else json_codec.dumps(self.create_payload(tenant_id, id_mapping))
+
+    def update_body(self, id_mapping: Mapping[str, str]) -> bytes:
+        """update_payload as JSON bytes."""
+        body = self.update_template.render("", id_mapping) if self.update_template else None
+        return body if body is not None else json_codec.dumps(self.update_payload(id_mapping))
+
+    def import_body(self, tenant_id: str, id_mapping: Mapping[str, str]) -> bytes:
+        """import_payload as JSON bytes."""
+        body = self.import_template.render(tenant_id, id_mapping) if self.import_template else None
+        return body if body is not None else json_codec.dumps(self.import_payload(tenant_id, id_mapping))
+
+    def with_templates(self, markers: TemplateMarkers) -> "CollectionPlan":
+        """Copy with the payload templates compiled."""
+        return self._replace(
+            create_template=compile_template(self.create_payload, markers),
+            update_template=compile_template(
+                lambda tenant_id, id_mapping: self.update_payload(id_mapping), markers)
+            if self.has_deferred else None,
+            import_template=compile_template(self.import_payload, markers),
+        )
+
+
+class ProvisioningPlan(NamedTuple):
+    version: str
+    # sha256 of the template file; changes whenever the template does
+    fingerprint: str
+    collections: Mapping[str, CollectionPlan]
+    waves: Tuple[Tuple[str, ...], ...]
+    deferred: Tuple[str, ...]
+
+    def import_payload(self, tenant_id: str, known_ids: Optional[Mapping[str, str]] = None
+                       ) -> Tuple[Dict[str, str], List[Dict]]:
+        """Template-to-collection ID mapping (reusing `known_ids`) and the tenant's whole collection set."""
+        known_ids = known_ids or {}
+        id_mapping = {template_id: known_ids.get(template_id) or new_collection_id()
+                      for template_id in self.collections}
+        collections = [self.collections[template_id].import_payload(tenant_id, id_mapping)
+                       for wave in self.waves for template_id in wave]
+        return id_mapping, collections
+
+    def import_body(self, tenant_id: str, known_ids: Optional[Mapping[str, str]] = None
+                    ) -> Tuple[Dict[str, str], bytes]:
+        """import_payload with the collections rendered as one JSON array."""
+        known_ids = known_ids or {}
+        id_mapping = {template_id: known_ids.get(template_id) or new_collection_id()
+                      for template_id in self.collections}
+        bodies = [self.collections[template_id].import_body(tenant_id, id_mapping)
+                  for wave in self.waves for template_id in wave]
+        return id_mapping, b'[' + b','.join(bodies) + b']'
+
+
+def compile_plan(schema: List[Dict], version: str = "", fingerprint: str = "") -> ProvisioningPlan:
+    """Precompute everything about a schema template that does not depend on the tenant."""
+    waves = plan_collection_waves(schema, is_relation_field)
+    known_ids = {collection["id"] for collection in schema}
+    markers = template_markers(known_ids)
+
+    collections = {}
+    for collection in schema:
+        template_id = collection["id"]
+        deferred_names = waves.deferred_fields.get(template_id, set())
+        fields = []
+        for field in collection.get("schema", []):
+            relation_target = None
+            relation_options = None
+            if is_relation_field(field) and field["options"]["collectionId"] in known_ids:
+                relation_target = field["options"]["collectionId"]
+                relation_options = freeze({
+                    "cascadeDelete": field["options"].get("cascadeDelete", False),
+                    "minSelect": field["options"].get("minSelect"),
+                    "maxSelect": field["options"].get("maxSelect"),
+                    "displayFields": field["options"].get("displayFields")
+                })
+            fields.append(FieldPlan(
+                name=field["name"],
+                skeleton=freeze(clean_field(field)),
+                relation_target=relation_target,
+                relation_options=relation_options,
+                deferred=field["name"] in deferred_names,
+            ))
+
+        skeleton = {"type": collection["type"]}
+        for key in COLLECTION_RULE_KEYS:
+            skeleton[key] = collection.get(key)
+        skeleton["options"] = collection.get("options", {})
+        collections[template_id] = CollectionPlan(
+            template_id=template_id,
+            base_name=collection["name"].split('_')[-1],
+            skeleton=freeze(skeleton),
+            fields=tuple(fields),
+            has_deferred=bool(deferred_names),
+        ).with_templates(markers)
+
+    return ProvisioningPlan(
+        version=version,
+        fingerprint=fingerprint,
+        collections=MappingProxyType(collections),
+        waves=tuple(tuple(wave) for wave in waves.waves),
+        deferred=tuple(cid for cid in collections if collections[cid].has_deferred),
+    )
+
+
+def load_plan(path: str, version: str = "") -> ProvisioningPlan:
+    """Read and compile a pb_schema.json file."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    schema = json.loads(raw)
+    return compile_plan(schema, version, hashlib.sha256(raw).hexdigest())
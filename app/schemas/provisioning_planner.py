@@ -0,0 +1,117 @@
+from typing import Callable, Dict, List, NamedTuple, Set
+
+
+class WavePlan(NamedTuple):
+    """Order in which a schema's collections can be created.
+
+    waves: collection IDs grouped so that every relation of a collection
+        points at a collection from an earlier wave (or outside the schema).
+    deferred_fields: collection ID -> names of relation fields that sit on a
+        cycle and must be added with a PATCH once every wave exists.
+    """
+    waves: List[List[str]]
+    deferred_fields: Dict[str, Set[str]]
+
+
+def build_relation_graph(schema: List[Dict],
+                         is_relation_field: Callable[[Dict], bool]) -> Dict[str, Set[str]]:
+    """Map each collection ID to the IDs of the schema collections it relates to."""
+    known_ids = {collection["id"] for collection in schema}
+    graph = {}
+    for collection in schema:
+        graph[collection["id"]] = {
+            field["options"]["collectionId"]
+            for field in collection.get("schema", [])
+            if is_relation_field(field) and field["options"]["collectionId"] in known_ids
+        }
+    return graph
+
+
+def strongly_connected_components(graph: Dict[str, Set[str]]) -> Dict[str, int]:
+    """Label every node with its strongly connected component (iterative Tarjan)."""
+    index = {}
+    lowlink = {}
+    component = {}
+    stack = []
+    on_stack = set()
+    counter = 0
+
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(sorted(graph[root])))]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+
+        while work:
+            node, children = work[-1]
+            advanced = False
+            for child in children:
+                if child not in index:
+                    index[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(sorted(graph[child]))))
+                    advanced = True
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component[member] = index[node]
+                    if member == node:
+                        break
+
+    return component
+
+
+def plan_collection_waves(schema: List[Dict],
+                          is_relation_field: Callable[[Dict], bool]) -> WavePlan:
+    """Topologically sort a schema into creation waves.
+
+    Relations inside a cycle (including self-relations) are cut and reported
+    in `deferred_fields`; every other relation can be sent with the create
+    call because its target is created in an earlier wave.
+    """
+    graph = build_relation_graph(schema, is_relation_field)
+    component = strongly_connected_components(graph)
+
+    deferred_fields: Dict[str, Set[str]] = {}
+    dependencies: Dict[str, Set[str]] = {}
+    for collection in schema:
+        source = collection["id"]
+        dependencies[source] = set()
+        for field in collection.get("schema", []):
+            if not is_relation_field(field):
+                continue
+            target = field["options"]["collectionId"]
+            if target not in graph:
+                continue
+            if component[target] == component[source]:
+                deferred_fields.setdefault(source, set()).add(field["name"])
+            else:
+                dependencies[source].add(target)
+
+    # Kahn's algorithm, one wave per round, keeping template order inside a wave
+    waves = []
+    done: Set[str] = set()
+    remaining = [collection["id"] for collection in schema]
+    while remaining:
+        wave = [cid for cid in remaining if dependencies[cid] <= done]
+        waves.append(wave)
+        done.update(wave)
+        remaining = [cid for cid in remaining if cid not in done]
+
+    return WavePlan(waves=waves, deferred_fields=deferred_fields)
@@ -0,0 +1,81 @@
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+from ..config import Config
+from .provisioning_plan import ProvisioningPlan, load_plan
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_ROOT = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'schema-collection')
+SCHEMA_FILENAME = 'pb_schema.json'
+
+
+class SchemaRegistry:
+    """Process-wide cache of compiled provisioning plans, one per schema version.
+
+    Plans are compiled on first use and recompiled when the template file's
+    mtime (or size) changes, so editing pb_schema.json needs no restart.
+    """
+
+    def __init__(self, root: str = SCHEMA_ROOT, default_version: Optional[str] = None):
+        self.root = root
+        self.default_version = default_version
+        self._plans: Dict[str, Tuple[Tuple[int, int], ProvisioningPlan]] = {}
+        self._lock = threading.Lock()
+
+    def versions(self) -> List[str]:
+        """List schema versions available under the root, oldest first."""
+        try:
+            entries = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        found = [entry for entry in entries
+                 if os.path.isfile(os.path.join(self.root, entry, SCHEMA_FILENAME))]
+        return sorted(found, key=lambda v: [int(p) if p.isdigit() else p
+                                            for p in re.split(r'(\d+)', v)])
+
+    def get_path(self, version: Optional[str] = None) -> str:
+        """Path of the template file for a version."""
+        version = version or self.default_version or Config.SCHEMA_VERSION
+        return os.path.join(self.root, version, SCHEMA_FILENAME)
+
+    def get_plan(self, version: Optional[str] = None) -> ProvisioningPlan:
+        """Return the compiled plan for a version, recompiling it if the file changed.
+
+        Raises FileNotFoundError / json.JSONDecodeError like reading the file would.
+        """
+        version = version or self.default_version or Config.SCHEMA_VERSION
+        path = self.get_path(version)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+
+        cached = self._plans.get(version)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        with self._lock:
+            cached = self._plans.get(version)
+            if cached and cached[0] == stamp:
+                return cached[1]
+            plan = load_plan(path, version)
+            self._plans[version] = (stamp, plan)
+            logger.info("Compiled schema %s: %d collections", version, len(plan.collections))
+            return plan
+
+    def preload(self):
+        """Compile every available version, reporting (not raising) broken templates."""
+        for version in self.versions():
+            try:
+                self.get_plan(version)
+            except Exception as e:
+                logger.error("Could not compile schema %s: %s", version, e)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+
+schema_registry = SchemaRegistry()
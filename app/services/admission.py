@@ -0,0 +1,339 @@
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Deque, Dict, Optional
+from ..config import Config
+from .metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS, ADMISSION_WAIT
+
+logger = logging.getLogger(__name__)
+
+# How often a waiter re-checks limits shared with other processes
+SHARED_POLL_INTERVAL = 0.02
+
+
+class AdmissionRejectedError(Exception):
+    """Raised instead of calling PocketBase when the admission queue is full or the wait ran out"""
+
+    def __init__(self, name: str, reason: str, retry_after: int):
+        super().__init__(f"PocketBase {name} is saturated ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ('deadline', 'granted', 'event', 'loop', 'future')
+
+    def __init__(self, deadline: float, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.deadline = deadline
+        self.granted = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class SharedLimits:
+    """Token bucket and in-flight count kept in a SQLite file shared by local worker processes.
+
+    In-flight calls are leases that expire after `lease_ttl` seconds, so a
+    crashed process cannot hold slots forever.
+    """
+
+    def __init__(self, path: str, name: str, lease_ttl: float):
+        self.path = path
+        self.name = name
+        self.lease_ttl = lease_ttl
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets "
+                         "(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS leases "
+                         "(id TEXT PRIMARY KEY, name TEXT NOT NULL, expires REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def try_acquire(self, rate: float, burst: float, max_in_flight: int) -> Optional[str]:
+        """A lease ID if a call may start now, else None"""
+        conn = self._connect()
+        now = time.time()
+        # Wall clock, since monotonic clocks are not comparable across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM leases WHERE name = ? AND expires < ?", (self.name, now))
+            if max_in_flight:
+                (in_flight,) = conn.execute("SELECT COUNT(*) FROM leases WHERE name = ?",
+                                            (self.name,)).fetchone()
+                if in_flight >= max_in_flight:
+                    conn.execute("COMMIT")
+                    return None
+            if rate:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?",
+                                   (self.name,)).fetchone()
+                tokens, updated = row if row else (burst, now)
+                tokens = min(burst, tokens + (now - updated) * rate)
+                if tokens < 1:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute("INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                             (self.name, tokens - 1, now))
+            lease = uuid.uuid4().hex
+            conn.execute("INSERT INTO leases (id, name, expires) VALUES (?, ?, ?)",
+                         (lease, self.name, now + self.lease_ttl))
+            conn.execute("COMMIT")
+            return lease
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release(self, lease: str):
+        self._connect().execute("DELETE FROM leases WHERE id = ?", (lease,))
+
+
+class AdmissionController:
+    """Token bucket plus max-in-flight limit in front of one PocketBase instance.
+
+    Calls that cannot start right away wait in a single FIFO queue shared by
+    the worker's threads and its asyncio loop, so none can overtake another.
+    A call is rejected with AdmissionRejectedError when the queue already
+    holds `max_queue` callers, or when it waited `queue_timeout` seconds.
+    With a `shared_path` the limits are enforced across every local process
+    using that SQLite file; FIFO order then only holds within a process.
+    Each HTTP attempt holds a slot, so retries are admitted like new calls.
+    """
+
+    def __init__(self, name: str, rate: Optional[float] = None, burst: Optional[float] = None,
+                 max_in_flight: Optional[int] = None, max_queue: Optional[int] = None,
+                 queue_timeout: Optional[float] = None, shared_path: Optional[str] = None):
+        self.name = name
+        self.rate = Config.ADMISSION_RATE if rate is None else rate
+        self.burst = burst or Config.ADMISSION_BURST or max(self.rate, 1)
+        self.max_in_flight = Config.ADMISSION_MAX_IN_FLIGHT if max_in_flight is None else max_in_flight
+        self.max_queue = Config.ADMISSION_MAX_QUEUE if max_queue is None else max_queue
+        self.queue_timeout = Config.ADMISSION_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        shared_path = Config.ADMISSION_SHARED_PATH if shared_path is None else shared_path
+        # A lease outlives the slowest single attempt
+        self.shared = (SharedLimits(shared_path, name, Config.POCKETBASE_TIMEOUT_IMPORT + 5)
+                       if shared_path else None)
+        self.tokens = self.burst
+        self.in_flight = 0
+        self.admitted_total = 0
+        self.queued_total = 0
+        self.rejected_total = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+        self._updated = time.monotonic()
+        self._queue: Deque[_Waiter] = deque()
+        self._leases: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should have drained"""
+        depth = len(self._queue) + 1
+        estimate = depth / self.rate if self.rate else self.queue_timeout
+        return max(int(math.ceil(min(estimate, self.queue_timeout or estimate))), 1)
+
+    def saturated(self) -> bool:
+        """Whether a new caller would most likely be rejected"""
+        if self.max_queue and len(self._queue) >= self.max_queue:
+            return True
+        return bool(self.rate and self.queue_timeout
+                    and len(self._queue) / self.rate > self.queue_timeout)
+
+    @contextmanager
+    def slot(self):
+        """Hold an admission slot for one PocketBase call, waiting for it if needed"""
+        lease = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(lease)
+
+    @asynccontextmanager
+    async def aslot(self):
+        lease = await self.aacquire()
+        try:
+            yield
+        finally:
+            self.release(lease)
+
+    def acquire(self) -> Optional[str]:
+        started = time.monotonic()
+        waiter = self._enqueue(started, None)
+        while not waiter.granted:
+            waiter.event.wait(self._wait_time(waiter))
+            self._check(waiter)
+        return self._admitted(waiter, started)
+
+    async def aacquire(self) -> Optional[str]:
+        started = time.monotonic()
+        waiter = self._enqueue(started, asyncio.get_running_loop())
+        try:
+            while not waiter.granted:
+                await asyncio.wait([waiter.future], timeout=self._wait_time(waiter))
+                self._check(waiter)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        return self._admitted(waiter, started)
+
+    def release(self, lease: Optional[str]):
+        if lease is not None:
+            self.shared.release(lease)
+        with self._lock:
+            self.in_flight -= 1
+            self._dispatch()
+
+    def _abandon(self, waiter: _Waiter):
+        """Give back the place or the slot of a waiter whose task was cancelled"""
+        with self._lock:
+            if not waiter.granted:
+                self._queue.remove(waiter)
+                ADMISSION_QUEUE_DEPTH.set(len(self._queue), backend=self.name)
+                return
+            lease = self._leases.pop(id(waiter), None)
+        self.release(lease)
+
+    def _enqueue(self, now: float, loop) -> _Waiter:
+        waiter = _Waiter(now + self.queue_timeout if self.queue_timeout else math.inf, loop)
+        with self._lock:
+            if self.max_queue and len(self._queue) >= self.max_queue:
+                self._reject(waiter, "queue full")
+            self._queue.append(waiter)
+            self._dispatch()
+            if not waiter.granted:
+                self.queued_total += 1
+            ADMISSION_QUEUE_DEPTH.set(len(self._queue), backend=self.name)
+        return waiter
+
+    def _wait_time(self, waiter: _Waiter) -> Optional[float]:
+        """How long to sleep before re-checking: a token may be due before anyone releases"""
+        timeout = waiter.deadline - time.monotonic()
+        if self.shared is not None:
+            timeout = min(timeout, SHARED_POLL_INTERVAL)
+        elif self.rate and self.tokens < 1:
+            timeout = min(timeout, (1 - self.tokens) / self.rate)
+        # No deadline and nothing to poll for: sleep until woken
+        return None if timeout == math.inf else max(timeout, 0)
+
+    def _check(self, waiter: _Waiter):
+        with self._lock:
+            if not waiter.granted:
+                self._dispatch()
+            if not waiter.granted and time.monotonic() >= waiter.deadline:
+                self._queue.remove(waiter)
+                ADMISSION_QUEUE_DEPTH.set(len(self._queue), backend=self.name)
+                self._reject(waiter, "queue timeout")
+
+    def _reject(self, waiter: _Waiter, reason: str):
+        self.rejected_total += 1
+        ADMISSION_REJECTIONS.inc(reason=reason.replace(' ', '_'))
+        logger.warning("PocketBase call rejected: %s", reason, extra={"queue_depth": len(self._queue)})
+        raise AdmissionRejectedError(self.name, reason, self.retry_after())
+
+    def _admitted(self, waiter: _Waiter, started: float) -> Optional[str]:
+        waited = time.monotonic() - started
+        ADMISSION_WAIT.observe(waited)
+        with self._lock:
+            self.admitted_total += 1
+            self.wait_seconds_total += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            return self._leases.pop(id(waiter), None)
+
+    def _dispatch(self):
+        """Admit queued callers in order while the limits allow. Caller holds the lock"""
+        now = time.monotonic()
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        while self._queue:
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                break
+            if self.shared is not None:
+                lease = self.shared.try_acquire(self.rate, self.burst, self.max_in_flight)
+                if lease is None:
+                    break
+            else:
+                if self.rate and self.tokens < 1:
+                    break
+                lease = None
+                if self.rate:
+                    self.tokens -= 1
+            waiter = self._queue.popleft()
+            if lease is not None:
+                self._leases[id(waiter)] = lease
+            self.in_flight += 1
+            waiter.granted = True
+            waiter.wake()
+        ADMISSION_QUEUE_DEPTH.set(len(self._queue), backend=self.name)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "shared": self.shared.path if self.shared is not None else None,
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._queue),
+                "admitted_total": self.admitted_total,
+                "queued_total": self.queued_total,
+                "rejected_total": self.rejected_total,
+                "mean_wait_ms": round(self.wait_seconds_total / self.admitted_total * 1000, 2)
+                if self.admitted_total else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+            }
+
+
+_controllers: Dict[str, AdmissionController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_admission(base_url: str) -> AdmissionController:
+    """Process-wide admission controller of one PocketBase instance."""
+    with _controllers_lock:
+        controller = _controllers.get(base_url)
+        if controller is None:
+            controller = _controllers[base_url] = AdmissionController(base_url)
+        return controller
+
+
+def admission_stats() -> Dict[str, Dict]:
+    with _controllers_lock:
+        controllers = dict(_controllers)
+    return {base_url: controller.stats() for base_url, controller in controllers.items()}
+
+
+def reset_admission():
+    """Forget every controller and its counters (used by tests)."""
+    with _controllers_lock:
+        _controllers.clear()
@@ -0,0 +1,196 @@
+import asyncio
+import httpx
+import logging
+from ..config import Config
+from ..services.admission import get_admission
+from ..services.http_pool import http_clients
+from ..services.metrics import timed_operation
+from ..services.pocketbase_service import TenantIdConflictError, is_unique_violation, json_body
+from ..services.resilience import METHOD_OPERATIONS, get_resilience
+from ..services.token_manager import AdminTokenManager, get_token_manager
+from ..utils import json_codec
+from ..utils.profiling import network_wait
+from typing import Optional, Dict, Union
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPocketBaseService:
+    """asyncio counterpart of PocketBaseService built on httpx.AsyncClient"""
+
+    def __init__(self, token_manager: Optional[AdminTokenManager] = None,
+                 client: Optional[httpx.AsyncClient] = None, base_url: Optional[str] = None):
+        self.base_url = base_url or Config.POCKETBASE_URL
+        self.admin_email = Config.POCKETBASE_ADMIN_EMAIL
+        self.admin_password = Config.POCKETBASE_ADMIN_PASSWORD
+        # The shared pool is only usable on the registry's loop; elsewhere own a client
+        self.client = client or http_clients.get_async_client(self.base_url)
+        self._owns_client = self.client is None
+        if self._owns_client:
+            self.client = httpx.AsyncClient(verify=False)
+        # Same process-wide token cache as the synchronous PocketBaseService
+        self.tokens = token_manager or get_token_manager(self.base_url, self.admin_email)
+        self.resilience = get_resilience(self.base_url)
+        self.admission = get_admission(self.base_url)
+        self._auth_lock = asyncio.Lock()
+
+    @property
+    def token(self) -> Optional[str]:
+        return self.tokens.token
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._owns_client:
+            await self.client.aclose()
+
+    @timed_operation('auth', error_result=False)
+    async def authenticate(self) -> bool:
+        """Authenticate with PocketBase admin credentials"""
+        try:
+            response = await self._request(
+                "auth", "post",
+                f"{self.base_url}/api/admins/auth-with-password",
+                json={
+                    "identity": self.admin_email,
+                    "password": self.admin_password
+                }
+            )
+            if response.status_code in (400, 401, 403):
+                logger.error("Authentication rejected with status %s", response.status_code)
+                return False
+            response.raise_for_status()
+            token = response.json().get('token')
+            if not token:
+                return False
+            self.tokens.store(token)
+            return True
+        except Exception as e:
+            logger.error("Authentication failed: %s", e)
+            return False
+
+    async def _ensure_token(self, stale: Optional[str] = None) -> bool:
+        """Authenticate once even when many tasks need a token at the same time"""
+        if self.tokens.is_fresh() and self.token != stale:
+            return True
+        async with self._auth_lock:
+            if self.tokens.is_fresh() and self.token != stale:
+                return True
+            return await self.authenticate()
+
+    async def _request(self, operation: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request with the operation's timeout, retries and circuit breaker"""
+        send = getattr(self.client, method)
+
+        async def attempt(timeout: float) -> httpx.Response:
+            async with self.admission.aslot():
+                with network_wait():
+                    return await send(url, timeout=timeout, **kwargs)
+        return await self.resilience.acall(operation, attempt)
+
+    async def _send(self, method: str, url: str, operation: Optional[str] = None,
+                    headers: Optional[Dict] = None, **kwargs) -> httpx.Response:
+        """Send an admin request, re-authenticating and retrying once on 401"""
+        operation = operation or METHOD_OPERATIONS[method]
+        headers = headers or {}
+        token = self.token
+        response = await self._request(operation, method, url,
+                                       headers={**headers, "Authorization": token}, **kwargs)
+        if response.status_code == 401 and await self._ensure_token(stale=token):
+            response = await self._request(operation, method, url,
+                                           headers={**headers, "Authorization": self.token}, **kwargs)
+        return response
+
+    @timed_operation('create_collection')
+    async def create_collection(self, collection_data: Union[Dict, bytes]) -> Optional[Dict]:
+        """Create a new collection in PocketBase
+
+        Given a payload pre-rendered to JSON bytes, only {"id": ...} is read from the response.
+        """
+        if not await self._ensure_token():
+            return None
+
+        try:
+            response = await self._send(
+                "post",
+                f"{self.base_url}/api/collections",
+                **json_body(collection_data)
+            )
+            response.raise_for_status()
+            if isinstance(collection_data, bytes):
+                collection_id = json_codec.object_id(response.content)
+                if not collection_id:
+                    raise ValueError("response has no collection id")
+                return {"id": collection_id}
+            return response.json()
+        except Exception as e:
+            logger.error("Error creating collection: %s", e)
+            return None
+
+    @timed_operation('update_collection')
+    async def update_collection(self, collection_id: str, update_data: Union[Dict, bytes]) -> Optional[Dict]:
+        """Update an existing collection
+
+        Given a payload pre-rendered to JSON bytes, the response is not parsed.
+        """
+        if not await self._ensure_token():
+            return None
+
+        try:
+            response = await self._send(
+                "patch",
+                f"{self.base_url}/api/collections/{collection_id}",
+                **json_body(update_data)
+            )
+            response.raise_for_status()
+            if isinstance(update_data, bytes):
+                return {"id": collection_id}
+            return response.json()
+        except Exception as e:
+            logger.error("Error updating collection: %s", e)
+            return None
+
+    @timed_operation('delete_collection', error_result=False)
+    async def delete_collection(self, collection_id: str) -> bool:
+        """Delete a collection and its records. True if it is gone, including when it already was"""
+        if not await self._ensure_token():
+            return False
+
+        try:
+            response = await self._send(
+                "delete",
+                f"{self.base_url}/api/collections/{collection_id}"
+            )
+            if response.status_code == 404:
+                return True
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            logger.error("Error deleting collection %s: %s", collection_id, e)
+            return False
+
+    @timed_operation('create_tenant')
+    async def create_tenant(self, tenant_data: Dict) -> Optional[Dict]:
+        """Create a new tenant record. Raises TenantIdConflictError if the tenant_id is taken"""
+        if not await self._ensure_token():
+            return None
+
+        try:
+            response = await self._send(
+                "post",
+                f"{self.base_url}/api/collections/vms_tenants/records",
+                json=tenant_data
+            )
+            if is_unique_violation(response, "tenant_id"):
+                raise TenantIdConflictError(tenant_data.get("tenant_id"))
+            response.raise_for_status()
+            return response.json()
+        except TenantIdConflictError:
+            raise
+        except Exception as e:
+            logger.error("Error creating tenant: %s", e)
+            return None
@@ -0,0 +1,73 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from typing import Dict, Iterator, List, Optional
+from ..config import Config
+from .tenant_service import TenantService
+
+logger = logging.getLogger(__name__)
+
+# Caps concurrently provisioning tenants across every batch in this process
+_tenant_slots: Optional[threading.BoundedSemaphore] = None
+_tenant_slots_lock = threading.Lock()
+
+
+def get_tenant_slots() -> threading.BoundedSemaphore:
+    global _tenant_slots
+    with _tenant_slots_lock:
+        if _tenant_slots is None:
+            _tenant_slots = threading.BoundedSemaphore(Config.BATCH_CONCURRENCY)
+        return _tenant_slots
+
+
+class BatchProvisioner:
+    """Provision many tenants concurrently, yielding each result as it completes.
+
+    Every tenant goes through TenantService, so the batch shares the
+    process-wide admin token and connection pool. At most
+    BATCH_CONCURRENCY tenants are provisioned at once, across all batches.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, strategy: Optional[str] = None,
+                 app=None):
+        self.concurrency = concurrency or Config.BATCH_CONCURRENCY
+        self.strategy = strategy
+        # With an app, each tenant's provisioning is journaled and resumable
+        self.app = app
+
+    def provision_one(self, index: int, tenant_name: str) -> Dict:
+        with get_tenant_slots(), (self.app.app_context() if self.app else nullcontext()):
+            started = time.perf_counter()
+            try:
+                result = TenantService(strategy=self.strategy).create_tenant_configuration(
+                    tenant_name)
+            except Exception as e:
+                logger.exception("Batch provisioning of %s crashed: %s", tenant_name, e)
+                result = None
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        if not result:
+            return {"index": index, "name": tenant_name, "status": "error",
+                    "message": "Failed to create tenant configuration",
+                    "duration_ms": duration_ms}
+        return {"index": index, "name": tenant_name, **result, "duration_ms": duration_ms}
+
+    def provision(self, tenant_names: List[str]) -> Iterator[Dict]:
+        """Yield one result per tenant in completion order"""
+        workers = max(min(self.concurrency, len(tenant_names)), 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch') as executor:
+            futures = [executor.submit(self.provision_one, index, name)
+                       for index, name in enumerate(tenant_names)]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def summarize(self, results: List[Dict], started: float) -> Dict:
+        succeeded = sum(1 for result in results if result["status"] == "success")
+        return {
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
@@ -0,0 +1,226 @@
+import asyncio
+import atexit
+import importlib.util
+import logging
+import os
+import threading
+from typing import Any, Coroutine, Dict, Optional
+import httpx
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+POOL_SETTINGS = (
+    'HTTP_POOL_MAX_CONNECTIONS', 'HTTP_POOL_MAX_KEEPALIVE', 'HTTP_KEEPALIVE_EXPIRY',
+    'HTTP_CONNECT_TIMEOUT', 'HTTP_READ_TIMEOUT', 'HTTP2', 'HTTP_VERIFY_SSL',
+)
+
+
+class _CountingTransport(httpx.BaseTransport):
+    """Keeps the registry's in-flight and total request counters."""
+
+    def __init__(self, transport: httpx.HTTPTransport, registry: 'HttpClientRegistry'):
+        self.transport = transport
+        self.registry = registry
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.registry._enter()
+        try:
+            return self.transport.handle_request(request)
+        finally:
+            self.registry._exit()
+
+    def close(self):
+        self.transport.close()
+
+
+class _AsyncCountingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncHTTPTransport, registry: 'HttpClientRegistry'):
+        self.transport = transport
+        self.registry = registry
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.registry._enter()
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            self.registry._exit()
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class HttpClientRegistry:
+    """App-scoped httpx clients shared by every PocketBaseService.
+
+    One pooled `httpx.Client` per PocketBase base URL keeps TCP/TLS
+    connections alive across requests. Async provisioning runs on a single
+    background event loop so its `httpx.AsyncClient` pool can be shared too.
+    Clients are dropped in a forked child (the parent owns those sockets) and
+    closed at interpreter exit.
+    """
+
+    def __init__(self):
+        self.settings = {key: getattr(Config, key) for key in POOL_SETTINGS}
+        self._clients: Dict[str, httpx.Client] = {}
+        self._async_clients: Dict[str, httpx.AsyncClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._pid = os.getpid()
+        self.in_flight = 0
+        self.requests_total = 0
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def init_app(self, app):
+        """Read pool settings from the app config and register the registry on the app."""
+        self.settings = {key: app.config.get(key, getattr(Config, key))
+                         for key in POOL_SETTINGS}
+        app.extensions['http_clients'] = self
+
+    def transport_options(self) -> Dict[str, Any]:
+        """Keyword arguments shared by the sync and async transports."""
+        settings = self.settings
+        http2 = bool(settings['HTTP2'])
+        if http2 and importlib.util.find_spec('h2') is None:
+            logger.warning("HTTP2 is enabled but the 'h2' package is missing; using HTTP/1.1")
+            http2 = False
+        return {
+            'verify': settings['HTTP_VERIFY_SSL'],
+            'http2': http2,
+            'limits': httpx.Limits(
+                max_connections=settings['HTTP_POOL_MAX_CONNECTIONS'],
+                max_keepalive_connections=settings['HTTP_POOL_MAX_KEEPALIVE'],
+                keepalive_expiry=settings['HTTP_KEEPALIVE_EXPIRY'],
+            ),
+        }
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.settings['HTTP_READ_TIMEOUT'],
+                             connect=self.settings['HTTP_CONNECT_TIMEOUT'])
+
+    def get_client(self, base_url: Optional[str] = None) -> httpx.Client:
+        """Pooled client for a PocketBase instance, created on first use."""
+        key = base_url or Config.POCKETBASE_URL
+        self._check_pid()
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                transport = httpx.HTTPTransport(**self.transport_options())
+                client = self._clients[key] = httpx.Client(
+                    transport=_CountingTransport(transport, self),
+                    timeout=self.timeout())
+            return client
+
+    def get_async_client(self, base_url: Optional[str] = None) -> Optional[httpx.AsyncClient]:
+        """Pooled async client, only available to code running on `run_async`'s loop."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        if running is not self._loop:
+            return None
+        key = base_url or Config.POCKETBASE_URL
+        client = self._async_clients.get(key)
+        if client is None:
+            transport = httpx.AsyncHTTPTransport(**self.transport_options())
+            client = self._async_clients[key] = httpx.AsyncClient(
+                transport=_AsyncCountingTransport(transport, self),
+                timeout=self.timeout())
+        return client
+
+    def run_async(self, coro: Coroutine) -> Any:
+        """Run a coroutine on the shared background loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop()).result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool usage, for sizing HTTP_POOL_MAX_CONNECTIONS / HTTP_POOL_MAX_KEEPALIVE."""
+        pools = {}
+        for kind, clients in (('sync', self._clients), ('async', self._async_clients)):
+            for base_url, client in list(clients.items()):
+                pool = getattr(getattr(client._transport, 'transport', None), '_pool', None)
+                connections = getattr(pool, 'connections', [])
+                pools[f"{kind}:{base_url}"] = {
+                    'connections': len(connections),
+                    'idle': sum(1 for c in connections if c.is_idle()),
+                }
+        return {
+            'pid': self._pid,
+            'in_flight': self.in_flight,
+            'requests_total': self.requests_total,
+            'max_connections': self.settings['HTTP_POOL_MAX_CONNECTIONS'],
+            'max_keepalive_connections': self.settings['HTTP_POOL_MAX_KEEPALIVE'],
+            'pools': pools,
+        }
+
+    def close(self):
+        """Close every client and stop the background loop."""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+            async_clients, self._async_clients = self._async_clients, {}
+            loop, self._loop = self._loop, None
+            thread, self._loop_thread = self._loop_thread, None
+        for client in clients.values():
+            client.close()
+        if loop is not None:
+            if async_clients:
+                asyncio.run_coroutine_threadsafe(
+                    self._aclose_all(async_clients), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def reset(self):
+        """Close everything; clients are recreated lazily on next use."""
+        self.close()
+        with self._stats_lock:
+            self.in_flight = 0
+            self.requests_total = 0
+
+    async def _aclose_all(self, clients: Dict[str, httpx.AsyncClient]):
+        for client in clients.values():
+            await client.aclose()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        self._check_pid()
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name='http-pool-loop', daemon=True)
+                self._loop_thread.start()
+            return self._loop
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._after_fork()
+
+    def _after_fork(self):
+        # Sockets and the loop thread belong to the parent: forget them, never close them
+        self._clients = {}
+        self._async_clients = {}
+        self._loop = None
+        self._loop_thread = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._pid = os.getpid()
+        self.in_flight = 0
+        self.requests_total = 0
+
+    def _enter(self):
+        with self._stats_lock:
+            self.in_flight += 1
+            self.requests_total += 1
+
+    def _exit(self):
+        with self._stats_lock:
+            self.in_flight -= 1
+
+
+http_clients = HttpClientRegistry()
@@ -0,0 +1,270 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+from ..config import Config
+from ..extensions import db
+from ..models import ProvisioningJob
+from ..models.provisioning_job import utcnow
+from ..utils.cache import TTLCache
+from .metrics import ONBOARDINGS_COALESCED
+from .progress import progress_broker
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when JOB_QUEUE_MAX jobs are already waiting"""
+
+
+class JobQueue:
+    """Bounded worker pool running tenant provisioning outside the request thread.
+
+    Job state lives in the `provisioning_jobs` table so any worker process
+    can report it. Progress is written at most every JOB_PROGRESS_INTERVAL
+    seconds to keep database writes off the provisioning hot path.
+    `submit_once` hands duplicates of a running (or just succeeded)
+    onboarding the existing job instead of queueing another. Jobs left
+    queued or running by a process that died are failed once they have not
+    been updated for PROVISIONING_RUN_STALE seconds.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.max_workers = Config.JOB_WORKERS
+        self.max_queued = Config.JOB_QUEUE_MAX
+        self.progress_interval = Config.JOB_PROGRESS_INTERVAL
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        # Onboarding key -> job_id, while the job runs and for a while after it succeeded
+        self._coalesced: Dict[Hashable, str] = {}
+        self._job_keys: Dict[str, Hashable] = {}
+        self._recent = TTLCache(1024, Config.ONBOARDING_COALESCE_WINDOW)
+        self._submit_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = app.config.get('JOB_WORKERS', Config.JOB_WORKERS)
+        self.max_queued = app.config.get('JOB_QUEUE_MAX', Config.JOB_QUEUE_MAX)
+        self.progress_interval = app.config.get('JOB_PROGRESS_INTERVAL',
+                                                Config.JOB_PROGRESS_INTERVAL)
+        self._recent = TTLCache(1024, app.config.get('ONBOARDING_COALESCE_WINDOW',
+                                                     Config.ONBOARDING_COALESCE_WINDOW))
+        app.extensions['job_queue'] = self
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            # Worker threads do not survive a fork; start a fresh pool in the child
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='provisioning')
+                self._futures = {}
+                self._pending = 0
+                self._coalesced.clear()
+                self._job_keys.clear()
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit_once(self, key: Hashable, tenant_name: str, strategy: Optional[str] = None,
+                    idempotency_key: Optional[str] = None) -> Tuple[ProvisioningJob, bool]:
+        """The job of an identical onboarding if one is running or just succeeded, else a new one
+
+        Returns the job and whether it already existed.
+        """
+        with self._submit_lock:
+            with self._lock:
+                job_id = self._coalesced.get(key)
+            job_id = job_id or self._recent.get(key)
+            # Another app (and database) may have registered the key, e.g. in tests
+            job = db.session.get(ProvisioningJob, job_id) if job_id else None
+            if job is not None:
+                ONBOARDINGS_COALESCED.inc(mode='job')
+                return job, True
+            return self.submit(tenant_name, strategy, idempotency_key, coalesce_key=key), False
+
+    def submit(self, tenant_name: str, strategy: Optional[str] = None,
+               idempotency_key: Optional[str] = None,
+               coalesce_key: Optional[Hashable] = None) -> ProvisioningJob:
+        """Record a queued job and hand it to the worker pool"""
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending >= self.max_queued:
+                raise QueueFullError(f"{self._pending} provisioning jobs already queued")
+            self._pending += 1
+
+        job = ProvisioningJob(tenant_name=tenant_name, status=ProvisioningJob.QUEUED)
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                self._pending -= 1
+            raise
+        if coalesce_key is not None:
+            with self._lock:
+                self._coalesced[coalesce_key] = job.id
+                self._job_keys[job.id] = coalesce_key
+
+        # Open the channel before the worker can publish so no event is missed
+        progress_broker.open(job.id).publish(
+            {"event": "job_queued", "job_id": job.id, "tenant_name": tenant_name})
+        future = executor.submit(self._run, job.id, strategy, idempotency_key)
+        self._futures[job.id] = future
+        future.add_done_callback(lambda _: self._futures.pop(job.id, None))
+        return job
+
+    def fail_abandoned(self, jobs: Optional[Iterable[ProvisioningJob]] = None) -> int:
+        """Fail the given (default: all) queued or running jobs that no worker is updating anymore"""
+        cutoff = utcnow() - timedelta(seconds=Config.PROVISIONING_RUN_STALE)
+        if jobs is None:
+            jobs = ProvisioningJob.query.filter(
+                ProvisioningJob.status.in_((ProvisioningJob.QUEUED, ProvisioningJob.RUNNING)),
+                ProvisioningJob.updated_at < cutoff)
+        failed = 0
+        for job in jobs:
+            # Jobs of this process are alive for as long as their future is
+            if (job.status not in (ProvisioningJob.QUEUED, ProvisioningJob.RUNNING)
+                    or job.updated_at >= cutoff or job.id in self._futures):
+                continue
+            job.status = ProvisioningJob.FAILED
+            job.error = "Abandoned: the process running the job stopped"
+            job.finished_at = utcnow()
+            failed += 1
+        if failed:
+            db.session.commit()
+            logger.warning("Failed %d abandoned provisioning jobs", failed)
+        return failed
+
+    def wait(self, job_id: str, timeout: Optional[float] = None):
+        """Block until a job submitted by this process has finished"""
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout)
+
+    def _run(self, job_id: str, strategy: Optional[str] = None,
+             idempotency_key: Optional[str] = None):
+        from .tenant_service import TenantService
+
+        with self.app.app_context():
+            job = db.session.get(ProvisioningJob, job_id)
+            with self._lock:
+                self._pending -= 1
+            if job.status != ProvisioningJob.QUEUED:
+                # Given up on as abandoned by another process while it waited here
+                progress_broker.close(job_id)
+                self._finish_coalescing(job_id, False)
+                return
+            tenant_name = job.tenant_name
+            job.status = ProvisioningJob.RUNNING
+            job.started_at = utcnow()
+            db.session.commit()
+            progress_broker.publish(job_id, {"event": "job_started", "job_id": job_id})
+
+            progress = JobProgress(self, job_id)
+            try:
+                result = TenantService(strategy=strategy).create_tenant_configuration(
+                    tenant_name, progress=progress, idempotency_key=idempotency_key)
+            except Exception as e:
+                logger.exception("Provisioning job %s crashed: %s", job_id, e, extra={"job_id": job_id})
+                result = None
+                job.error = str(e)
+
+            progress.flush()
+            db.session.refresh(job)
+            job.finished_at = utcnow()
+            if result:
+                job.status = ProvisioningJob.SUCCEEDED
+                job.tenant_id = result.get("tenant_id")
+                job.result = result
+            else:
+                job.status = ProvisioningJob.FAILED
+                job.error = job.error or "Failed to create tenant configuration"
+            db.session.commit()
+
+            progress_broker.publish(job_id, {
+                "event": "job_succeeded" if result else "job_failed",
+                "job_id": job_id,
+                "result": result,
+                "error": job.error,
+            })
+            progress_broker.close(job_id)
+            self._finish_coalescing(job_id, bool(result))
+
+    def _finish_coalescing(self, job_id: str, succeeded: bool):
+        with self._lock:
+            key = self._job_keys.pop(job_id, None)
+            if key is None:
+                return
+            if self._coalesced.get(key) == job_id:
+                del self._coalesced[key]
+        if succeeded:
+            # Late retries get the finished job; after a failure they start a new one
+            self._recent.set(key, job_id)
+
+    def clear_coalescing(self):
+        with self._lock:
+            self._coalesced.clear()
+            self._job_keys.clear()
+        self._recent.clear()
+
+
+class JobProgress:
+    """Progress hook that folds provisioning events into a job row.
+
+    Events can arrive on the async provisioning loop's thread, so writes use
+    their own app context and are throttled.
+    """
+
+    def __init__(self, queue: JobQueue, job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.tenant_id = None
+        self.collections_total = None
+        self.collections_done = 0
+        self._last_flush = 0.0
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Dict):
+        progress_broker.publish(self.job_id, event)
+        if event["event"] == "tenant_created":
+            progress_broker.alias(event["tenant_id"], self.job_id)
+
+        with self._lock:
+            if event["event"] == "tenant_created":
+                self.tenant_id = event["tenant_id"]
+                self.collections_total = event["collections_total"]
+                self.collections_done = event.get("collections_done", 0)
+                self._last_flush = 0.0  # always record the tenant_id right away
+            elif event["event"] == "collection_created":
+                self.collections_done += 1
+            else:
+                return
+            self._dirty = True
+            due = time.monotonic() - self._last_flush >= self.queue.progress_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._last_flush = time.monotonic()
+            values = {"tenant_id": self.tenant_id,
+                      "collections_total": self.collections_total,
+                      "collections_done": self.collections_done}
+
+        with self.queue.app.app_context():
+            db.session.query(ProvisioningJob).filter_by(id=self.job_id).update(values)
+            db.session.commit()
+
+
+job_queue = JobQueue()
@@ -0,0 +1,263 @@
+import asyncio
+import bisect
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Seconds; wide enough for a single call and a whole 500-collection onboarding
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}",
+                 f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    @contextmanager
+    def track_inprogress(self, **labels) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; each series is [bucket counts..., sum, count]."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._values.get(self._key(labels))
+        return series[-1] if series else 0
+
+    def _samples(self, key, series) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, hits in zip(self.buckets + (math.inf,), series[:-2]):
+            cumulative += hits
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+        lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format.
+
+    Values are per process: with several workers, scrape each one (or put
+    them behind a service that aggregates). Recording is a dict lookup and a
+    short lock, cheap enough for every PocketBase call.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        """Reset every value (used by tests)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+metrics = MetricsRegistry()
+
+POCKETBASE_DURATION = metrics.histogram(
+    'pocketbase_request_duration_seconds',
+    'Latency of PocketBase operations, retries included', ['operation'])
+POCKETBASE_ERRORS = metrics.counter(
+    'pocketbase_request_errors_total',
+    'PocketBase operations that failed', ['operation'])
+PROVISIONING_PHASE_DURATION = metrics.histogram(
+    'provisioning_phase_duration_seconds',
+    'Time spent in each phase of provisioning a tenant', ['phase'])
+PROVISIONINGS = metrics.counter(
+    'provisionings_total',
+    'Finished tenant provisionings by outcome', ['outcome'])
+PROVISIONINGS_IN_FLIGHT = metrics.gauge(
+    'provisionings_in_flight',
+    'Tenant provisionings currently running in this process')
+PROVISIONINGS_IN_FLIGHT.set(0)
+ADMISSION_QUEUE_DEPTH = metrics.gauge(
+    'pocketbase_admission_queue_depth',
+    'PocketBase calls waiting for an admission slot', ['backend'])
+ADMISSION_WAIT = metrics.histogram(
+    'pocketbase_admission_wait_seconds',
+    'Time PocketBase calls waited for an admission slot')
+ADMISSION_REJECTIONS = metrics.counter(
+    'pocketbase_admission_rejections_total',
+    'PocketBase calls rejected by admission control', ['reason'])
+ONBOARDINGS_COALESCED = metrics.counter(
+    'onboardings_coalesced_total',
+    'Duplicate onboarding requests answered by an earlier one', ['mode'])
+WARM_POOL_CLAIMS = metrics.counter(
+    'warm_pool_claims_total',
+    'Onboardings that looked for a warm spare, by outcome', ['outcome'])
+
+
+def timed_operation(operation: str, error_result=None) -> Callable:
+    """Record latency and failures of a PocketBase service method.
+
+    The methods report failure by returning `error_result` (None, or False
+    for boolean ones) rather than raising; exceptions are counted too.
+    """
+    def decorator(f):
+        if asyncio.iscoroutinefunction(f):
+            @functools.wraps(f)
+            async def wrapped_async(*args, **kwargs):
+                started = time.perf_counter()
+                result = error_result
+                try:
+                    result = await f(*args, **kwargs)
+                    return result
+                finally:
+                    POCKETBASE_DURATION.observe(time.perf_counter() - started, operation=operation)
+                    if result is error_result:
+                        POCKETBASE_ERRORS.inc(operation=operation)
+            return wrapped_async
+
+        @functools.wraps(f)
+        def wrapped(*args, **kwargs):
+            started = time.perf_counter()
+            result = error_result
+            try:
+                result = f(*args, **kwargs)
+                return result
+            finally:
+                POCKETBASE_DURATION.observe(time.perf_counter() - started, operation=operation)
+                if result is error_result:
+                    POCKETBASE_ERRORS.inc(operation=operation)
+        return wrapped
+    return decorator
@@ -0,0 +1,124 @@
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, Optional
+from ..config import Config
+from ..models import ProvisioningRun, WarmSpare
+from ..models.provisioning_job import utcnow
+from ..schemas import provisioning_plan
+from .placement import placement_router
+from .pocketbase_service import PocketBaseService
+from .provisioning_journal import ProvisioningJournal
+from .tenant_service import TenantService
+from .warm_pool import warm_pool
+
+logger = logging.getLogger(__name__)
+
+# vms_<tenant_id>_<collection>; tenant_ids are lowercase alphanumerics
+TENANT_COLLECTION = re.compile(rf'^{provisioning_plan.APP_PREFIX}_([a-z0-9]+)_')
+
+
+class OrphanSweeper:
+    """Find and deprovision tenants left behind by failed or abandoned provisionings.
+
+    A tenant is an orphan when PocketBase holds collections under its prefix
+    but no vms_tenants record, or when its provisioning failed (or stopped
+    updating) more than `min_age` seconds ago and never succeeded afterwards.
+    Every configured backend is searched. Tenants are deleted concurrently,
+    each in reverse dependency order, from the backend they were found on.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, min_age: Optional[int] = None,
+                 app=None):
+        self.concurrency = concurrency or Config.BATCH_CONCURRENCY
+        self.min_age = Config.PROVISIONING_RUN_STALE if min_age is None else min_age
+        # Needed to read the provisioning journal and to mark swept runs
+        self.app = app
+        # tenant_id -> backend it was found on by the last find_orphans
+        self.locations: Dict[str, str] = {}
+
+    def find_orphans(self) -> Dict[str, str]:
+        """tenant_id -> why it is considered an orphan"""
+        orphans: Dict[str, str] = {}
+        self.locations = {}
+
+        with self.app.app_context() if self.app else nullcontext():
+            spares = set()
+            if self.app:
+                # Warm pool spares have collections but no record until they are claimed
+                spares = {tenant_id for (tenant_id,) in
+                          WarmSpare.query.with_entities(WarmSpare.tenant_id)}
+            for backend in placement_router.backends():
+                pb = PocketBaseService(base_url=backend)
+                collections = pb.list_collections(f"{provisioning_plan.APP_PREFIX}_")
+                if collections is None:
+                    raise RuntimeError(f"Could not list collections on {backend}")
+                prefixed = {match.group(1) for match in
+                            (TENANT_COLLECTION.match(collection["name"]) for collection in collections)
+                            if match}
+                if not prefixed:
+                    continue
+                known = set(pb.iter_tenant_ids()) | spares
+                for tenant_id in prefixed - known:
+                    orphans[tenant_id] = "no tenant record"
+                    self.locations[tenant_id] = backend
+
+            if self.app and Config.PROVISIONING_JOURNAL:
+                cutoff = utcnow() - timedelta(seconds=self.min_age)
+                runs = (ProvisioningRun.query
+                        .filter(ProvisioningRun.tenant_id.isnot(None))
+                        .filter(ProvisioningRun.status.in_(
+                            (ProvisioningRun.FAILED, ProvisioningRun.RUNNING)))
+                        .filter(ProvisioningRun.updated_at < cutoff))
+                succeeded = {tenant_id for (tenant_id,) in ProvisioningRun.query
+                             .with_entities(ProvisioningRun.tenant_id)
+                             .filter_by(status=ProvisioningRun.SUCCEEDED)}
+                for run in runs:
+                    if run.tenant_id not in succeeded:
+                        orphans.setdefault(run.tenant_id, "failed provisioning")
+
+        return orphans
+
+    def sweep_one(self, tenant_id: str, backend: Optional[str] = None) -> Dict:
+        # No app context here: the journal and placements are updated by `sweep`, from one thread
+        started = time.perf_counter()
+        try:
+            result = TenantService(backend=backend).delete_tenant_configuration(tenant_id)
+        except Exception as e:
+            logger.exception("Sweeping tenant %s crashed: %s", tenant_id, e,
+                             extra={"tenant_id": tenant_id})
+            result = {"tenant_id": tenant_id, "status": "incomplete", "message": str(e)}
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        if result is None:
+            result = {"tenant_id": tenant_id, "status": "not_found"}
+        return {**result, "duration_ms": duration_ms}
+
+    def sweep(self, tenant_ids: Iterable[str]) -> Iterator[Dict]:
+        """Yield one result per tenant in completion order"""
+        tenant_ids = list(tenant_ids)
+        with self.app.app_context() if self.app else nullcontext():
+            # Workers have no app context to tell a spare from a half-deleted tenant
+            spares = warm_pool.unclaimed(tenant_ids) if self.app else set()
+            backends = {tenant_id: self.locations.get(tenant_id) or placement_router.backend_for(tenant_id)
+                        for tenant_id in tenant_ids if tenant_id not in spares}
+        for tenant_id in spares:
+            yield {"tenant_id": tenant_id, "status": "skipped",
+                   "message": "unclaimed warm pool spare", "duration_ms": 0.0}
+        tenant_ids = [tenant_id for tenant_id in tenant_ids if tenant_id not in spares]
+        workers = max(min(self.concurrency, len(tenant_ids)), 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sweep') as executor:
+            futures = [executor.submit(self.sweep_one, tenant_id, backends[tenant_id])
+                       for tenant_id in tenant_ids]
+            for future in as_completed(futures):
+                result = future.result()
+                if result["status"] == "deleted" and self.app:
+                    tenant_id = result["tenant_id"]
+                    with self.app.app_context():
+                        # A leftover copy on another backend keeps the tenant's journal
+                        if placement_router.forget(tenant_id, backends[tenant_id]):
+                            ProvisioningJournal.forget_tenant(tenant_id)
+                yield result
@@ -0,0 +1,283 @@
+import bisect
+import hashlib
+import logging
+import math
+import threading
+from contextlib import nullcontext
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from flask import has_app_context
+from sqlalchemy.exc import IntegrityError
+from ..config import Config
+from ..extensions import db
+from ..models import TenantPlacement
+from ..utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PLACEMENT_POLICIES = ('hash', 'least_loaded')
+
+
+class PlacementConflictError(Exception):
+    """Raised when a tenant_id being placed already has a backend"""
+
+    def __init__(self, tenant_id: str):
+        super().__init__(f"tenant_id {tenant_id} is already placed")
+        self.tenant_id = tenant_id
+
+
+def configured_backends() -> List[str]:
+    """POCKETBASE_URLS, or POCKETBASE_URL alone when it is not set"""
+    urls = [url.strip() for url in Config.POCKETBASE_URLS.split(',') if url.strip()]
+    return urls or [Config.POCKETBASE_URL]
+
+
+def _point(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent hashing of tenant_ids onto backends.
+
+    Every backend owns `vnodes` points on the ring and a tenant_id belongs to
+    the first point at or after its own hash, so adding a backend only takes
+    over roughly 1/N of the tenant_ids and leaves the rest where they were.
+    """
+
+    def __init__(self, backends: Iterable[str], vnodes: int = 128):
+        points = sorted((_point(f"{backend}#{n}"), backend)
+                        for backend in backends for n in range(vnodes))
+        self._points = [point for point, _ in points]
+        self._backends = [backend for _, backend in points]
+
+    def node_for(self, key: str) -> str:
+        index = bisect.bisect(self._points, _point(key)) % len(self._points)
+        return self._backends[index]
+
+
+class PlacementRouter:
+    """Decides which PocketBase backend holds each tenant and remembers it.
+
+    With one backend configured everything goes to it and nothing is recorded.
+    With several, a new tenant_id is placed by PLACEMENT_POLICY and recorded in
+    `tenant_placements`, whose primary key also keeps tenant_ids unique across
+    backends. Tenants without a row predate sharding and live on POCKETBASE_URL.
+    Recording and forgetting placements need an app context; lookups fall back
+    to the app given to init_app and are cached for PLACEMENT_CACHE_TTL seconds.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._cache = TTLCache(65536, Config.PLACEMENT_CACHE_TTL)
+        self._ring: Optional[HashRing] = None
+        self._ring_key = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        policy = app.config.get('PLACEMENT_POLICY') or 'hash'
+        if policy not in PLACEMENT_POLICIES:
+            raise ValueError(f"Unknown placement policy {policy!r}")
+        self.app = app
+        self._cache = TTLCache(65536, float(app.config.get('PLACEMENT_CACHE_TTL') or 60))
+        app.extensions['placement'] = self
+
+    @property
+    def home(self) -> str:
+        """Backend of the tenants that have no recorded placement"""
+        return Config.POCKETBASE_URL
+
+    def backends(self) -> List[str]:
+        return configured_backends()
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.backends()) > 1
+
+    def ring(self) -> HashRing:
+        key = (tuple(self.backends()), Config.PLACEMENT_VNODES)
+        with self._lock:
+            if self._ring_key != key:
+                self._ring = HashRing(key[0], key[1])
+                self._ring_key = key
+            return self._ring
+
+    def _lookup_context(self):
+        if has_app_context() or self.app is None:
+            return nullcontext()
+        return self.app.app_context()
+
+    def choose(self, tenant_id: str) -> str:
+        """Backend PLACEMENT_POLICY picks for a new tenant_id, without recording it"""
+        backends = self.backends()
+        if len(backends) == 1:
+            return backends[0]
+        if Config.PLACEMENT_POLICY == 'least_loaded':
+            load = self.load()
+            return min(backends, key=lambda backend: load.get(backend, 0))
+        return self.ring().node_for(tenant_id)
+
+    def place(self, tenant_id: str, backend: Optional[str] = None) -> str:
+        """Record the backend of a new tenant_id. Raises PlacementConflictError if it has one"""
+        backend = backend or self.choose(tenant_id)
+        if not self.sharded:
+            return backend
+        if not has_app_context():
+            raise RuntimeError("Placing a tenant needs an app context")
+        db.session.add(TenantPlacement(tenant_id=tenant_id, backend=backend))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            raise PlacementConflictError(tenant_id)
+        self._cache.set(tenant_id, backend)
+        return backend
+
+    def backend_for(self, tenant_id: str) -> str:
+        """Backend holding an existing tenant"""
+        backends = self.backends()
+        if len(backends) == 1:
+            return backends[0]
+        cached = self._cache.get(tenant_id)
+        if cached is not None:
+            return cached
+        with self._lookup_context():
+            placement = db.session.get(TenantPlacement, tenant_id)
+            backend = placement.backend if placement is not None else None
+        if backend is None:
+            # Not cached: a placement may be recorded for it any moment
+            return self.home
+        self._cache.set(tenant_id, backend)
+        return backend
+
+    def move(self, tenant_id: str, backend: str):
+        """Record that a tenant now lives on `backend`"""
+        placement = db.session.get(TenantPlacement, tenant_id)
+        if placement is None:
+            db.session.add(TenantPlacement(tenant_id=tenant_id, backend=backend))
+        else:
+            placement.backend = backend
+        db.session.commit()
+        self._cache.set(tenant_id, backend)
+
+    def forget(self, tenant_id: str, backend: Optional[str] = None) -> bool:
+        """Drop the placement of a tenant deleted from `backend`
+
+        False when the tenant lives on another backend (the deleted copy was a
+        leftover), or when there is no app context to record it in.
+        """
+        if not self.sharded:
+            return True
+        if not has_app_context():
+            return False
+        placement = db.session.get(TenantPlacement, tenant_id)
+        if placement is None:
+            return backend is None or backend == self.home
+        if backend is not None and placement.backend != backend:
+            return False
+        db.session.delete(placement)
+        db.session.commit()
+        self._cache.invalidate(tenant_id)
+        return True
+
+    def load(self) -> Dict[str, int]:
+        """Placed tenants per backend"""
+        with self._lookup_context():
+            rows = (db.session.query(TenantPlacement.backend, db.func.count())
+                    .group_by(TenantPlacement.backend).all())
+        return dict(rows)
+
+    def iter_tenant_ids(self, page_size: int = 500) -> Iterator[str]:
+        """Every tenant_id with a record on any backend, noting where it was found"""
+        from .pocketbase_service import PocketBaseService
+
+        sharded = self.sharded
+        for backend in self.backends():
+            for tenant_id in PocketBaseService(base_url=backend).iter_tenant_ids(page_size):
+                if sharded:
+                    self._cache.set(tenant_id, backend)
+                yield tenant_id
+
+    def sync(self) -> Dict:
+        """Record the placement of tenants found on a backend without one. Needs an app context
+
+        Run once when sharding is turned on, so tenants created before it count
+        towards the load and their tenant_ids cannot be placed again elsewhere.
+        """
+        from .pocketbase_service import PocketBaseService
+
+        placed = dict(db.session.query(TenantPlacement.tenant_id, TenantPlacement.backend))
+        found: Dict[str, str] = {}
+        duplicates: Dict[str, List[str]] = {}
+        for backend in self.backends():
+            for tenant_id in PocketBaseService(base_url=backend).iter_tenant_ids():
+                if tenant_id in found:
+                    duplicates.setdefault(tenant_id, [found[tenant_id]]).append(backend)
+                    continue
+                found[tenant_id] = backend
+
+        recorded = 0
+        for tenant_id, backend in found.items():
+            if tenant_id in placed or tenant_id in duplicates:
+                continue
+            db.session.add(TenantPlacement(tenant_id=tenant_id, backend=backend))
+            recorded += 1
+        db.session.commit()
+        for tenant_id, backends in duplicates.items():
+            logger.warning("tenant_id %s has a record on several backends: %s",
+                           tenant_id, ", ".join(backends), extra={"tenant_id": tenant_id})
+        missing = [tenant_id for tenant_id, backend in placed.items()
+                   if found.get(tenant_id) != backend and tenant_id not in duplicates]
+        return {"recorded": recorded, "tenants": len(found),
+                "duplicates": duplicates, "placed_without_record": sorted(missing)}
+
+    def plan_rebalance(self, exclude: Optional[Set[str]] = None) -> List[Tuple[str, str, str]]:
+        """(tenant_id, from, to) for the tenants PLACEMENT_POLICY would now put elsewhere
+
+        'hash' moves the tenants whose ring position belongs to another backend,
+        'least_loaded' moves the newest tenants off backends holding more than
+        their share. Tenants on backends that are no longer configured always move.
+        """
+        exclude = exclude or set()
+        backends = self.backends()
+        rows = [(tenant_id, backend) for tenant_id, backend in
+                db.session.query(TenantPlacement.tenant_id, TenantPlacement.backend)
+                .order_by(TenantPlacement.created_at.desc())
+                if tenant_id not in exclude]
+        if Config.PLACEMENT_POLICY != 'least_loaded':
+            ring = self.ring()
+            return [(tenant_id, backend, ring.node_for(tenant_id)) for tenant_id, backend in rows
+                    if ring.node_for(tenant_id) != backend]
+
+        load = {backend: 0 for backend in backends}
+        for _, backend in rows:
+            load[backend] = load.get(backend, 0) + 1
+        share = math.ceil(len(rows) / len(backends)) if backends else 0
+        moves = []
+        for tenant_id, backend in rows:
+            if backend in backends and load[backend] <= share:
+                continue
+            target = min(backends, key=lambda candidate: load[candidate])
+            if backend in backends and load[target] + 1 > load[backend] - 1:
+                continue
+            load[backend] -= 1
+            load[target] += 1
+            moves.append((tenant_id, backend, target))
+        return moves
+
+    def stats(self) -> Dict:
+        load = self.load() if self.sharded else {}
+        return {
+            "policy": Config.PLACEMENT_POLICY,
+            "home": self.home,
+            "backends": [{"url": backend, "tenants": load.get(backend, 0)}
+                         for backend in self.backends()],
+            "cache": self._cache.stats(),
+        }
+
+    def reset(self):
+        self._cache.clear()
+        with self._lock:
+            self._ring = None
+            self._ring_key = None
+
+
+placement_router = PlacementRouter()
@@ -1,95 +1,382 @@
 import httpx
+import logging
 from ..config import Config
+from ..services.admission import get_admission
+from ..services.http_pool import http_clients
+from ..services.metrics import timed_operation
+from ..services.resilience import METHOD_OPERATIONS, get_resilience
+from ..services.token_manager import AdminTokenManager, get_token_manager
+from ..utils import json_codec
 from ..utils.helpers import generate_random_string
-from typing import Optional, Dict
+from ..utils.profiling import network_wait
+from typing import Optional, Dict, Iterator, List, Union
+
+logger = logging.getLogger(__name__)
+
+TENANT_ID_INDEX = "CREATE UNIQUE INDEX `idx_vms_tenants_tenant_id` ON `vms_tenants` (`tenant_id`)"
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class TenantIdConflictError(Exception):
+    """Raised when a tenant record is rejected because its tenant_id is taken"""
+
+    def __init__(self, tenant_id: str):
+        super().__init__(f"tenant_id {tenant_id} already exists")
+        self.tenant_id = tenant_id
+
+
+def is_unique_violation(response: httpx.Response, field: str) -> bool:
+    """Check whether PocketBase rejected a record because `field` must be unique"""
+    if response.status_code != 400:
+        return False
+    try:
+        error = response.json().get("data", {}).get(field, {})
+    except Exception:
+        return False
+    return isinstance(error, dict) and error.get("code") == "validation_not_unique"
+
+
+def json_body(payload: Union[Dict, List, bytes]) -> Dict:
+    """Request arguments sending `payload` as JSON; pre-rendered bytes go out as they are"""
+    if isinstance(payload, bytes):
+        return {"content": payload, "headers": JSON_HEADERS}
+    return {"json": payload}
+
 
 class PocketBaseService:
-    def __init__(self):
-        self.base_url = Config.POCKETBASE_URL
+    def __init__(self, token_manager: Optional[AdminTokenManager] = None,
+                 client: Optional[httpx.Client] = None, base_url: Optional[str] = None):
+        # One of several backends when tenants are sharded (see placement.py)
+        self.base_url = base_url or Config.POCKETBASE_URL
         self.admin_email = Config.POCKETBASE_ADMIN_EMAIL
         self.admin_password = Config.POCKETBASE_ADMIN_PASSWORD
-        self.client = httpx.Client(verify=False)
-        self.token = None
-        
-    def authenticate(self):
-        """Authenticate with PocketBase admin credentials"""
+        # Pooled and kept alive across requests; closed by the registry, not here
+        self.client = client or http_clients.get_client(self.base_url)
+        # Shared by every instance talking to the same PocketBase admin
+        self.tokens = token_manager or get_token_manager(self.base_url, self.admin_email)
+        # Timeouts, retries and the circuit breaker, shared per PocketBase instance
+        self.resilience = get_resilience(self.base_url)
+        # Rate and concurrency limits, shared per PocketBase instance
+        self.admission = get_admission(self.base_url)
+
+    @property
+    def token(self) -> Optional[str]:
+        return self.tokens.token
+
+    @timed_operation('auth')
+    def _fetch_token(self) -> Optional[str]:
+        """Log in with the admin credentials and return the new token"""
         try:
-            response = self.client.post(
+            response = self._request(
+                "auth", "post",
                 f"{self.base_url}/api/admins/auth-with-password",
                 json={
                     "identity": self.admin_email,
                     "password": self.admin_password
                 }
             )
+            if response.status_code in (400, 401, 403):
+                logger.error("Authentication rejected with status %s", response.status_code)
+                return None
             response.raise_for_status()
-            self.token = response.json().get('token')
-            return True
+            return response.json().get('token')
         except Exception as e:
-            print(f"Authentication failed: {e}")
-            return False
-    
-    def create_collection(self, collection_data: Dict) -> Optional[Dict]:
-        """Create a new collection in PocketBase"""
-        if not self.token and not self.authenticate():
+            logger.error("Authentication failed: %s", e)
+            return None
+
+    def authenticate(self):
+        """Authenticate with PocketBase admin credentials"""
+        return self.tokens.refresh(self._fetch_token, stale=self.tokens.token) is not None
+
+    def ensure_token(self) -> bool:
+        """Make sure a usable admin token is cached, authenticating at most once per burst"""
+        return self.tokens.get_token(self._fetch_token) is not None
+
+    def _request(self, operation: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request with the operation's timeout, retries and circuit breaker"""
+        send = getattr(self.client, method)
+
+        def attempt(timeout: float) -> httpx.Response:
+            # Queueing for a slot is not network wait
+            with self.admission.slot(), network_wait():
+                return send(url, timeout=timeout, **kwargs)
+        return self.resilience.call(operation, attempt)
+
+    def _send(self, method: str, url: str, operation: Optional[str] = None,
+              headers: Optional[Dict] = None, **kwargs) -> httpx.Response:
+        """Send an admin request, re-authenticating and retrying once on 401"""
+        operation = operation or METHOD_OPERATIONS[method]
+        headers = headers or {}
+        token = self.tokens.token
+        response = self._request(operation, method, url,
+                                 headers={**headers, "Authorization": token}, **kwargs)
+        if response.status_code == 401:
+            token = self.tokens.refresh(self._fetch_token, stale=token)
+            if token:
+                response = self._request(operation, method, url,
+                                         headers={**headers, "Authorization": token}, **kwargs)
+        return response
+
+    @timed_operation('create_collection')
+    def create_collection(self, collection_data: Union[Dict, bytes]) -> Optional[Dict]:
+        """Create a new collection in PocketBase
+
+        Given a payload pre-rendered to JSON bytes, only {"id": ...} is read from the response.
+        """
+        if not self.ensure_token():
             return None
             
         try:
-            headers = {"Authorization": self.token}
-            response = self.client.post(
+            response = self._send(
+                "post",
                 f"{self.base_url}/api/collections",
-                json=collection_data,
-                headers=headers
+                **json_body(collection_data)
             )
             response.raise_for_status()
+            if isinstance(collection_data, bytes):
+                collection_id = json_codec.object_id(response.content)
+                if not collection_id:
+                    raise ValueError("response has no collection id")
+                return {"id": collection_id}
             return response.json()
         except Exception as e:
-            print(f"Error creating collection: {e}")
+            logger.error("Error creating collection: %s", e)
             return None
     
-    def update_collection(self, collection_id: str, update_data: Dict) -> Optional[Dict]:
-        """Update an existing collection"""
-        if not self.token and not self.authenticate():
+    @timed_operation('update_collection')
+    def update_collection(self, collection_id: str, update_data: Union[Dict, bytes]) -> Optional[Dict]:
+        """Update an existing collection
+
+        Given a payload pre-rendered to JSON bytes, the response is not parsed.
+        """
+        if not self.ensure_token():
             return None
             
         try:
-            headers = {"Authorization": self.token}
-            response = self.client.patch(
+            response = self._send(
+                "patch",
                 f"{self.base_url}/api/collections/{collection_id}",
-                json=update_data,
-                headers=headers
+                **json_body(update_data)
             )
             response.raise_for_status()
+            if isinstance(update_data, bytes):
+                return {"id": collection_id}
             return response.json()
         except Exception as e:
-            print(f"Error updating collection: {e}")
+            logger.error("Error updating collection: %s", e)
             return None
     
+    @timed_operation('delete_collection', error_result=False)
+    def delete_collection(self, collection_id: str) -> bool:
+        """Delete a collection and its records. True if it is gone, including when it already was"""
+        if not self.ensure_token():
+            return False
+
+        try:
+            response = self._send(
+                "delete",
+                f"{self.base_url}/api/collections/{collection_id}"
+            )
+            if response.status_code == 404:
+                return True
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            logger.error("Error deleting collection %s: %s", collection_id, e)
+            return False
+
+    @timed_operation('delete_tenant', error_result=False)
+    def delete_tenant(self, record_id: str) -> bool:
+        """Delete a vms_tenants record by its record ID. True if it is gone"""
+        if not self.ensure_token():
+            return False
+
+        try:
+            response = self._send(
+                "delete",
+                f"{self.base_url}/api/collections/vms_tenants/records/{record_id}"
+            )
+            if response.status_code == 404:
+                return True
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            logger.error("Error deleting tenant record %s: %s", record_id, e)
+            return False
+
+    @timed_operation('import_collections', error_result=False)
+    def import_collections(self, collections: Union[List[Dict], bytes],
+                           delete_missing: bool = False) -> bool:
+        """Create or update a set of collections in one transactional call
+
+        `collections` may be a JSON array already rendered to bytes.
+        """
+        if not self.ensure_token():
+            return False
+
+        if isinstance(collections, bytes):
+            body = b''.join((b'{"collections":', collections, b',"deleteMissing":',
+                             b'true' if delete_missing else b'false', b'}'))
+        else:
+            body = {"collections": collections, "deleteMissing": delete_missing}
+        try:
+            response = self._send(
+                "put",
+                f"{self.base_url}/api/collections/import",
+                operation="import",
+                **json_body(body)
+            )
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            logger.error("Error importing collections: %s", e)
+            return False
+
+    @timed_operation('create_tenant')
     def create_tenant(self, tenant_data: Dict) -> Optional[Dict]:
-        """Create a new tenant record"""
-        if not self.token and not self.authenticate():
+        """Create a new tenant record. Raises TenantIdConflictError if the tenant_id is taken"""
+        if not self.ensure_token():
             return None
             
         try:
-            headers = {"Authorization": self.token}
-            response = self.client.post(
+            response = self._send(
+                "post",
                 f"{self.base_url}/api/collections/vms_tenants/records",
-                json=tenant_data,
-                headers=headers
+                json=tenant_data
             )
+            if is_unique_violation(response, "tenant_id"):
+                raise TenantIdConflictError(tenant_data.get("tenant_id"))
             response.raise_for_status()
             return response.json()
+        except TenantIdConflictError:
+            raise
         except Exception as e:
-            print(f"Error creating tenant: {e}")
+            logger.error("Error creating tenant: %s", e)
             return None
+
+    def ensure_tenant_id_index(self) -> bool:
+        """Make sure vms_tenants has a unique index on tenant_id, adding it if missing"""
+        if not self.ensure_token():
+            return False
+
+        try:
+            response = self._send(
+                "get", f"{self.base_url}/api/collections/vms_tenants")
+            response.raise_for_status()
+            indexes = response.json().get("indexes") or []
+            if any("UNIQUE" in index.upper() and "tenant_id" in index for index in indexes):
+                return True
+
+            response = self._send(
+                "patch",
+                f"{self.base_url}/api/collections/vms_tenants",
+                json={"indexes": indexes + [TENANT_ID_INDEX]}
+            )
+            response.raise_for_status()
+            logger.info("Added unique index on vms_tenants.tenant_id")
+            return True
+        except Exception as e:
+            logger.error("Error ensuring tenant_id index: %s", e)
+            return False
     
-    def tenant_id_exists(self, tenant_id: str) -> bool:
-        """Check if a tenant_id already exists"""
+    def get_tenant(self, tenant_id: str) -> Optional[Dict]:
+        """Fetch the vms_tenants record of a tenant_id. None if missing or on error"""
+        if not self.ensure_token():
+            return None
+
         try:
-            response = self.client.get(
+            response = self._send(
+                "get",
+                f"{self.base_url}/api/collections/vms_tenants/records",
+                params={"filter": f"tenant_id='{tenant_id}'", "perPage": 1, "skipTotal": 1}
+            )
+            response.raise_for_status()
+            items = response.json().get('items', [])
+            return next((item for item in items if item.get('tenant_id') == tenant_id), None)
+        except Exception as e:
+            logger.error("Error fetching tenant %s: %s", tenant_id, e, extra={"tenant_id": tenant_id})
+            return None
+
+    @timed_operation('list_collections')
+    def list_collections(self, name_prefix: str, page_size: int = 200) -> Optional[List[Dict]]:
+        """List collections whose name starts with a prefix, filtered server-side"""
+        if not self.ensure_token():
+            return None
+
+        try:
+            collections = []
+            page = 1
+            while True:
+                response = self._send(
+                    "get",
+                    f"{self.base_url}/api/collections",
+                    # An explicit % stops PocketBase wrapping the pattern as %...%
+                    params={"filter": f"name~'{name_prefix}%'", "page": page,
+                            "perPage": page_size, "skipTotal": 1}
+                )
+                response.raise_for_status()
+                items = response.json().get('items', [])
+                # `_` is a LIKE wildcard, so confirm the literal prefix
+                collections.extend(c for c in items if c.get('name', '').startswith(name_prefix))
+                if len(items) < page_size:
+                    return collections
+                page += 1
+        except Exception as e:
+            logger.error("Error listing collections %s*: %s", name_prefix, e)
+            return None
+
+    def count_records(self, collection: str) -> Optional[int]:
+        """Number of records in a collection. None if PocketBase could not answer"""
+        if not self.ensure_token():
+            return None
+
+        try:
+            response = self._send(
+                "get",
+                f"{self.base_url}/api/collections/{collection}/records",
+                params={"perPage": 1, "fields": "id"}
+            )
+            response.raise_for_status()
+            return int(response.json().get('totalItems', 0))
+        except Exception as e:
+            logger.error("Error counting records of %s: %s", collection, e)
+            return None
+
+    @timed_operation('tenant_id_exists')
+    def tenant_id_exists(self, tenant_id: str) -> Optional[bool]:
+        """Check if a tenant_id already exists. None when PocketBase could not answer"""
+        try:
+            response = self._request(
+                "read", "get",
                 f"{self.base_url}/api/collections/vms_tenants/records",
                 params={"filter": f"tenant_id='{tenant_id}'"}
             )
             response.raise_for_status()
-            return len(response.json().get('items', [])) > 0
-        except Exception:
-            return False
\ No newline at end of file
+            items = response.json().get('items', [])
+            return any(item.get('tenant_id') == tenant_id for item in items)
+        except Exception as e:
+            logger.error("Error checking tenant_id %s: %s", tenant_id, e, extra={"tenant_id": tenant_id})
+            return None
+
+    def iter_tenant_ids(self, page_size: int = 500) -> Iterator[str]:
+        """Yield every existing tenant_id, paging through vms_tenants. Raises on failure"""
+        if not self.ensure_token():
+            raise RuntimeError("Authentication failed")
+
+        page = 1
+        while True:
+            response = self._send(
+                "get",
+                f"{self.base_url}/api/collections/vms_tenants/records",
+                params={"page": page, "perPage": page_size,
+                        "fields": "tenant_id", "skipTotal": 1}
+            )
+            response.raise_for_status()
+            items = response.json().get('items', [])
+            for item in items:
+                if item.get('tenant_id'):
+                    yield item['tenant_id']
+            if len(items) < page_size:
+                return
+            page += 1
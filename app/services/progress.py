@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+from ..config import Config
+
+
+class ProgressChannel:
+    """Ordered event log of one provisioning run that any number of readers can follow.
+
+    Readers replay from the start, so subscribing late still shows every step.
+    """
+
+    def __init__(self, max_events: int):
+        self.max_events = max_events
+        self.events: List[Dict] = []
+        self.closed = False
+        self.closed_at: Optional[float] = None
+        self.started = time.perf_counter()
+        self._cond = threading.Condition()
+
+    def publish(self, event: Dict):
+        with self._cond:
+            if self.closed or len(self.events) >= self.max_events:
+                return
+            self.events.append({
+                **event,
+                "seq": len(self.events),
+                "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            })
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self.closed_at = time.monotonic()
+            self._cond.notify_all()
+
+    def follow(self, heartbeat: float) -> Iterator[Optional[Dict]]:
+        """Yield events as they arrive; yields None every `heartbeat` seconds of silence."""
+        position = 0
+        while True:
+            with self._cond:
+                if position >= len(self.events) and not self.closed:
+                    self._cond.wait(heartbeat)
+                pending = self.events[position:]
+                position += len(pending)
+                finished = self.closed and position >= len(self.events)
+            if not pending and not finished:
+                yield None
+            for event in pending:
+                yield event
+            if finished:
+                return
+
+
+class ProgressBroker:
+    """In-process registry of progress channels, keyed by job_id and aliased by tenant_id.
+
+    Channels are kept for PROGRESS_RETENTION seconds after the run ends so
+    clients that connect right after completion still get the full history.
+    Only the worker process that runs a job can stream its events.
+    """
+
+    def __init__(self):
+        self._channels: Dict[str, ProgressChannel] = {}
+        self._aliases: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def open(self, key: str) -> ProgressChannel:
+        with self._lock:
+            self._purge()
+            channel = self._channels[key] = ProgressChannel(Config.PROGRESS_MAX_EVENTS)
+            return channel
+
+    def get(self, key: str) -> Optional[ProgressChannel]:
+        with self._lock:
+            self._purge()
+            return self._channels.get(self._aliases.get(key, key))
+
+    def alias(self, alias: str, key: str):
+        with self._lock:
+            self._aliases[alias] = key
+
+    def publish(self, key: str, event: Dict):
+        channel = self.get(key)
+        if channel is not None:
+            channel.publish(event)
+
+    def close(self, key: str):
+        channel = self.get(key)
+        if channel is not None:
+            channel.close()
+
+    def clear(self):
+        with self._lock:
+            self._channels.clear()
+            self._aliases.clear()
+
+    def _purge(self):
+        cutoff = time.monotonic() - Config.PROGRESS_RETENTION
+        expired = {key for key, channel in self._channels.items()
+                   if channel.closed and channel.closed_at < cutoff}
+        for key in expired:
+            del self._channels[key]
+        for alias in [a for a, key in self._aliases.items() if key in expired]:
+            del self._aliases[alias]
+
+
+def format_sse(event: Optional[Dict]) -> str:
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+def format_ndjson(event: Optional[Dict]) -> str:
+    if event is None:
+        return "\n"
+    return json.dumps(event) + "\n"
+
+
+def stream_channel(channel: ProgressChannel, fmt: str) -> Iterator[str]:
+    """Render a channel as Server-Sent Events ('sse') or newline-delimited JSON ('ndjson')."""
+    render = format_sse if fmt == 'sse' else format_ndjson
+    for event in channel.follow(Config.PROGRESS_HEARTBEAT):
+        yield render(event)
+
+
+progress_broker = ProgressBroker()
@@ -0,0 +1,196 @@
+import logging
+from datetime import timedelta
+from typing import Callable, Dict, Optional, Set
+from flask import current_app, has_app_context
+from sqlalchemy.exc import IntegrityError
+from ..config import Config
+from ..extensions import db
+from ..models import ProvisioningRun, ProvisioningStep
+from ..models.provisioning_job import utcnow
+from ..schemas.provisioning_plan import ProvisioningPlan
+
+logger = logging.getLogger(__name__)
+
+
+class ProvisioningInProgressError(Exception):
+    """Raised when another attempt of the same provisioning is still running"""
+
+    def __init__(self, run_id: str):
+        super().__init__(f"Provisioning run {run_id} is still in progress")
+        self.run_id = run_id
+
+
+class ProvisioningJournal:
+    """Completed steps of one provisioning run, written to the database as they happen.
+
+    `begin` resumes the run of an Idempotency-Key, or the last failed run of
+    the same tenant name, so a retry only repeats the steps that never
+    finished. Outside a Flask app the journal lives in memory only.
+    """
+
+    def __init__(self, run: Optional[ProvisioningRun] = None, app=None):
+        self.app = app
+        self.run_id = run.id if run is not None else None
+        self.tenant_id: Optional[str] = None
+        self.collections: Dict[str, str] = {}
+        self.patched: Set[str] = set()
+        self.import_ids: Dict[str, str] = {}
+        self.result: Optional[Dict] = None
+        self.resumed = False
+        if run is not None:
+            self.tenant_id = run.tenant_id
+            self.import_ids = dict(run.import_ids or {})
+            for step in run.steps:
+                if step.kind == ProvisioningStep.COLLECTION:
+                    self.collections[step.template_id] = step.target_id
+                elif step.kind == ProvisioningStep.RELATIONS:
+                    self.patched.add(step.template_id)
+            self.resumed = bool(run.tenant_id)
+
+    @classmethod
+    def begin(cls, tenant_name: str, plan: ProvisioningPlan,
+              idempotency_key: Optional[str] = None) -> 'ProvisioningJournal':
+        """Start or resume the journal of a provisioning request"""
+        if not Config.PROVISIONING_JOURNAL or not has_app_context():
+            return cls()
+        app = current_app._get_current_object()
+
+        run = cls.find_run(tenant_name, idempotency_key)
+        if run is None:
+            run = ProvisioningRun(idempotency_key=idempotency_key, tenant_name=tenant_name,
+                                  plan_fingerprint=plan.fingerprint)
+            db.session.add(run)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # The same Idempotency-Key was started concurrently
+                db.session.rollback()
+                raise ProvisioningInProgressError(idempotency_key)
+            return cls(run, app)
+
+        if run.status == ProvisioningRun.DELETED:
+            run.tenant_id = None
+            run.import_ids = None
+            run.result = None
+            run.steps.clear()
+        journal = cls(run, app)
+        if run.status == ProvisioningRun.SUCCEEDED:
+            journal.result = run.result
+            return journal
+        if run.status == ProvisioningRun.RUNNING and not cls.is_stale(run):
+            raise ProvisioningInProgressError(run.id)
+
+        run.status = ProvisioningRun.RUNNING
+        run.attempts += 1
+        run.plan_fingerprint = plan.fingerprint
+        db.session.commit()
+        return journal
+
+    @staticmethod
+    def find_run(tenant_name: str, idempotency_key: Optional[str]) -> Optional[ProvisioningRun]:
+        if idempotency_key:
+            return ProvisioningRun.query.filter_by(idempotency_key=idempotency_key).first()
+        if not Config.PROVISIONING_RESUME_BY_NAME:
+            return None
+        recent = utcnow() - timedelta(seconds=Config.PROVISIONING_RESUME_WINDOW)
+        candidates = (ProvisioningRun.query
+                      .filter_by(tenant_name=tenant_name, idempotency_key=None)
+                      .filter(ProvisioningRun.status != ProvisioningRun.SUCCEEDED)
+                      .filter(ProvisioningRun.updated_at >= recent)
+                      .order_by(ProvisioningRun.created_at.desc())
+                      .limit(5))
+        # A running attempt without a key may be a second, separate request
+        return next((run for run in candidates
+                     if run.status == ProvisioningRun.FAILED or ProvisioningJournal.is_stale(run)),
+                    None)
+
+    @staticmethod
+    def forget_tenant(tenant_id: str):
+        """Mark the runs of a deprovisioned tenant so nothing resumes into it"""
+        if not Config.PROVISIONING_JOURNAL or not has_app_context():
+            return
+        ProvisioningRun.query.filter_by(tenant_id=tenant_id).update(
+            {"status": ProvisioningRun.DELETED, "updated_at": utcnow()})
+        db.session.commit()
+
+    @staticmethod
+    def is_stale(run: ProvisioningRun) -> bool:
+        """A run that stopped updating was abandoned (e.g. its worker died)"""
+        return run.updated_at < utcnow() - timedelta(seconds=Config.PROVISIONING_RUN_STALE)
+
+    def is_complete(self, plan: ProvisioningPlan) -> bool:
+        return (all(template_id in self.collections for template_id in plan.collections)
+                and all(template_id in self.patched for template_id in plan.deferred))
+
+    def record_tenant(self, tenant_id: str):
+        self.tenant_id = tenant_id
+
+        def write(run: ProvisioningRun):
+            run.tenant_id = tenant_id
+            db.session.add(ProvisioningStep(run_id=run.id, kind=ProvisioningStep.TENANT,
+                                            target_id=tenant_id))
+        self._write(write)
+
+    def record_collection(self, template_id: str, collection_id: str):
+        self.collections[template_id] = collection_id
+        self._write(lambda run: db.session.add(ProvisioningStep(
+            run_id=run.id, kind=ProvisioningStep.COLLECTION,
+            template_id=template_id, target_id=collection_id)))
+
+    def record_relations(self, template_id: str):
+        self.patched.add(template_id)
+        self._write(lambda run: db.session.add(ProvisioningStep(
+            run_id=run.id, kind=ProvisioningStep.RELATIONS,
+            template_id=template_id, target_id=self.collections.get(template_id))))
+
+    def plan_import(self, id_mapping: Dict[str, str]):
+        """Remember the IDs of an import before sending it, in case its response is lost"""
+        self.import_ids = dict(id_mapping)
+
+        def write(run: ProvisioningRun):
+            run.import_ids = dict(id_mapping)
+        self._write(write)
+
+    def record_import(self, plan: ProvisioningPlan, id_mapping: Dict[str, str]):
+        """One import creates every collection with its relations, cyclic ones included"""
+        created = {template_id: collection_id for template_id, collection_id in id_mapping.items()
+                   if template_id not in self.collections}
+        patched = [template_id for template_id in plan.deferred if template_id not in self.patched]
+        self.collections.update(created)
+        self.patched.update(patched)
+
+        def write(run: ProvisioningRun):
+            db.session.add_all(
+                [ProvisioningStep(run_id=run.id, kind=ProvisioningStep.COLLECTION,
+                                  template_id=template_id, target_id=collection_id)
+                 for template_id, collection_id in created.items()]
+                + [ProvisioningStep(run_id=run.id, kind=ProvisioningStep.RELATIONS,
+                                    template_id=template_id, target_id=id_mapping[template_id])
+                   for template_id in patched])
+        self._write(write)
+
+    def finish(self, result: Dict):
+        self.result = result
+
+        def write(run: ProvisioningRun):
+            run.status = ProvisioningRun.SUCCEEDED
+            run.result = result
+        self._write(write)
+
+    def fail(self):
+        def write(run: ProvisioningRun):
+            run.status = ProvisioningRun.FAILED
+        self._write(write)
+
+    def _write(self, change: Callable[[ProvisioningRun], None]):
+        if self.app is None:
+            return
+        # Steps can complete on the async provisioning loop, so use a fresh app context
+        try:
+            with self.app.app_context():
+                run = db.session.get(ProvisioningRun, self.run_id)
+                change(run)
+                run.updated_at = utcnow()
+                db.session.commit()
+        except Exception as e:
+            logger.error("Could not write provisioning journal of run %s: %s", self.run_id, e)
@@ -0,0 +1,141 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from ..config import Config
+from ..models import WarmSpare
+from ..schemas import provisioning_plan
+from .placement import placement_router
+from .pocketbase_service import PocketBaseService, TenantIdConflictError
+from .tenant_service import TenantService, tenant_config_cache
+
+logger = logging.getLogger(__name__)
+
+
+class Rebalancer:
+    """Moves tenants to the backend PLACEMENT_POLICY now gives them, after backends are added.
+
+    A move copies the tenant's collections (same IDs) and vms_tenants record
+    to the target, records the new placement, then deletes the source copy.
+    Records are not copied: a tenant whose collections hold any is skipped.
+    The source is checked again right before the placement is switched, and
+    if records appeared during the copy the target copy is deleted instead;
+    a source copy that gains records after the switch is kept and reported.
+    Copies and deletions run concurrently; placements are written from this thread.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, app=None):
+        self.concurrency = concurrency or Config.BATCH_CONCURRENCY
+        # Needed to read and record placements
+        self.app = app
+
+    def plan(self, limit: Optional[int] = None) -> List[Tuple[str, str, str]]:
+        """(tenant_id, from, to) of the tenants to move"""
+        with self.app.app_context() if self.app else nullcontext():
+            # Spares move by being claimed or retired, not here
+            spares = {tenant_id for (tenant_id,) in WarmSpare.query.with_entities(WarmSpare.tenant_id)}
+            moves = placement_router.plan_rebalance(exclude=spares)
+        return moves[:limit] if limit else moves
+
+    @staticmethod
+    def holds_records(pb: PocketBaseService, collections: List[Dict]) -> Optional[str]:
+        """Why the tenant cannot move without its data, or None"""
+        for collection in collections:
+            count = pb.count_records(collection["name"])
+            if count is None:
+                return f"could not count the records of {collection['name']}"
+            if count:
+                return "holds records"
+        return None
+
+    def copy_one(self, tenant_id: str, source: str, target: str) -> Dict:
+        """Make the target hold the tenant. No app context here"""
+        src = PocketBaseService(base_url=source)
+        dst = PocketBaseService(base_url=target)
+        record = src.get_tenant(tenant_id)
+        collections = src.list_collections(f"{provisioning_plan.APP_PREFIX}_{tenant_id}_")
+        if record is None or collections is None:
+            return {"status": "failed", "message": "Could not read the tenant on its backend"}
+        reason = self.holds_records(src, collections)
+        if reason:
+            return {"status": "skipped", "message": reason}
+
+        # A move interrupted after creating the record only has the source copy left to delete
+        if dst.get_tenant(tenant_id) is None:
+            if collections and not dst.import_collections(collections):
+                return {"status": "failed", "message": "Could not import the collections"}
+            try:
+                created = dst.create_tenant({"name": record.get("name"), "tenant_id": tenant_id})
+            except TenantIdConflictError:
+                created = dst.get_tenant(tenant_id)
+            if not created:
+                return {"status": "failed", "message": "Could not create the tenant record"}
+        return {"status": "copied", "collections": len(collections)}
+
+    def source_records(self, tenant_id: str, source: str) -> Optional[str]:
+        """Why the source copy has to stay where it is, or None"""
+        pb = PocketBaseService(base_url=source)
+        collections = pb.list_collections(f"{provisioning_plan.APP_PREFIX}_{tenant_id}_")
+        if collections is None:
+            return "could not list the collections"
+        return self.holds_records(pb, collections)
+
+    @staticmethod
+    def delete_copy(tenant_id: str, backend: str) -> bool:
+        """Delete the tenant from one backend, leaving its placement alone"""
+        result = TenantService(backend=backend).delete_tenant_configuration(tenant_id)
+        return result is None or result["status"] == "deleted"
+
+    def delete_source(self, tenant_id: str, source: str) -> bool:
+        """Delete the source copy unless it gained records meanwhile"""
+        return self.source_records(tenant_id, source) is None and self.delete_copy(tenant_id, source)
+
+    def run(self, moves: Iterable[Tuple[str, str, str]]) -> Iterator[Dict]:
+        """Yield one result per tenant in completion order"""
+        moves = list(moves)
+        workers = max(min(self.concurrency, len(moves)), 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rebalance') as executor:
+            pending = {executor.submit(self.copy_one, *move): ('copy', move, time.perf_counter())
+                       for move in moves}
+            # tenant_id -> why a copied tenant stays on its source
+            kept: Dict[str, str] = {}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    phase, (tenant_id, source, target), started = pending.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        logger.exception("Moving tenant %s crashed: %s", tenant_id, e,
+                                         extra={"tenant_id": tenant_id})
+                        outcome = {"status": "failed", "message": str(e)} if phase == 'copy' else False
+
+                    if phase == 'copy' and outcome["status"] == "copied":
+                        # Right before the switch: records written during the copy would be left behind
+                        reason = self.source_records(tenant_id, source)
+                        if reason:
+                            kept[tenant_id] = f"{reason} after the copy"
+                            discard = executor.submit(self.delete_copy, tenant_id, target)
+                            pending[discard] = ('discard', (tenant_id, source, target), started)
+                            continue
+                        with self.app.app_context() if self.app else nullcontext():
+                            placement_router.move(tenant_id, target)
+                        tenant_config_cache.invalidate(tenant_id)
+                        delete = executor.submit(self.delete_source, tenant_id, source)
+                        pending[delete] = ('delete', (tenant_id, source, target), started)
+                        continue
+
+                    result = {"tenant_id": tenant_id, "from": source, "to": target}
+                    if phase == 'copy':
+                        result.update(outcome)
+                    elif phase == 'discard':
+                        result.update({"status": "skipped", "message": kept.pop(tenant_id),
+                                       "target_deleted": outcome})
+                    else:
+                        result.update({"status": "moved", "source_deleted": outcome})
+                        if not outcome:
+                            logger.warning("Tenant %s moved to %s but its copy on %s was kept",
+                                           tenant_id, target, source, extra={"tenant_id": tenant_id})
+                    result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                    yield result
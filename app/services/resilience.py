@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+import httpx
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# operation -> (Config key of its timeout, safe to repeat after an ambiguous failure)
+OPERATIONS = {
+    'auth': ('POCKETBASE_TIMEOUT_READ', True),
+    'read': ('POCKETBASE_TIMEOUT_READ', True),
+    'create': ('POCKETBASE_TIMEOUT_WRITE', False),
+    'update': ('POCKETBASE_TIMEOUT_WRITE', True),
+    'import': ('POCKETBASE_TIMEOUT_IMPORT', True),
+    # Deleting what is already gone answers 404, which callers treat as done
+    'delete': ('POCKETBASE_TIMEOUT_WRITE', True),
+}
+
+# Operation assumed for a request when the caller does not name one
+METHOD_OPERATIONS = {'get': 'read', 'post': 'create', 'patch': 'update', 'put': 'update',
+                     'delete': 'delete'}
+
+# Statuses worth another attempt; 429 and 503 honour Retry-After
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# Statuses that count against the circuit breaker
+FAILURE_STATUSES = frozenset({500, 502, 503, 504})
+# Raised before the request reached PocketBase, so even a create can be repeated
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling PocketBase while its circuit breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit for {name} is open, retry in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After `failure_threshold` failures in a row the circuit opens and calls
+    fail fast for `reset_timeout` seconds. Then a single probe is let
+    through (half-open): success closes the circuit, failure reopens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None,
+                 reset_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or Config.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or Config.CIRCUIT_RESET_TIMEOUT
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.rejected_total = 0
+        self.opened_total = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                retry_in = self.opened_at + self.reset_timeout - time.monotonic()
+                if retry_in > 0:
+                    self.rejected_total += 1
+                    raise CircuitOpenError(self.name, retry_in)
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    self.rejected_total += 1
+                    raise CircuitOpenError(self.name, 0)
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def abandon_probe(self):
+        """A call let through ended without reaching PocketBase; the next one may probe"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened_total += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(self.opened_at + self.reset_timeout - time.monotonic(), 0), 1)
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'retry_in': retry_in,
+                'opened_total': self.opened_total,
+                'rejected_total': self.rejected_total,
+            }
+
+
+class ResiliencePolicy:
+    """Timeouts, jittered retries and a circuit breaker around calls to one PocketBase.
+
+    `send` callables receive the operation's timeout and return the response;
+    transport errors propagate out of them. Only operations that are safe to
+    repeat are retried after a response or a timeout; anything is retried
+    when the connection was never made.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, attempts: Optional[int] = None,
+                 base_delay: Optional[float] = None, max_delay: Optional[float] = None):
+        self.breaker = breaker
+        self.attempts = max(attempts or Config.POCKETBASE_RETRY_ATTEMPTS, 1)
+        self.base_delay = Config.POCKETBASE_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = Config.POCKETBASE_RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.retries_total = 0
+
+    def timeout(self, operation: str) -> float:
+        return getattr(Config, OPERATIONS[operation][0])
+
+    def backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Full-jitter exponential delay before retry number `attempt` (starting at 0)"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), self.max_delay))
+        return delay
+
+    def call(self, operation: str, send: Callable[[float], httpx.Response]) -> httpx.Response:
+        for attempt in range(self.attempts):
+            self.breaker.before_call()
+            try:
+                response = send(self.timeout(operation))
+            except httpx.TransportError as e:
+                if not self._retry(operation, attempt, error=e):
+                    raise
+                time.sleep(self.backoff(attempt))
+                continue
+            except BaseException:
+                # e.g. rejected by admission control: says nothing about PocketBase's health
+                self.breaker.abandon_probe()
+                raise
+            if not self._retry(operation, attempt, response=response):
+                return response
+            time.sleep(self.backoff(attempt, response))
+        return response
+
+    async def acall(self, operation: str,
+                    send: Callable[[float], Awaitable[httpx.Response]]) -> httpx.Response:
+        for attempt in range(self.attempts):
+            self.breaker.before_call()
+            try:
+                response = await send(self.timeout(operation))
+            except httpx.TransportError as e:
+                if not self._retry(operation, attempt, error=e):
+                    raise
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            except BaseException:
+                self.breaker.abandon_probe()
+                raise
+            if not self._retry(operation, attempt, response=response):
+                return response
+            await asyncio.sleep(self.backoff(attempt, response))
+        return response
+
+    def _retry(self, operation: str, attempt: int, response: Optional[httpx.Response] = None,
+               error: Optional[Exception] = None) -> bool:
+        """Record the outcome on the breaker and decide whether to try again"""
+        if error is not None or response.status_code in FAILURE_STATUSES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+        if attempt + 1 >= self.attempts:
+            return False
+        if error is not None:
+            retry = isinstance(error, UNSENT_ERRORS) or OPERATIONS[operation][1]
+        else:
+            retry = response.status_code in RETRY_STATUSES and OPERATIONS[operation][1]
+        if retry:
+            self.retries_total += 1
+            logger.warning("Retrying PocketBase %s call after %s", operation,
+                           error or f"status {response.status_code}", extra={"operation": operation})
+        return retry
+
+    def stats(self) -> Dict:
+        return {
+            'circuit': self.breaker.snapshot(),
+            'retry_attempts': self.attempts,
+            'retries_total': self.retries_total,
+            'timeouts': {operation: self.timeout(operation) for operation in OPERATIONS},
+        }
+
+
+_policies: Dict[str, ResiliencePolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def get_resilience(base_url: str) -> ResiliencePolicy:
+    """Process-wide policy (and circuit breaker) for one PocketBase instance."""
+    with _policies_lock:
+        policy = _policies.get(base_url)
+        if policy is None:
+            policy = _policies[base_url] = ResiliencePolicy(CircuitBreaker(base_url))
+        return policy
+
+
+def resilience_stats() -> Dict[str, Dict]:
+    """Breaker state and retry counters of every PocketBase instance this process talks to."""
+    with _policies_lock:
+        policies = dict(_policies)
+    return {base_url: policy.stats() for base_url, policy in policies.items()}
+
+
+def reset_resilience():
+    """Forget every breaker and counter (used by tests)."""
+    with _policies_lock:
+        _policies.clear()
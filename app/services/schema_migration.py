@@ -0,0 +1,320 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+from ..config import Config
+from ..extensions import db
+from ..models import SchemaMigration, SchemaMigrationTenant
+from ..models.provisioning_job import utcnow
+from ..schemas.provisioning_plan import APP_PREFIX, COLLECTION_RULE_KEYS, ProvisioningPlan
+from ..schemas.registry import schema_registry
+from .placement import placement_router
+from .pocketbase_service import PocketBaseService
+
+logger = logging.getLogger(__name__)
+
+# Field properties compared with the live collection; options are compared key by key
+FIELD_KEYS = ("type", "required", "presentable", "unique")
+
+
+class CollectionDiff(NamedTuple):
+    template_id: str
+    name: str
+    # 'create' when the tenant lacks the collection, 'update' when it differs
+    action: str
+    # PATCH payload of an update: only the parts that changed
+    patch: Dict
+    # What changed, for the report
+    summary: Dict
+
+
+def tenant_prefix(tenant_id: str) -> str:
+    return f"{APP_PREFIX}_{tenant_id}_"
+
+
+def diff_fields(desired: List[Dict], live: List[Dict]):
+    """Added field names, {name: [changed properties]} and live-only field names"""
+    live_by_name = {field["name"]: field for field in live}
+    added, changed = [], {}
+    for field in desired:
+        current = live_by_name.get(field["name"])
+        if current is None:
+            added.append(field["name"])
+            continue
+        # Only what the template sets counts; PocketBase fills in defaults for the rest
+        keys = [key for key in FIELD_KEYS if key in field and field[key] != current.get(key)]
+        current_options = current.get("options") or {}
+        keys += [f"options.{key}" for key, value in (field.get("options") or {}).items()
+                 if current_options.get(key) != value]
+        if keys:
+            changed[field["name"]] = keys
+    desired_names = {field["name"] for field in desired}
+    extra = [field["name"] for field in live if field["name"] not in desired_names]
+    return added, changed, extra
+
+
+def merge_fields(desired: List[Dict], live: List[Dict], prune: bool) -> List[Dict]:
+    """Full schema for a PATCH: template fields over the live ones, which keep their IDs and data"""
+    live_by_name = {field["name"]: field for field in live}
+    merged = []
+    for field in desired:
+        current = live_by_name.get(field["name"])
+        if current is None:
+            merged.append(field)
+        else:
+            merged.append({**current, **field,
+                           "options": {**(current.get("options") or {}), **(field.get("options") or {})}})
+    if not prune:
+        desired_names = {field["name"] for field in desired}
+        merged.extend(field for field in live if field["name"] not in desired_names)
+    return merged
+
+
+def diff_tenant(plan: ProvisioningPlan, tenant_id: str, live_collections: List[Dict],
+                prune: bool = False) -> List[CollectionDiff]:
+    """Per-collection changes that bring a tenant's live collections to the plan"""
+    live_by_name = {collection["name"]: collection for collection in live_collections}
+    # Collections still to be created get a placeholder ID so relations to them show up as changes
+    id_mapping = {}
+    for template_id, collection in plan.collections.items():
+        live = live_by_name.get(collection.collection_name(tenant_id))
+        id_mapping[template_id] = live["id"] if live else f"new:{collection.base_name}"
+
+    diffs = []
+    for wave in plan.waves:
+        for template_id in wave:
+            collection = plan.collections[template_id]
+            name = collection.collection_name(tenant_id)
+            live = live_by_name.get(name)
+            if live is None:
+                diffs.append(CollectionDiff(template_id, name, "create", {}, {
+                    "collection": name, "action": "create",
+                    "fields_added": [field.name for field in collection.fields]}))
+                continue
+
+            desired = collection.import_payload(tenant_id, id_mapping)
+            live_fields = live.get("schema") or []
+            added, changed, extra = diff_fields(desired["schema"], live_fields)
+            removed = extra if prune else []
+            rules = [key for key in COLLECTION_RULE_KEYS if live.get(key) != desired[key]]
+            live_options = live.get("options") or {}
+            options = [key for key, value in desired["options"].items() if live_options.get(key) != value]
+            if not (added or changed or removed or rules or options):
+                continue
+
+            patch = {key: desired[key] for key in rules}
+            if added or changed or removed:
+                patch["schema"] = merge_fields(desired["schema"], live_fields, prune)
+            if options:
+                patch["options"] = {**live_options, **desired["options"]}
+            summary = {"collection": name, "action": "update"}
+            for key, value in (("fields_added", added), ("fields_changed", changed),
+                               ("fields_removed", removed), ("rules_changed", rules),
+                               ("options_changed", options)):
+                if value:
+                    summary[key] = value
+            if extra and not prune:
+                summary["fields_kept"] = extra
+            diffs.append(CollectionDiff(template_id, name, "update", patch, summary))
+    return diffs
+
+
+class SchemaMigrator:
+    """Brings existing tenants' collections to a schema version with the fewest calls.
+
+    Each tenant costs one list call; only collections that differ are
+    PATCHed, with just the changed rules and a schema that keeps the live
+    field IDs (so no data is dropped). Missing collections are created.
+    Fields the template no longer has are kept unless `prune` is set, and
+    collections it no longer has are only reported. Tenants are migrated
+    `concurrency` at a time, each on the backend it is placed on unless a
+    `pb` is given.
+    """
+
+    def __init__(self, plan: ProvisioningPlan, pb: Optional[PocketBaseService] = None,
+                 concurrency: Optional[int] = None, dry_run: bool = False, prune: bool = False):
+        self.plan = plan
+        self.pb = pb
+        self.concurrency = max(1, concurrency or Config.MIGRATION_CONCURRENCY)
+        self.dry_run = dry_run
+        self.prune = prune
+
+    def client_for(self, tenant_id: str) -> PocketBaseService:
+        return self.pb or PocketBaseService(base_url=placement_router.backend_for(tenant_id))
+
+    def migrate_tenant(self, tenant_id: str) -> Dict:
+        """Diff one tenant and, unless this is a dry run, apply the diff. Never raises"""
+        started = time.perf_counter()
+        result = {"tenant_id": tenant_id, "changes": [], "error": None}
+        try:
+            pb = self.client_for(tenant_id)
+            live = pb.list_collections(tenant_prefix(tenant_id))
+            if live is None:
+                raise RuntimeError("could not list collections")
+            diffs = diff_tenant(self.plan, tenant_id, live, self.prune)
+            result["changes"] = [diff.summary for diff in diffs]
+            known = {collection.collection_name(tenant_id) for collection in self.plan.collections.values()}
+            result["changes"] += [{"collection": collection["name"], "action": "untracked"}
+                                  for collection in live if collection["name"] not in known]
+            if not diffs:
+                result["status"] = SchemaMigrationTenant.UNCHANGED
+            elif self.dry_run:
+                result["status"] = SchemaMigrationTenant.PLANNED
+            else:
+                self.apply(pb, tenant_id, live, diffs)
+                result["status"] = SchemaMigrationTenant.MIGRATED
+        except Exception as e:
+            logger.error("Schema migration of tenant %s failed: %s", tenant_id, e,
+                         extra={"tenant_id": tenant_id})
+            result["status"] = SchemaMigrationTenant.FAILED
+            result["error"] = str(e)
+        result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    def apply(self, pb: PocketBaseService, tenant_id: str, live: List[Dict],
+              diffs: List[CollectionDiff]):
+        creates = [diff for diff in diffs if diff.action == "create"]
+        if creates:
+            live = list(live)
+            live_ids = {collection["name"]: collection["id"] for collection in live}
+            id_mapping = {template_id: live_ids[collection.collection_name(tenant_id)]
+                          for template_id, collection in self.plan.collections.items()
+                          if collection.collection_name(tenant_id) in live_ids}
+            # Wave order: every non-cyclic relation target exists before it is referenced
+            for diff in creates:
+                collection = self.plan.collections[diff.template_id]
+                created = pb.create_collection(collection.create_payload(tenant_id, id_mapping))
+                if created is None:
+                    raise RuntimeError(f"could not create {diff.name}")
+                id_mapping[diff.template_id] = created["id"]
+                live.append(created)
+            # Re-diff now that every collection has its real ID (adds the cyclic relations)
+            diffs = diff_tenant(self.plan, tenant_id, live, self.prune)
+
+        for diff in diffs:
+            if diff.action != "update":
+                continue
+            live_id = next(c["id"] for c in live if c["name"] == diff.name)
+            if pb.update_collection(live_id, diff.patch) is None:
+                raise RuntimeError(f"could not update {diff.name}")
+        logger.info("Migrated tenant %s to schema %s", tenant_id, self.plan.version,
+                    extra={"tenant_id": tenant_id, "collections": len(diffs)})
+
+    def run(self, tenant_ids: Iterable[str], on_result: Callable[[Dict], None]):
+        """Migrate tenants concurrently, handing each result to `on_result` on this thread"""
+        window = self.concurrency * 2
+        with ThreadPoolExecutor(max_workers=self.concurrency,
+                                thread_name_prefix='schema-migration') as pool:
+            pending = set()
+            # Tenant IDs are consumed lazily so thousands of them never sit in the queue at once
+            for tenant_id in tenant_ids:
+                pending.add(pool.submit(self.migrate_tenant, tenant_id))
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        on_result(future.result())
+            for future in wait(pending).done:
+                on_result(future.result())
+
+
+class MigrationCheckpoint:
+    """Writes tenant results of a migration in batches from the coordinating thread"""
+
+    def __init__(self, migration: SchemaMigration, flush_every: Optional[int] = None):
+        self.migration = migration
+        self.flush_every = flush_every or Config.MIGRATION_CHECKPOINT_EVERY
+        self.buffer: List[Dict] = []
+        self.counts: Dict[str, int] = {}
+
+    def done_tenants(self) -> Set[str]:
+        rows = (SchemaMigrationTenant.query.with_entities(SchemaMigrationTenant.tenant_id)
+                .filter_by(migration_id=self.migration.id)
+                .filter(SchemaMigrationTenant.status.in_(SchemaMigrationTenant.DONE)))
+        return {tenant_id for (tenant_id,) in rows}
+
+    def record(self, result: Dict):
+        self.counts[result["status"]] = self.counts.get(result["status"], 0) + 1
+        self.buffer.append(result)
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        results, self.buffer = self.buffer, []
+        existing = {row.tenant_id: row for row in SchemaMigrationTenant.query.filter(
+            SchemaMigrationTenant.migration_id == self.migration.id,
+            SchemaMigrationTenant.tenant_id.in_([result["tenant_id"] for result in results]))}
+        for result in results:
+            row = existing.get(result["tenant_id"])
+            if row is None:
+                row = SchemaMigrationTenant(migration_id=self.migration.id, tenant_id=result["tenant_id"])
+                db.session.add(row)
+            row.status = result["status"]
+            row.changes = result["changes"]
+            row.error = result["error"]
+        self.migration.updated_at = utcnow()
+        db.session.commit()
+
+    def finish(self):
+        self.flush()
+        self.migration.status = SchemaMigration.COMPLETED
+        db.session.commit()
+
+
+def _with_placements(tenant_ids: Iterable[str]) -> Iterable[str]:
+    """Look placements up here, where the app context is, so the workers find them cached"""
+    for tenant_id in tenant_ids:
+        placement_router.backend_for(tenant_id)
+        yield tenant_id
+
+
+def migrate_schema(version: Optional[str] = None, tenant_ids: Optional[Iterable[str]] = None,
+                   dry_run: bool = False, prune: bool = False, concurrency: Optional[int] = None,
+                   resume: Optional[str] = None,
+                   on_result: Optional[Callable[[Dict], None]] = None) -> SchemaMigration:
+    """Roll a schema version out to existing tenants (all of them by default). Needs an app context.
+
+    `resume` continues an earlier migration with its own settings, skipping the
+    tenants it already migrated or found unchanged.
+    """
+    if resume:
+        migration = db.session.get(SchemaMigration, resume)
+        if migration is None:
+            raise ValueError(f"Unknown schema migration {resume}")
+        migration.status = SchemaMigration.RUNNING
+        plan = schema_registry.get_plan(migration.target_version)
+        if plan.fingerprint != migration.plan_fingerprint:
+            logger.warning("Schema %s changed since migration %s started",
+                           migration.target_version, migration.id)
+    else:
+        plan = schema_registry.get_plan(version)
+        migration = SchemaMigration(target_version=plan.version, plan_fingerprint=plan.fingerprint,
+                                    dry_run=dry_run, prune_fields=prune)
+        db.session.add(migration)
+    db.session.commit()
+
+    migrator = SchemaMigrator(plan, concurrency=concurrency,
+                              dry_run=migration.dry_run, prune=migration.prune_fields)
+    checkpoint = MigrationCheckpoint(migration)
+    done = checkpoint.done_tenants()
+    if tenant_ids is None:
+        # Listing every backend also tells the workers where each tenant lives
+        tenant_ids = placement_router.iter_tenant_ids()
+    else:
+        tenant_ids = _with_placements(tenant_ids)
+
+    def record(result: Dict):
+        checkpoint.record(result)
+        if on_result:
+            on_result(result)
+
+    try:
+        migrator.run((tenant_id for tenant_id in tenant_ids if tenant_id not in done), record)
+    finally:
+        # Whatever finished is kept, so an interrupted migration resumes where it stopped
+        checkpoint.flush()
+    checkpoint.finish()
+    logger.info("Schema migration %s to %s finished: %s", migration.id, migration.target_version,
+                checkpoint.counts, extra={"migration_id": migration.id})
+    return migration
@@ -0,0 +1,89 @@
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from ..config import Config
+from ..utils.cache import TTLCache
+from .metrics import ONBOARDINGS_COALESCED
+
+
+def normalize_tenant_name(name: str) -> str:
+    """Compare tenant names the way a person would: case, width and spacing aside"""
+    return ' '.join(unicodedata.normalize('NFKC', name).split()).casefold()
+
+
+def onboarding_key(tenant_name: str, client_key: Optional[str] = None) -> Tuple[str, str]:
+    """Requests with the same key are duplicates of one onboarding"""
+    return normalize_tenant_name(tenant_name), client_key or ''
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run one call per key at a time; concurrent callers with the same key share its outcome.
+
+    The first caller runs the function, later ones block until it returns
+    and get the same result or exception. Truthy results are served for
+    `window` more seconds so that late retries do not start over; failures
+    are not kept, so a retry after one runs again.
+    """
+
+    def __init__(self, window: Optional[float] = None, maxsize: int = 1024):
+        window = Config.ONBOARDING_COALESCE_WINDOW if window is None else window
+        self.window = window
+        self._recent = TTLCache(maxsize, window) if window > 0 else None
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """fn's result, and whether it came from another caller's run"""
+        if self._recent is not None:
+            recent = self._recent.get(key)
+            if recent is not None:
+                ONBOARDINGS_COALESCED.inc(mode='sync')
+                return recent, True
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            ONBOARDINGS_COALESCED.inc(mode='sync')
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.result and self._recent is not None:
+                    self._recent.set(key, flight.result)
+            flight.done.set()
+        return flight.result, False
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def clear(self):
+        with self._lock:
+            self._flights.clear()
+        if self._recent is not None:
+            self._recent.clear()
+
+
+# Synchronous onboardings (POST /tenants?sync=true) of this process
+onboarding_flights = SingleFlight()
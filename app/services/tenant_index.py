@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import math
+import threading
+from typing import Iterable, List, Optional
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    No false negatives; false positives at roughly `error_rate` once
+    `capacity` keys have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.num_bits = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Kirsch-Mitzenmacher double hashing from one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(key))
+
+    @property
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.bits)
+
+
+class TenantIdIndex:
+    """In-process index of existing tenant_ids backed by Bloom filters.
+
+    Once warmed, a negative answer is authoritative and needs no PocketBase
+    call; only probable hits have to be confirmed remotely. The index grows
+    by chaining filters of doubling capacity, so it stays accurate past the
+    initial estimate.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, error_rate: Optional[float] = None):
+        self.capacity = capacity or Config.TENANT_INDEX_CAPACITY
+        self.error_rate = error_rate or Config.TENANT_INDEX_ERROR_RATE
+        self.ready = False
+        self._filters: List[BloomFilter] = [BloomFilter(self.capacity, self.error_rate)]
+        self._lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
+
+    def add(self, tenant_id: str):
+        with self._lock:
+            current = self._filters[-1]
+            if current.is_full:
+                current = BloomFilter(current.capacity * 2, self.error_rate)
+                self._filters.append(current)
+            current.add(tenant_id)
+
+    def might_contain(self, tenant_id: str) -> bool:
+        """False means the tenant_id is definitely not taken (when the index is ready)."""
+        return any(tenant_id in bloom for bloom in self._filters)
+
+    def __len__(self) -> int:
+        return sum(bloom.count for bloom in self._filters)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(bloom.size_bytes for bloom in self._filters)
+
+    def warm(self, pb, page_size: Optional[int] = None) -> int:
+        """Load every existing tenant_id from `pb` (a PocketBaseService or the placement router,
+        which covers every backend). Returns how many were indexed."""
+        loaded = 0
+        for tenant_id in pb.iter_tenant_ids(page_size or Config.TENANT_INDEX_PAGE_SIZE):
+            self.add(tenant_id)
+            loaded += 1
+        self.ready = True
+        logger.info("Tenant index warmed with %d tenant_ids (%d bytes)", loaded, self.size_bytes)
+        return loaded
+
+    def start_warmup(self):
+        """Warm the index in a daemon thread so startup does not wait on PocketBase."""
+        if self._warmup_thread is not None and self._warmup_thread.is_alive():
+            return
+
+        def run():
+            from .placement import placement_router
+            try:
+                self.warm(placement_router)
+            except Exception as e:
+                logger.warning("Tenant index warmup failed, falling back to remote checks: %s", e)
+
+        self._warmup_thread = threading.Thread(target=run, name='tenant-index-warmup', daemon=True)
+        self._warmup_thread.start()
+
+    def reset(self):
+        with self._lock:
+            self.ready = False
+            self._filters = [BloomFilter(self.capacity, self.error_rate)]
+
+
+tenant_index = TenantIdIndex()
@@ -1,33 +1,194 @@
+import asyncio
+import hashlib
 import json
-import os
-from typing import Dict, List, Optional
-from ..services.pocketbase_service import PocketBaseService
-from ..utils.helpers import generate_random_string
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from flask import has_app_context
+from ..config import Config
+from ..schemas import provisioning_plan
+from ..schemas.provisioning_plan import ProvisioningPlan
+from ..schemas.provisioning_planner import plan_collection_waves
+from ..schemas.registry import schema_registry
+from ..services.pocketbase_service import PocketBaseService, TenantIdConflictError
+from ..services.async_pocketbase_service import AsyncPocketBaseService
+from ..services.http_pool import http_clients
+from ..services.metrics import PROVISIONING_PHASE_DURATION, PROVISIONINGS, PROVISIONINGS_IN_FLIGHT
+from ..services.placement import PlacementConflictError, placement_router
+from ..services.provisioning_journal import ProvisioningJournal
+from ..services.tenant_index import TenantIdIndex, tenant_index
+from ..services.warm_pool import SpareNotClaimedError, warm_pool
+from ..utils.cache import TTLCache
+from ..utils.helpers import generate_random_string, generate_sortable_id
+
+logger = logging.getLogger(__name__)
+
+# Receives provisioning events such as {"event": "collection_created", ...}
+ProgressCallback = Callable[[Dict], None]
+
+# 'import': one bulk import call per tenant; 'collections': one call per collection
+PROVISIONING_STRATEGIES = ('import', 'collections')
+
+# tenant_id -> (configuration, etag); per process, so TTL bounds cross-worker staleness
+tenant_config_cache = TTLCache(Config.TENANT_CACHE_SIZE, Config.TENANT_CACHE_TTL)
+
+# PocketBase URLs whose vms_tenants.tenant_id unique index has been verified
+_unique_index_checked = set()
+_unique_index_lock = threading.Lock()
 
 
 class TenantService:
-    def __init__(self):
-        self.pb = PocketBaseService()
+    def __init__(self, concurrency: Optional[int] = None,
+                 schema_version: Optional[str] = None,
+                 index: Optional[TenantIdIndex] = None,
+                 strategy: Optional[str] = None,
+                 backend: Optional[str] = None):
+        # A given backend pins the service to it; otherwise each tenant's placement decides
+        self.backend = backend
+        self.pb = PocketBaseService(base_url=backend)
+        self.index = index if index is not None else tenant_index
+        self.concurrency = concurrency or Config.PROVISIONING_CONCURRENCY
+        self.schema_version = schema_version
+        self.strategy = strategy or Config.PROVISIONING_STRATEGY
+        if self.strategy not in PROVISIONING_STRATEGIES:
+            raise ValueError(f"Unknown provisioning strategy {self.strategy!r}")
+        self.id_mode = Config.TENANT_ID_MODE
+        self.id_strategy = Config.TENANT_ID_STRATEGY
+
+    def use_backend(self, backend: str):
+        """Send the following PocketBase calls to `backend`"""
+        if backend != self.pb.base_url:
+            self.pb = PocketBaseService(base_url=backend)
 
-    def generate_unique_tenant_id(self, length=8, max_attempts=10) -> Optional[str]:
+    def route(self, tenant_id: str):
+        """Send the following PocketBase calls to the backend holding tenant_id"""
+        self.use_backend(self.backend or placement_router.backend_for(tenant_id))
+
+    def new_tenant_id(self, length: Optional[int] = None) -> str:
+        """Generate a candidate tenant_id with the configured strategy"""
+        if self.id_strategy == 'sortable':
+            return generate_sortable_id(length or 12)
+        return generate_random_string(length or 8)
+
+    def generate_unique_tenant_id(self, length=None, max_attempts=10) -> Optional[str]:
         """Generate a unique tenant_id"""
         for _ in range(max_attempts):
-            tenant_id = generate_random_string(length)
-            if not self.pb.tenant_id_exists(tenant_id):
+            tenant_id = self.new_tenant_id(length)
+            # A warmed index rules out unused IDs without a network call
+            if self.index.ready and not self.index.might_contain(tenant_id):
+                return tenant_id
+            # Probable hit (or cold index): ask PocketBase; an error is not a "no"
+            if self.pb.tenant_id_exists(tenant_id) is False:
                 return tenant_id
         return None
 
+    def ensure_unique_index(self) -> bool:
+        """Verify (once per process) that PocketBase enforces unique tenant_ids"""
+        with _unique_index_lock:
+            if self.pb.base_url in _unique_index_checked:
+                return True
+            if not self.pb.ensure_tenant_id_index():
+                return False
+            _unique_index_checked.add(self.pb.base_url)
+            return True
+
+    def create_tenant_record(self, tenant_name: str, max_attempts=10) -> Optional[str]:
+        """Create the vms_tenants record under a fresh tenant_id. Returns the tenant_id"""
+        optimistic = self.id_mode == 'optimistic' and self.ensure_unique_index()
+        if self.id_mode == 'optimistic' and not optimistic:
+            logger.warning("Unique tenant_id index unavailable, checking IDs before insert")
+
+        # Summed over conflict retries and recorded once per tenant
+        timings = {'id_generation': 0.0, 'tenant_record': 0.0}
+        try:
+            for _ in range(max_attempts):
+                started = time.perf_counter()
+                # Optimistic: one round trip, the unique index rejects duplicates on insert
+                tenant_id = (self.new_tenant_id() if optimistic
+                             else self.generate_unique_tenant_id())
+                timings['id_generation'] += time.perf_counter() - started
+                if not tenant_id:
+                    return None
+                if optimistic and self.index.ready and self.index.might_contain(tenant_id):
+                    continue
+                if self.backend is None:
+                    # Recording the placement reserves the tenant_id across backends
+                    try:
+                        self.use_backend(placement_router.place(tenant_id))
+                    except PlacementConflictError:
+                        self.index.add(tenant_id)
+                        continue
+                    if optimistic and not self.ensure_unique_index():
+                        self.release_placement(tenant_id)
+                        return None
+
+                tenant_data = {
+                    "name": tenant_name,
+                    "tenant_id": tenant_id
+                }
+                started = time.perf_counter()
+                try:
+                    tenant_record = self.pb.create_tenant(tenant_data)
+                except TenantIdConflictError:
+                    logger.info("tenant_id %s already taken, retrying", tenant_id,
+                                extra={"tenant_id": tenant_id, "phase": "tenant_record"})
+                    self.index.add(tenant_id)
+                    self.release_placement(tenant_id)
+                    continue
+                finally:
+                    timings['tenant_record'] += time.perf_counter() - started
+                if not tenant_record:
+                    self.release_placement(tenant_id)
+                    return None
+                self.index.add(tenant_id)
+                return tenant_id
+
+            return None
+        finally:
+            for phase, seconds in timings.items():
+                PROVISIONING_PHASE_DURATION.observe(seconds, phase=phase)
+
+    def release_placement(self, tenant_id: str):
+        """Give back the placement of a tenant_id whose record was not created"""
+        if self.backend is None and placement_router.sharded:
+            placement_router.forget(tenant_id, self.pb.base_url)
+
+    def get_tenant_configuration(self, tenant_id: str) -> Optional[Tuple[Dict, str]]:
+        """Tenant record plus its collections, and an ETag of both. Served from cache when fresh"""
+        cached = tenant_config_cache.get(tenant_id)
+        if cached is not None:
+            return cached
+        self.route(tenant_id)
+
+        tenant = self.pb.get_tenant(tenant_id)
+        if not tenant:
+            return None
+        collections = self.pb.list_collections(
+            f"{provisioning_plan.APP_PREFIX}_{tenant_id}_")
+        if collections is None:
+            return None
+
+        configuration = {
+            "tenant": tenant,
+            "collections": sorted(collections, key=lambda c: c["name"]),
+        }
+        body = json.dumps(configuration, sort_keys=True, separators=(',', ':'))
+        etag = hashlib.sha256(body.encode()).hexdigest()[:32]
+        tenant_config_cache.set(tenant_id, (configuration, etag))
+        return configuration, etag
+
+    def invalidate_tenant_configuration(self, tenant_id: str):
+        """Drop the cached configuration after the tenant was provisioned or changed"""
+        tenant_config_cache.invalidate(tenant_id)
+
     def clean_field(self, field: Dict) -> Dict:
         """Remove unsupported field properties for the PocketBase client."""
-        supported_keys = ["name", "type", "required",
-                          "presentable", "unique", "options"]
-        if field["type"] == "autodate":
-            field["type"] = "date"  # Convert autodate to date
-        return {key: field[key] for key in supported_keys if key in field}
+        return provisioning_plan.clean_field(field)
 
     def is_relation_field(self, field: Dict) -> bool:
         """Check if a field is a relation field."""
-        return field["type"] == "relation" and "options" in field and "collectionId" in field["options"]
+        return provisioning_plan.is_relation_field(field)
 
     def get_non_relation_fields(self, collection: Dict) -> List[Dict]:
         """Extract non-relation fields from a collection schema."""
@@ -51,139 +212,481 @@ class TenantService:
             if self.is_relation_field(field)
         ]
 
-    def create_tenant_configuration(self, tenant_name: str) -> Optional[Dict]:
-        """Create a complete tenant configuration"""
-        # Generate unique tenant_id
-        tenant_id = self.generate_unique_tenant_id()
-        if not tenant_id:
-            return None
+    def emit(self, progress: Optional[ProgressCallback], event: str, **data):
+        """Report a provisioning event to the caller's hook, never failing the run because of it."""
+        if progress is None:
+            return
+        try:
+            progress({"event": event, **data})
+        except Exception as e:
+            logger.warning("Progress hook failed on %s: %s", event, e)
 
-        # Create tenant record
-        tenant_data = {
-            "name": tenant_name,
-            "tenant_id": tenant_id
-        }
-        tenant_record = self.pb.create_tenant(tenant_data)
-        if not tenant_record:
+    def get_plan(self) -> ProvisioningPlan:
+        """Compiled provisioning plan of the configured schema version."""
+        return schema_registry.get_plan(self.schema_version)
+
+    def provision_collections_import(self, plan: ProvisioningPlan, tenant_id: str,
+                                     progress: Optional[ProgressCallback] = None,
+                                     journal: Optional[ProvisioningJournal] = None) -> Optional[Dict[str, str]]:
+        """Create the tenant's collections with a single import call. None if PocketBase rejected it."""
+        journal = journal or ProvisioningJournal()
+        # Collection IDs are chosen here, so every relation (cycles included) resolves up front.
+        # IDs of an earlier attempt are reused: the import then updates instead of duplicating.
+        id_mapping, collections = plan.import_body(
+            tenant_id, {**journal.import_ids, **journal.collections})
+        journal.plan_import(id_mapping)
+        existing = set(journal.collections.values())
+        started = time.perf_counter()
+        # deleteMissing=false: other tenants' collections are left alone
+        if not self.pb.import_collections(collections, delete_missing=False) \
+                and not self.import_committed(plan, tenant_id, id_mapping, journal):
             return None
 
-        # Calculate path to pb_schema.json
-        current_dir = os.path.dirname(
-            os.path.abspath(__file__))  # Get services directory
-        app_dir = os.path.dirname(current_dir)  # Navigate up to app directory
-        schema_path = os.path.join(
-            app_dir, 'schema-collection', 'v1', 'pb_schema.json')
+        PROVISIONING_PHASE_DURATION.observe(time.perf_counter() - started, phase='import')
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info("Imported %d collections", len(plan.collections),
+                    extra={"tenant_id": tenant_id, "phase": "import", "duration_ms": duration_ms})
+        for wave in plan.waves:
+            for template_id in wave:
+                if id_mapping[template_id] not in existing:
+                    self.emit(progress, "collection_created",
+                              collection=plan.collections[template_id].collection_name(tenant_id),
+                              duration_ms=duration_ms)
+        journal.record_import(plan, id_mapping)
+        return id_mapping
 
-        try:
-            # Load schema template
-            with open(schema_path, 'r') as f:
-                schema = json.load(f)
-
-            # Dictionary to store original ID to new ID mapping
-            id_mapping = {}
-            app_prefix = "vms"  # Using 'vms' as the app prefix based on your example
-
-            # First pass - create all collections with non-relation fields
-            for collection in schema:
-                original_name = collection["name"]
-                base_name = original_name.split('_')[-1]
-                collection_name = f"{app_prefix}_{tenant_id}_{base_name}"
-                # Get non-relation fields
-                non_relation_fields = self.get_non_relation_fields(collection)
-
-                # If no non-relation fields exist, add a dummy field
-                if not non_relation_fields and "schema" in collection:
-                    non_relation_fields = [{
-                        "name": "dummy_field",
-                        "type": "text",
-                        "required": False,
-                        "options": {}
-                    }]
-                    print(
-                        f"Added dummy field to {collection_name} for initial creation")
-
-                # Create the collection with non-relation fields
-                collection_data = {
-                    "name": collection_name,
-                    "type": collection["type"],
-                    "schema": non_relation_fields,
-                    "listRule": collection.get("listRule"),
-                    "viewRule": collection.get("viewRule"),
-                    "createRule": collection.get("createRule"),
-                    "updateRule": collection.get("updateRule"),
-                    "deleteRule": collection.get("deleteRule"),
-                    "options": collection.get("options", {})
-                }
+    def import_committed(self, plan: ProvisioningPlan, tenant_id: str, id_mapping: Dict[str, str],
+                         journal: ProvisioningJournal) -> bool:
+        """Whether a failed import was committed anyway, e.g. its response timed out.
+
+        Collections that exist without the import having gone through are recorded,
+        so the per-collection fallback does not create them a second time.
+        """
+        live = self.pb.list_collections(f"{provisioning_plan.APP_PREFIX}_{tenant_id}_")
+        if live is None:
+            return False
+        live_ids = {collection["name"]: collection["id"] for collection in live}
+        found = {template_id: live_ids[collection.collection_name(tenant_id)]
+                 for template_id, collection in plan.collections.items()
+                 if collection.collection_name(tenant_id) in live_ids}
+        # The import is transactional and uses the IDs chosen here: all of them or none
+        if found == id_mapping:
+            logger.warning("Import reported a failure but its collections exist",
+                           extra={"tenant_id": tenant_id, "phase": "import"})
+            return True
+        for template_id, collection_id in found.items():
+            if journal.collections.get(template_id) != collection_id:
+                journal.record_collection(template_id, collection_id)
+        return False
+
+    def provision_collections(self, plan: ProvisioningPlan, tenant_id: str,
+                              progress: Optional[ProgressCallback] = None,
+                              journal: Optional[ProvisioningJournal] = None) -> Dict[str, str]:
+        """Create the tenant's collections one call at a time. Returns the template-to-new ID mapping."""
+        journal = journal or ProvisioningJournal()
+        # Original ID to new ID mapping, starting from what an earlier attempt created
+        id_mapping = dict(journal.collections)
 
+        pass_started = time.perf_counter()
+        for wave in plan.waves:
+            for template_id in wave:
+                if template_id in id_mapping:
+                    continue
+                collection = plan.collections[template_id]
+                collection_data = collection.create_body(tenant_id, id_mapping)
+                collection_name = collection.collection_name(tenant_id)
+                started = time.perf_counter()
                 try:
                     created_collection = self.pb.create_collection(
                         collection_data)
-                    print(f"{collection_name} created successfully!")
-                    id_mapping[collection["id"]] = created_collection["id"]
+                    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                    id_mapping[template_id] = created_collection["id"]
+                    logger.info("Created collection %s", collection_name, extra={
+                        "tenant_id": tenant_id, "collection": collection_name,
+                        "phase": "pass_one", "duration_ms": duration_ms, "sample": True})
+                    journal.record_collection(template_id, created_collection["id"])
+                    self.emit(progress, "collection_created", collection=collection_name,
+                              duration_ms=duration_ms)
                 except Exception as e:
-                    print(f"Error creating {collection_name}: {e}")
-                    continue
+                    logger.error("Error creating collection %s: %s", collection_name, e, extra={
+                        "tenant_id": tenant_id, "collection": collection_name, "phase": "pass_one"})
+                    self.emit(progress, "collection_failed", collection=collection_name,
+                              error=str(e))
 
-            # Second pass - update collections to add relation fields
-            for collection in schema:
-                original_name = collection["name"]
-                collection_id = id_mapping.get(collection["id"])
-                base_name = original_name.split('_')[-1]
-                collection_name = f"{app_prefix}_{tenant_id}_{base_name}"
+        PROVISIONING_PHASE_DURATION.observe(time.perf_counter() - pass_started, phase='pass_one')
 
-                if not collection_id:
-                    print(
-                        f"Skipping {collection_name} - not created in first pass")
-                    continue
+        # Only collections with relations on a cycle need a second call
+        pass_started = time.perf_counter()
+        for template_id in plan.deferred:
+            if template_id in journal.patched:
+                continue
+            collection = plan.collections[template_id]
+            collection_name = collection.collection_name(tenant_id)
+            collection_id = id_mapping.get(template_id)
+            if not collection_id:
+                logger.warning("Skipping relations of %s - not created", collection_name,
+                               extra={"tenant_id": tenant_id, "collection": collection_name})
+                continue
 
-                # Get all fields including relations (with updated collection IDs)
-                all_fields = []
-                if "schema" in collection:
-                    for field in collection["schema"]:
-                        cleaned_field = self.clean_field(field)
-
-                        # Handle relation fields
-                        if self.is_relation_field(field):
-                            original_related_id = field["options"]["collectionId"]
-                            if original_related_id in id_mapping:
-                                cleaned_field["options"] = {
-                                    "collectionId": id_mapping[original_related_id],
-                                    "cascadeDelete": field["options"].get("cascadeDelete", False),
-                                    "minSelect": field["options"].get("minSelect"),
-                                    "maxSelect": field["options"].get("maxSelect"),
-                                    "displayFields": field["options"].get("displayFields")
-                                }
-
-                        all_fields.append(cleaned_field)
-
-                # For collections that had a dummy field, remove it now
-                if any(f["name"] == "dummy_field" for f in all_fields):
-                    all_fields = [
-                        f for f in all_fields if f["name"] != "dummy_field"]
-                    print(f"Removed dummy field from {collection_name}")
-
-                # Update the collection with all fields
-                try:
-                    update_data = {"schema": all_fields}
-                    self.pb.update_collection(collection_id, update_data)
-                    print(
-                        f"Updated {collection_name} with all fields and relations")
-                except Exception as e:
-                    print(f"Error updating {collection_name}: {e}")
+            started = time.perf_counter()
+            try:
+                if self.pb.update_collection(
+                        collection_id, collection.update_body(id_mapping)) is None:
+                    raise RuntimeError("update rejected")
+                duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                logger.info("Added cyclic relations to %s", collection_name, extra={
+                    "tenant_id": tenant_id, "collection": collection_name,
+                    "phase": "pass_two", "duration_ms": duration_ms, "sample": True})
+                journal.record_relations(template_id)
+                self.emit(progress, "collection_updated", collection=collection_name,
+                          duration_ms=duration_ms)
+            except Exception as e:
+                logger.error("Error updating collection %s: %s", collection_name, e, extra={
+                    "tenant_id": tenant_id, "collection": collection_name, "phase": "pass_two"})
+        PROVISIONING_PHASE_DURATION.observe(time.perf_counter() - pass_started, phase='pass_two')
+
+        return id_mapping
+
+    async def provision_collections_async(self, plan: ProvisioningPlan, tenant_id: str,
+                                          progress: Optional[ProgressCallback] = None,
+                                          journal: Optional[ProvisioningJournal] = None) -> Dict[str, str]:
+        """Create the tenant's collections wave by wave, up to `concurrency` calls in flight."""
+        journal = journal or ProvisioningJournal()
+        id_mapping = dict(journal.collections)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def create(pb: AsyncPocketBaseService, template_id: str):
+            collection = plan.collections[template_id]
+            collection_data = collection.create_body(tenant_id, id_mapping)
+            collection_name = collection.collection_name(tenant_id)
+            try:
+                async with semaphore:
+                    started = time.perf_counter()
+                    created_collection = await pb.create_collection(collection_data)
+                duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                id_mapping[template_id] = created_collection["id"]
+                logger.info("Created collection %s", collection_name, extra={
+                    "tenant_id": tenant_id, "collection": collection_name,
+                    "phase": "pass_one", "duration_ms": duration_ms, "sample": True})
+                journal.record_collection(template_id, created_collection["id"])
+                self.emit(progress, "collection_created", collection=collection_name,
+                          duration_ms=duration_ms)
+            except Exception as e:
+                logger.error("Error creating collection %s: %s", collection_name, e, extra={
+                    "tenant_id": tenant_id, "collection": collection_name, "phase": "pass_one"})
+                self.emit(progress, "collection_failed", collection=collection_name,
+                          error=str(e))
 
+        async def update(pb: AsyncPocketBaseService, template_id: str):
+            collection = plan.collections[template_id]
+            collection_name = collection.collection_name(tenant_id)
+            collection_id = id_mapping.get(template_id)
+            if not collection_id:
+                logger.warning("Skipping relations of %s - not created", collection_name,
+                               extra={"tenant_id": tenant_id, "collection": collection_name})
+                return
+
+            try:
+                async with semaphore:
+                    started = time.perf_counter()
+                    updated = await pb.update_collection(
+                        collection_id, collection.update_body(id_mapping))
+                if updated is None:
+                    raise RuntimeError("update rejected")
+                duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                logger.info("Added cyclic relations to %s", collection_name, extra={
+                    "tenant_id": tenant_id, "collection": collection_name,
+                    "phase": "pass_two", "duration_ms": duration_ms, "sample": True})
+                journal.record_relations(template_id)
+                self.emit(progress, "collection_updated", collection=collection_name,
+                          duration_ms=duration_ms)
+            except Exception as e:
+                logger.error("Error updating collection %s: %s", collection_name, e, extra={
+                    "tenant_id": tenant_id, "collection": collection_name, "phase": "pass_two"})
+
+        # The admin token is shared with the synchronous client through the token manager
+        async with AsyncPocketBaseService(self.pb.tokens, base_url=self.pb.base_url) as pb:
+            # A wave only starts once the collections its relations target exist
+            with PROVISIONING_PHASE_DURATION.time(phase='pass_one'):
+                for wave in plan.waves:
+                    await asyncio.gather(*(create(pb, cid) for cid in wave if cid not in id_mapping))
+            with PROVISIONING_PHASE_DURATION.time(phase='pass_two'):
+                await asyncio.gather(*(update(pb, cid) for cid in plan.deferred
+                                       if cid not in journal.patched))
+
+        return id_mapping
+
+    async def delete_collections_async(self, tenant_id: str, collections: List[Dict],
+                                       progress: Optional[ProgressCallback] = None
+                                       ) -> Tuple[List[str], List[str]]:
+        """Delete collections with the ones holding relations first. Names deleted and names that failed
+
+        The order is provisioning's creation waves run backwards, so no
+        collection is deleted while another still points at it. Relations
+        that close a cycle are removed with a PATCH beforehand.
+        """
+        by_id = {collection["id"]: collection for collection in collections}
+        waves = plan_collection_waves(collections, self.is_relation_field)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        deleted: List[str] = []
+        failed: List[str] = []
+
+        async def unlink(pb: AsyncPocketBaseService, collection_id: str, field_names: set):
+            collection = by_id[collection_id]
+            schema = [field for field in collection.get("schema", [])
+                      if field["name"] not in field_names]
+            async with semaphore:
+                if await pb.update_collection(collection_id, {"schema": schema}) is None:
+                    failed.append(collection["name"])
+
+        async def delete(pb: AsyncPocketBaseService, collection_id: str):
+            collection_name = by_id[collection_id]["name"]
+            async with semaphore:
+                started = time.perf_counter()
+                ok = await pb.delete_collection(collection_id)
+            if not ok:
+                failed.append(collection_name)
+                self.emit(progress, "collection_failed", collection=collection_name)
+                return
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            deleted.append(collection_name)
+            logger.info("Deleted collection %s", collection_name, extra={
+                "tenant_id": tenant_id, "collection": collection_name,
+                "phase": "deprovision", "duration_ms": duration_ms, "sample": True})
+            self.emit(progress, "collection_deleted", collection=collection_name,
+                      duration_ms=duration_ms)
+
+        async with AsyncPocketBaseService(self.pb.tokens, base_url=self.pb.base_url) as pb:
+            # A self-relation does not block deleting its own collection
+            cycles = {}
+            for collection_id, field_names in waves.deferred_fields.items():
+                blocking = {field["name"] for field in by_id[collection_id].get("schema", [])
+                            if field["name"] in field_names
+                            and field["options"]["collectionId"] != collection_id}
+                if blocking:
+                    cycles[collection_id] = blocking
+            await asyncio.gather(*(unlink(pb, cid, names) for cid, names in cycles.items()))
+            for wave in reversed(waves.waves):
+                if failed:
+                    # Collections of earlier waves may still be referenced by what is left
+                    break
+                await asyncio.gather(*(delete(pb, cid) for cid in wave))
+
+        return deleted, failed
+
+    @staticmethod
+    def ensure_deletable(tenant_id: str):
+        """Raise SpareNotClaimedError if tenant_id belongs to a spare of the warm pool
+
+        A spare has collections but no vms_tenants record, which would
+        otherwise pass for a half-deleted tenant. Only checked with an app context.
+        """
+        if has_app_context() and warm_pool.unclaimed([tenant_id]):
+            raise SpareNotClaimedError(tenant_id)
+
+    def delete_tenant_configuration(self, tenant_id: str,
+                                    progress: Optional[ProgressCallback] = None) -> Optional[Dict]:
+        """Delete a tenant's collections, then its vms_tenants record. None if there is no such tenant
+
+        Nothing is tracked between attempts: what is left is rediscovered from
+        PocketBase, so running it again after a failure or an interruption
+        finishes the job. The record goes last, which keeps a half-deleted
+        tenant findable.
+        """
+        self.ensure_deletable(tenant_id)
+        self.route(tenant_id)
+        with PROVISIONING_PHASE_DURATION.time(phase='deprovision'):
+            collections = self.pb.list_collections(
+                f"{provisioning_plan.APP_PREFIX}_{tenant_id}_")
+            if collections is None:
+                return {"tenant_id": tenant_id, "status": "incomplete", "collections_deleted": 0,
+                        "collections_failed": [], "tenant_record_deleted": False,
+                        "message": "Could not list the tenant's collections"}
+            record = self.pb.get_tenant(tenant_id)
+            if record is None and not collections:
+                return None
+
+            self.emit(progress, "deprovision_started", tenant_id=tenant_id,
+                      collections_total=len(collections))
+            deleted, failed = [], []
+            if collections:
+                deleted, failed = http_clients.run_async(
+                    self.delete_collections_async(tenant_id, collections, progress))
+
+            record_deleted = False
+            if record is not None and not failed:
+                record_deleted = self.pb.delete_tenant(record["id"])
+                if record_deleted:
+                    self.emit(progress, "tenant_deleted", tenant_id=tenant_id)
+            self.invalidate_tenant_configuration(tenant_id)
+
+            complete = not failed and (record is None or record_deleted)
+            # A leftover copy on a backend the tenant no longer lives on leaves the tenant alone
+            if complete and placement_router.forget(tenant_id, self.pb.base_url):
+                ProvisioningJournal.forget_tenant(tenant_id)
+            if complete:
+                logger.info("Deleted tenant %s", tenant_id, extra={"tenant_id": tenant_id})
+            else:
+                logger.error("Tenant %s is partially deleted: %d collections left", tenant_id,
+                             len(collections) - len(deleted), extra={"tenant_id": tenant_id})
             return {
                 "tenant_id": tenant_id,
-                "tenant_name": tenant_name,
-                "collections_created": len(id_mapping),
-                "status": "success"
+                "status": "deleted" if complete else "incomplete",
+                "collections_deleted": len(deleted),
+                "collections_failed": failed,
+                "tenant_record_deleted": record_deleted,
             }
 
+    def provision_collection_set(self, plan: ProvisioningPlan, tenant_id: str,
+                                 progress: Optional[ProgressCallback] = None,
+                                 journal: Optional[ProvisioningJournal] = None
+                                 ) -> Tuple[Dict[str, str], str]:
+        """Create the plan's collections under a tenant_id. The ID mapping and the strategy that made it"""
+        journal = journal or ProvisioningJournal()
+        strategy = self.strategy
+        id_mapping = None
+        if strategy == 'import':
+            id_mapping = self.provision_collections_import(plan, tenant_id, progress, journal)
+            if id_mapping is None:
+                # The import is all-or-nothing, so nothing needs undoing before retrying
+                logger.warning("Collection import failed, provisioning collection by collection",
+                               extra={"tenant_id": tenant_id, "phase": "import"})
+                strategy = 'collections'
+        if id_mapping is None:
+            if self.concurrency > 1:
+                # Runs on the shared loop so the async connection pool is reused
+                id_mapping = http_clients.run_async(
+                    self.provision_collections_async(plan, tenant_id, progress, journal))
+            else:
+                id_mapping = self.provision_collections(plan, tenant_id, progress, journal)
+        return id_mapping, strategy
+
+    def claim_warm_spare(self, tenant_name: str, plan: ProvisioningPlan,
+                         progress: Optional[ProgressCallback],
+                         journal: ProvisioningJournal) -> Optional[Dict]:
+        """Onboard a tenant onto a spare collection set from the warm pool. None if there was none
+
+        The spare's collections already carry its reserved tenant_id, so
+        binding it takes a single call: creating the vms_tenants record.
+        """
+        spare = warm_pool.claim(plan)
+        if spare is None:
+            return None
+
+        if spare.backend:
+            self.use_backend(spare.backend)
+        started = time.perf_counter()
+        try:
+            record = self.pb.create_tenant({"name": tenant_name, "tenant_id": spare.tenant_id})
+        except TenantIdConflictError:
+            # Taken since the spare was built; its collections cannot be used
+            warm_pool.discard(spare)
+            return None
+        if not record:
+            warm_pool.release(spare)
+            return None
+        PROVISIONING_PHASE_DURATION.observe(time.perf_counter() - started, phase='tenant_record')
+
+        tenant_id = spare.tenant_id
+        self.index.add(tenant_id)
+        journal.record_tenant(tenant_id)
+        journal.record_import(plan, spare.collections)
+        warm_pool.bind(spare)
+        self.invalidate_tenant_configuration(tenant_id)
+        logger.info("Tenant %s onboarded from the warm pool", tenant_id, extra={"tenant_id": tenant_id})
+        self.emit(progress, "tenant_created", tenant_id=tenant_id,
+                  collections_total=len(plan.collections), collections_done=len(plan.collections),
+                  resumed=False, warm=True)
+
+        result = {
+            "tenant_id": tenant_id,
+            "tenant_name": tenant_name,
+            "collections_created": len(spare.collections),
+            "strategy": "warm_pool",
+            "status": "success"
+        }
+        journal.finish(result)
+        return result
+
+    def create_tenant_configuration(self, tenant_name: str,
+                                    progress: Optional[ProgressCallback] = None,
+                                    idempotency_key: Optional[str] = None) -> Optional[Dict]:
+        """Create a complete tenant configuration, resuming an earlier attempt if there is one"""
+        result = None
+        with PROVISIONINGS_IN_FLIGHT.track_inprogress(), \
+                PROVISIONING_PHASE_DURATION.time(phase='total'):
+            try:
+                result = self._create_tenant_configuration(tenant_name, progress, idempotency_key)
+                return result
+            finally:
+                PROVISIONINGS.inc(outcome='success' if result else 'failure')
+
+    def _create_tenant_configuration(self, tenant_name: str,
+                                     progress: Optional[ProgressCallback],
+                                     idempotency_key: Optional[str]) -> Optional[Dict]:
+        schema_path = schema_registry.get_path(self.schema_version)
+        try:
+            # Compiled once per template change, not per request
+            plan = self.get_plan()
         except FileNotFoundError:
-            print(f"Schema file not found at {schema_path}")
+            logger.error("Schema file not found at %s", schema_path)
             return None
         except json.JSONDecodeError:
-            print(f"Invalid JSON in schema file at {schema_path}")
+            logger.error("Invalid JSON in schema file at %s", schema_path)
             return None
+
+        # Raises ProvisioningInProgressError while another attempt is running
+        journal = ProvisioningJournal.begin(tenant_name, plan, idempotency_key)
+        if journal.result is not None:
+            # Already provisioned under this Idempotency-Key
+            return journal.result
+
+        if not journal.tenant_id:
+            result = self.claim_warm_spare(tenant_name, plan, progress, journal)
+            if result is not None:
+                return result
+
+        tenant_id = journal.tenant_id
+        if tenant_id:
+            self.route(tenant_id)
+            logger.info("Resuming tenant %s: %d of %d collections already created",
+                        tenant_id, len(journal.collections), len(plan.collections),
+                        extra={"tenant_id": tenant_id})
+        else:
+            # Create tenant record under a unique tenant_id
+            tenant_id = self.create_tenant_record(tenant_name)
+            if not tenant_id:
+                journal.fail()
+                return None
+            journal.record_tenant(tenant_id)
+        self.emit(progress, "tenant_created", tenant_id=tenant_id,
+                  collections_total=len(plan.collections), collections_done=len(journal.collections),
+                  resumed=journal.resumed)
+
+        try:
+            id_mapping, strategy = self.provision_collection_set(plan, tenant_id, progress, journal)
+            self.invalidate_tenant_configuration(tenant_id)
+
+            if not journal.is_complete(plan):
+                # Left for a retry to finish rather than reported as a working tenant
+                logger.error("Tenant %s is incomplete: %d of %d collections created",
+                             tenant_id, len(journal.collections), len(plan.collections),
+                             extra={"tenant_id": tenant_id})
+                journal.fail()
+                return None
+
+            result = {
+                "tenant_id": tenant_id,
+                "tenant_name": tenant_name,
+                "collections_created": len(id_mapping),
+                "strategy": strategy,
+                "status": "success"
+            }
+            journal.finish(result)
+            return result
+
         except Exception as e:
-            print(f"Unexpected error during tenant configuration: {e}")
+            logger.exception("Unexpected error during tenant configuration: %s", e,
+                             extra={"tenant_id": tenant_id})
+            journal.fail()
             return None
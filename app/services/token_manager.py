@@ -0,0 +1,144 @@
+import base64
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+TokenFetcher = Callable[[], Optional[str]]
+
+
+def decode_token_expiry(token: str) -> Optional[float]:
+    """Read the `exp` claim of a JWT without verifying it. None if there is none."""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+        return float(exp) if exp is not None else None
+    except Exception:
+        return None
+
+
+class AdminTokenManager:
+    """Thread-safe cache of one PocketBase admin token.
+
+    Refreshes are single-flight: concurrent callers that find the token
+    missing or stale wait for the one in-progress authentication and reuse
+    its result. When the token carries an `exp` claim, a daemon timer
+    re-authenticates `refresh_margin` seconds before it expires.
+    """
+
+    def __init__(self, refresh_margin: Optional[float] = None):
+        self.refresh_margin = (Config.TOKEN_REFRESH_MARGIN
+                               if refresh_margin is None else refresh_margin)
+        self.token: Optional[str] = None
+        self.expires_at: Optional[float] = None
+        self.refresh_at: Optional[float] = None
+        self.auth_count = 0
+        self._fetch: Optional[TokenFetcher] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        """True when a token is cached and not about to expire."""
+        if not self.token:
+            return False
+        return self.refresh_at is None or time.time() < self.refresh_at
+
+    def get_token(self, fetch: TokenFetcher) -> Optional[str]:
+        """Return the cached token, authenticating through `fetch` if needed."""
+        token = self.token
+        if token and self.is_fresh():
+            return token
+        return self.refresh(fetch, stale=token)
+
+    def refresh(self, fetch: TokenFetcher, stale: Optional[str] = None) -> Optional[str]:
+        """Replace `stale` with a new token unless another caller already did."""
+        with self._lock:
+            if self.token and self.token != stale and self.is_fresh():
+                return self.token
+            self.auth_count += 1
+            token = fetch()
+            if token:
+                self._store(token, fetch)
+            return token
+
+    def store(self, token: str, fetch: Optional[TokenFetcher] = None):
+        """Cache a token obtained elsewhere (e.g. by the async client)."""
+        with self._lock:
+            self._store(token, fetch)
+
+    def invalidate(self, token: Optional[str] = None):
+        """Drop the cached token, only if it is still `token` when one is given."""
+        with self._lock:
+            if token is None or self.token == token:
+                self.token = None
+                self.expires_at = self.refresh_at = None
+
+    def reset(self):
+        """Forget the token and stop the refresh timer."""
+        with self._lock:
+            self._cancel_timer()
+            self.token = None
+            self.expires_at = self.refresh_at = None
+            self._fetch = None
+
+    def _store(self, token: str, fetch: Optional[TokenFetcher]):
+        self.token = token
+        self.expires_at = decode_token_expiry(token)
+        self.refresh_at = None
+        if self.expires_at is not None:
+            # Short-lived tokens refresh halfway through instead of immediately
+            lifetime = self.expires_at - time.time()
+            self.refresh_at = self.expires_at - min(self.refresh_margin, max(lifetime, 0) / 2)
+        if fetch is not None:
+            self._fetch = fetch
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        self._cancel_timer()
+        if self.refresh_at is None or self._fetch is None:
+            return
+        delay = self.refresh_at - time.time()
+        if delay <= 0:
+            return
+        self._timer = threading.Timer(delay, self._background_refresh, args=(self.token,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _background_refresh(self, token: str):
+        fetch = self._fetch
+        if fetch is None or self.token != token:
+            return
+        if not self.refresh(fetch, stale=token):
+            logger.warning("Background admin token refresh failed")
+
+
+_managers: Dict[Tuple[str, Optional[str]], AdminTokenManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_token_manager(base_url: str, admin_email: Optional[str]) -> AdminTokenManager:
+    """Process-wide token manager for one PocketBase instance and admin account."""
+    key = (base_url, admin_email)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = AdminTokenManager()
+        return manager
+
+
+def reset_token_managers():
+    """Forget every cached token (used by tests)."""
+    with _managers_lock:
+        for manager in _managers.values():
+            manager.reset()
+        _managers.clear()
@@ -0,0 +1,294 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Dict, Iterable, NamedTuple, Optional, Set
+from flask import has_app_context
+from ..config import Config
+from ..extensions import db
+from ..models import WarmSpare
+from ..models.provisioning_job import utcnow
+from ..schemas.provisioning_plan import ProvisioningPlan
+from .metrics import WARM_POOL_CLAIMS
+from .placement import PlacementConflictError, placement_router
+from .provisioning_journal import ProvisioningJournal
+
+logger = logging.getLogger(__name__)
+
+# Ready spares tried per claim before giving up to concurrent claimers
+CLAIM_CANDIDATES = 5
+
+
+class SpareNotClaimedError(Exception):
+    """Raised when deleting a tenant_id reserved by a spare that no tenant has claimed"""
+
+    def __init__(self, tenant_id: str):
+        super().__init__(f"{tenant_id} is an unclaimed warm pool spare, not a tenant")
+        self.tenant_id = tenant_id
+
+
+class ClaimedSpare(NamedTuple):
+    id: str
+    tenant_id: str
+    # Template collection ID -> PocketBase collection ID
+    collections: Dict[str, str]
+    # PocketBase backend the collections were built on; None for the default one
+    backend: Optional[str] = None
+
+
+class WarmPool:
+    """Keeps WARM_POOL_SIZE spare collection sets provisioned ahead of demand.
+
+    Each spare is built under a reserved tenant_id, so onboarding only has to
+    claim one (an atomic UPDATE on its row, safe across worker processes) and
+    create the vms_tenants record. A background thread refills the pool after
+    every claim and every WARM_POOL_REFILL_INTERVAL seconds, and deletes
+    spares built from another schema version. Refills are not coordinated
+    between processes; with several workers the pool may briefly hold a few
+    spares more than WARM_POOL_SIZE.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.size = 0
+        self.refill_concurrency = Config.WARM_POOL_REFILL_CONCURRENCY
+        self.refill_interval = Config.WARM_POOL_REFILL_INTERVAL
+        self.max_age = Config.WARM_POOL_MAX_AGE
+        self.schema_version: Optional[str] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.size = int(app.config.get('WARM_POOL_SIZE') or 0)
+        self.refill_concurrency = int(app.config.get('WARM_POOL_REFILL_CONCURRENCY') or 2)
+        self.refill_interval = float(app.config.get('WARM_POOL_REFILL_INTERVAL') or 30)
+        self.max_age = int(app.config.get('WARM_POOL_MAX_AGE') or 0)
+        self.schema_version = app.config.get('SCHEMA_VERSION')
+        app.extensions['warm_pool'] = self
+        if self.size > 0:
+            self.start()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0 and self.app is not None
+
+    def start(self):
+        with self._lock:
+            # The refill thread does not survive a fork; start a fresh one in the child
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='warm-pool', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def kick(self):
+        """Ask the refill thread for a pass now rather than at the next interval"""
+        if self.enabled:
+            self.start()
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refill()
+            except Exception as e:
+                logger.exception("Warm pool refill failed: %s", e)
+            self._wake.wait(self.refill_interval)
+            self._wake.clear()
+
+    def _fresh(self, query, plan: ProvisioningPlan):
+        query = query.filter(WarmSpare.plan_fingerprint == plan.fingerprint)
+        if self.max_age:
+            query = query.filter(WarmSpare.created_at >= utcnow() - timedelta(seconds=self.max_age))
+        return query
+
+    def claim(self, plan: ProvisioningPlan) -> Optional[ClaimedSpare]:
+        """Take a ready spare built from this plan, or None if the pool is empty or disabled"""
+        if not self.enabled or not has_app_context():
+            return None
+
+        candidates = (self._fresh(WarmSpare.query.filter_by(status=WarmSpare.READY), plan)
+                      .with_entities(WarmSpare.id)
+                      .order_by(WarmSpare.created_at)
+                      .limit(CLAIM_CANDIDATES))
+        for (spare_id,) in candidates.all():
+            # Only one claimer can move a row out of READY, whichever process it runs in
+            claimed = (WarmSpare.query.filter_by(id=spare_id, status=WarmSpare.READY)
+                       .update({"status": WarmSpare.CLAIMED, "claimed_at": utcnow()},
+                               synchronize_session=False))
+            db.session.commit()
+            if claimed:
+                spare = db.session.get(WarmSpare, spare_id)
+                WARM_POOL_CLAIMS.inc(outcome='hit')
+                self.kick()
+                return ClaimedSpare(spare.id, spare.tenant_id, dict(spare.collections or {}),
+                                    spare.backend)
+
+        WARM_POOL_CLAIMS.inc(outcome='miss')
+        self.kick()
+        return None
+
+    @staticmethod
+    def unclaimed(tenant_ids: Iterable[str]) -> Set[str]:
+        """Those of the tenant_ids reserved by a spare being built or waiting to be claimed"""
+        rows = (WarmSpare.query.with_entities(WarmSpare.tenant_id)
+                .filter(WarmSpare.tenant_id.in_(list(tenant_ids)))
+                .filter(WarmSpare.status.in_((WarmSpare.BUILDING, WarmSpare.READY))))
+        return {tenant_id for (tenant_id,) in rows}
+
+    def bind(self, spare: ClaimedSpare):
+        """The spare now belongs to a tenant and leaves the pool"""
+        WarmSpare.query.filter_by(id=spare.id).delete()
+        db.session.commit()
+
+    def release(self, spare: ClaimedSpare):
+        """Put back a spare whose tenant record could not be created"""
+        WarmSpare.query.filter_by(id=spare.id).update(
+            {"status": WarmSpare.READY, "claimed_at": None})
+        db.session.commit()
+
+    def discard(self, spare: ClaimedSpare):
+        """Give up on a spare; the next refill deletes its collections"""
+        WarmSpare.query.filter_by(id=spare.id).update({"status": WarmSpare.DISCARDED})
+        db.session.commit()
+        self.kick()
+
+    def refill(self) -> Dict[str, int]:
+        """One maintenance pass: retire outdated spares, then build up to `size`"""
+        from .tenant_service import TenantService
+
+        with self.app.app_context():
+            try:
+                plan = TenantService(schema_version=self.schema_version).get_plan()
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error("Warm pool cannot load the schema template: %s", e)
+                return {"built": 0, "failed": 0, "deleted": 0}
+
+            self._retire(plan)
+            usable = self._fresh(WarmSpare.query.filter(
+                WarmSpare.status.in_((WarmSpare.READY, WarmSpare.BUILDING))), plan).count()
+            needed = max(self.size - usable, 0)
+
+            # Not checked against PocketBase: a taken tenant_id makes the build fail on the
+            # collection names, or the claim fail on the vms_tenants unique index
+            service = TenantService(schema_version=self.schema_version)
+            reserved = []
+            for _ in range(needed):
+                tenant_id = service.new_tenant_id()
+                try:
+                    backend = placement_router.place(tenant_id)
+                except PlacementConflictError:
+                    continue
+                reserved.append(WarmSpare(tenant_id=tenant_id, schema_version=plan.version,
+                                          plan_fingerprint=plan.fingerprint, backend=backend))
+            db.session.add_all(reserved)
+            db.session.commit()
+            discarded = {spare.id: (spare.tenant_id, spare.backend) for spare in
+                         WarmSpare.query.filter_by(status=WarmSpare.DISCARDED)}
+
+            counts = {"built": 0, "failed": 0, "deleted": 0}
+            if not reserved and not discarded:
+                return counts
+
+            # Builds and deletions run in threads; only this thread writes the rows
+            workers = max(min(self.refill_concurrency, len(reserved) + len(discarded)), 1)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='warm-pool') as executor:
+                builds = {executor.submit(self._build, plan, spare.tenant_id, spare.backend): spare.id
+                          for spare in reserved}
+                deletions = {executor.submit(self._delete, tenant_id, backend): spare_id
+                             for spare_id, (tenant_id, backend) in discarded.items()}
+                for future in as_completed([*builds, *deletions]):
+                    if future in deletions:
+                        if future.result():
+                            tenant_id, backend = discarded[deletions[future]]
+                            placement_router.forget(tenant_id, backend)
+                            WarmSpare.query.filter_by(id=deletions[future]).delete()
+                            counts["deleted"] += 1
+                    elif future.result() is not None:
+                        WarmSpare.query.filter_by(id=builds[future]).update(
+                            {"status": WarmSpare.READY, "collections": future.result()})
+                        counts["built"] += 1
+                    else:
+                        # Whatever was created is cleaned up by a later pass
+                        WarmSpare.query.filter_by(id=builds[future]).update(
+                            {"status": WarmSpare.DISCARDED})
+                        counts["failed"] += 1
+                    db.session.commit()
+
+            logger.info("Warm pool refilled: %d built, %d failed, %d deleted",
+                        counts["built"], counts["failed"], counts["deleted"])
+            return counts
+
+    def _retire(self, plan: ProvisioningPlan):
+        """Discard outdated spares and recover the ones a dead worker left behind"""
+        outdated = WarmSpare.plan_fingerprint != plan.fingerprint
+        if self.max_age:
+            outdated = db.or_(outdated,
+                              WarmSpare.created_at < utcnow() - timedelta(seconds=self.max_age))
+        WarmSpare.query.filter(WarmSpare.status == WarmSpare.READY, outdated).update(
+            {"status": WarmSpare.DISCARDED}, synchronize_session=False)
+
+        abandoned = utcnow() - timedelta(seconds=Config.PROVISIONING_RUN_STALE)
+        WarmSpare.query.filter(WarmSpare.status == WarmSpare.BUILDING,
+                               WarmSpare.updated_at < abandoned).update(
+            {"status": WarmSpare.DISCARDED}, synchronize_session=False)
+        stuck = WarmSpare.query.filter(WarmSpare.status == WarmSpare.CLAIMED,
+                                       WarmSpare.claimed_at < abandoned).all()
+        if stuck:
+            from .pocketbase_service import PocketBaseService
+            for spare in stuck:
+                # The claimer died: either before creating the tenant record or after it
+                if PocketBaseService(base_url=spare.backend).get_tenant(spare.tenant_id) is not None:
+                    db.session.delete(spare)
+                else:
+                    spare.status = WarmSpare.DISCARDED
+        db.session.commit()
+
+    def _build(self, plan: ProvisioningPlan, tenant_id: str,
+               backend: Optional[str] = None) -> Optional[Dict[str, str]]:
+        from .tenant_service import TenantService
+
+        journal = ProvisioningJournal()
+        try:
+            TenantService(schema_version=self.schema_version, backend=backend).provision_collection_set(
+                plan, tenant_id, journal=journal)
+        except Exception as e:
+            logger.exception("Building warm spare %s crashed: %s", tenant_id, e,
+                             extra={"tenant_id": tenant_id})
+            return None
+        return dict(journal.collections) if journal.is_complete(plan) else None
+
+    def _delete(self, tenant_id: str, backend: Optional[str] = None) -> bool:
+        from .tenant_service import TenantService
+
+        try:
+            # Pinned: the spare's placement is only given back by the refill thread
+            result = TenantService(backend=backend).delete_tenant_configuration(tenant_id)
+        except Exception as e:
+            logger.exception("Deleting warm spare %s crashed: %s", tenant_id, e,
+                             extra={"tenant_id": tenant_id})
+            return False
+        return result is None or result["status"] == "deleted"
+
+    def stats(self) -> Dict:
+        rows = db.session.query(WarmSpare.status, db.func.count()).group_by(WarmSpare.status)
+        return {
+            "enabled": self.enabled,
+            "size": self.size,
+            "spares": dict(rows.all()),
+            "claims": {outcome: WARM_POOL_CLAIMS.value(outcome=outcome) for outcome in ('hit', 'miss')},
+        }
+
+
+warm_pool = WarmPool()
@@ -1,10 +1,31 @@
 import random
 import string
+import time
+
+ALPHABET = string.digits + string.ascii_lowercase
+# 2024-01-01T00:00:00Z in milliseconds; 8 base36 chars of ms cover ~89 years from here
+SORTABLE_EPOCH_MS = 1704067200000
+SORTABLE_TIME_CHARS = 8
 
 def generate_random_string(length=8) -> str:
     """Generate a random alphanumeric string"""
     return ''.join(random.choices(string.ascii_lowercase + string.digits, k=length))
 
+def generate_sortable_id(length=12) -> str:
+    """Generate a k-sortable ID: base36 milliseconds since 2024 followed by random characters"""
+    if length < SORTABLE_TIME_CHARS + 2:
+        raise ValueError(f"length must be at least {SORTABLE_TIME_CHARS + 2}")
+    millis = int(time.time() * 1000) - SORTABLE_EPOCH_MS
+    prefix = []
+    for _ in range(SORTABLE_TIME_CHARS):
+        millis, digit = divmod(millis, 36)
+        prefix.append(ALPHABET[digit])
+    return ''.join(reversed(prefix)) + generate_random_string(length - SORTABLE_TIME_CHARS)
+
 def validate_tenant_name(name: str) -> bool:
     """Validate tenant name meets requirements"""
-    return len(name) >= 3 and name.isalnum()
\ No newline at end of file
+    return len(name) >= 3 and name.isalnum()
+
+def is_truthy(value) -> bool:
+    """Interpret a query-string or environment flag"""
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
@@ -0,0 +1,46 @@
+import json
+import re
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Which encoder is in use; orjson is optional (pip install orjson)
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+_encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
+# An object whose first key is a plain "id" string, as PocketBase serializes its models
+_LEADING_ID = re.compile(rb'\s*\{\s*"id"\s*:\s*"([A-Za-z0-9_-]*)"')
+_PLAIN_STRING = re.compile(r'[A-Za-z0-9_-]*\Z')
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON, the same with either backend"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return _encode(value).encode()
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def escape_string(value: str) -> bytes:
+    """The JSON string literal of `value`, without the surrounding quotes"""
+    if _PLAIN_STRING.match(value):
+        return value.encode()
+    return dumps(value)[1:-1]
+
+
+def object_id(data: bytes) -> Optional[str]:
+    """The top-level "id" of a JSON object, read without parsing the rest when it comes first"""
+    match = _LEADING_ID.match(data)
+    if match is not None:
+        return match.group(1).decode()
+    value = loads(data)
+    return value.get("id") if isinstance(value, dict) else None
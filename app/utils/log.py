@@ -0,0 +1,174 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Mapping, Optional
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {'message', 'asctime', 'sample'}
+
+LOG_SETTINGS = ('LOG_LEVEL', 'LOG_FORMAT', 'LOG_QUEUE_SIZE', 'LOG_SAMPLE_DEBUG', 'LOG_SAMPLE_INFO')
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and every `extra` field."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with the `extra` fields appended as key=value."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = ' '.join(f"{key}={value}" for key, value in record.__dict__.items()
+                          if key not in _RECORD_ATTRS and not key.startswith('_'))
+        return f"{line} {fields}" if fields else line
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of the records logged with `extra={'sample': True}`.
+
+    Rates are per level, so chatty per-collection INFO lines can be thinned
+    while warnings and errors are always kept.
+    """
+
+    def __init__(self, rates: Mapping[int, float]):
+        super().__init__()
+        self.rates = dict(rates)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, 'sample', False):
+            return True
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class StdoutHandler(logging.StreamHandler):
+    """Writes to the current sys.stdout, which test runners and reloaders swap out."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Structured logging for the `app` package.
+
+    Request threads only format the message and put the record on a bounded
+    queue; a QueueListener thread does the stdout I/O. Configured from the
+    app config by `init_app`, restarted in forked workers and flushed at exit.
+    """
+
+    def __init__(self, logger_name: str = 'app'):
+        self.logger = logging.getLogger(logger_name)
+        self.handler: Optional[DroppingQueueHandler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self.settings: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def init_app(self, app):
+        self.configure({key: app.config.get(key) for key in LOG_SETTINGS})
+        app.extensions['log_pipeline'] = self
+
+    def configure(self, settings: Mapping[str, Any]):
+        """(Re)build the handler chain; safe to call more than once."""
+        with self._lock:
+            self._stop()
+            self.settings = dict(settings)
+            log_queue = queue.Queue(int(self.settings.get('LOG_QUEUE_SIZE') or 10000))
+
+            output = StdoutHandler()
+            if (self.settings.get('LOG_FORMAT') or 'json') == 'json':
+                output.setFormatter(JsonFormatter())
+            else:
+                output.setFormatter(TextFormatter())
+
+            self.handler = DroppingQueueHandler(log_queue)
+            self.handler.addFilter(SamplingFilter({
+                logging.DEBUG: self._rate('LOG_SAMPLE_DEBUG'),
+                logging.INFO: self._rate('LOG_SAMPLE_INFO'),
+            }))
+            self.logger.addHandler(self.handler)
+            self.logger.setLevel((self.settings.get('LOG_LEVEL') or 'INFO').upper())
+            # Records stop here so a root handler (e.g. gunicorn's) does not print them again
+            self.logger.propagate = False
+
+            self.listener = logging.handlers.QueueListener(log_queue, output)
+            self.listener.start()
+
+    def stop(self):
+        """Flush queued records and stop the listener thread."""
+        with self._lock:
+            self._stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queued': self.handler.queue.qsize() if self.handler else 0,
+            'dropped': self.handler.dropped if self.handler else 0,
+        }
+
+    def _rate(self, key: str) -> float:
+        # 0 is a valid rate, so only a missing setting means "keep everything"
+        value = self.settings.get(key)
+        return 1.0 if value is None or value == '' else float(value)
+
+    def _stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        if self.handler is not None:
+            self.logger.removeHandler(self.handler)
+            self.handler = None
+
+    def _after_fork(self):
+        # The listener thread stayed in the parent; start a fresh one here
+        self._lock = threading.Lock()
+        if self.listener is not None:
+            self.logger.removeHandler(self.handler)
+            self.listener = self.handler = None
+            self.configure(self.settings)
+
+
+log_pipeline = LogPipeline()
@@ -0,0 +1,237 @@
+import contextvars
+import cProfile
+import hmac
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILED_PREFIX = '/api/v1/tenants'
+# Hottest frames kept in memory per profile; the .prof file has all of them
+FRAMES_PER_PROFILE = 50
+
+_network_clock: contextvars.ContextVar[Optional['NetworkClock']] = contextvars.ContextVar(
+    'network_clock', default=None)
+
+
+class NetworkClock:
+    """Time a profiled request spent waiting on PocketBase.
+
+    `waiting` is wall time with at least one call in flight, so concurrent
+    calls of the async provisioning path are not counted twice; `busy` is the
+    plain sum of call durations.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+        self._in_flight = 0
+        self._since = 0.0
+        self._lock = threading.Lock()
+
+    def enter(self) -> float:
+        now = time.perf_counter()
+        with self._lock:
+            if self._in_flight == 0:
+                self._since = now
+            self._in_flight += 1
+            self.calls += 1
+        return now
+
+    def exit(self, started: float):
+        now = time.perf_counter()
+        with self._lock:
+            self._in_flight -= 1
+            self.busy += now - started
+            if self._in_flight == 0:
+                self.waiting += now - self._since
+
+
+@contextmanager
+def network_wait():
+    """Count the enclosed PocketBase call as network wait of the profiled request, if any."""
+    clock = _network_clock.get()
+    if clock is None:
+        yield
+        return
+    started = clock.enter()
+    try:
+        yield
+    finally:
+        clock.exit(started)
+
+
+class ProfileSession:
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now(timezone.utc)
+        self.profile = cProfile.Profile()
+        self.clock = NetworkClock()
+        self.status: Optional[int] = None
+        self._clock_token = _network_clock.set(self.clock)
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._thread_cpu = time.thread_time()
+        self.profile.enable()
+
+    def stop(self) -> Dict:
+        self.profile.disable()
+        _network_clock.reset(self._clock_token)
+        return {
+            "wall_ms": round((time.perf_counter() - self._wall) * 1000, 1),
+            # Process-wide, so it includes the asyncio loop thread that runs the
+            # collection calls; thread_cpu_ms is the request thread alone
+            "cpu_ms": round((time.process_time() - self._cpu) * 1000, 1),
+            "thread_cpu_ms": round((time.thread_time() - self._thread_cpu) * 1000, 1),
+            "network_wait_ms": round(self.clock.waiting * 1000, 1),
+            "network_busy_ms": round(self.clock.busy * 1000, 1),
+            "network_calls": self.clock.calls,
+        }
+
+
+def hot_frames(profile: cProfile.Profile, limit: int) -> List[Dict]:
+    """Functions with the most own (not cumulative) time"""
+    stats = pstats.Stats(profile).stats
+    frames = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [{
+        "function": f"{name} ({'/'.join(filename.split(os.sep)[-2:])}:{line})",
+        "calls": calls,
+        "own_ms": round(own * 1000, 3),
+        "cumulative_ms": round(cumulative * 1000, 3),
+    } for (filename, line, name), (_, calls, own, cumulative, _) in frames]
+
+
+class RequestProfiler:
+    """Opt-in cProfile of tenant onboarding requests.
+
+    A request is profiled when PROFILING_ENABLED is on and it carries an
+    X-Profile-Token header matching PROFILING_TOKEN, or falls within
+    PROFILING_SAMPLE_RATE. Besides the .prof file (open it with pstats or
+    snakeviz), each profile records how much of the wall time was CPU and how
+    much was spent waiting on PocketBase. The latest summaries are served by
+    GET /api/v1/admin/profiles.
+    """
+
+    def __init__(self, keep: int = 50):
+        self.enabled = False
+        self.token: Optional[str] = None
+        self.sample_rate = 0.0
+        self.directory = 'profiles'
+        self.recent: deque = deque(maxlen=keep)
+        # Only one profiler can be active at a time (enforced from Python 3.12 on)
+        self._busy = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get('PROFILING_ENABLED'))
+        self.token = app.config.get('PROFILING_TOKEN')
+        self.sample_rate = float(app.config.get('PROFILING_SAMPLE_RATE') or 0)
+        self.directory = app.config.get('PROFILING_DIR') or 'profiles'
+        keep = int(app.config.get('PROFILING_KEEP') or 50)
+        if keep != self.recent.maxlen:
+            self.recent = deque(self.recent, maxlen=keep)
+        app.extensions['profiler'] = self
+        if self.enabled:
+            app.before_request(self._start)
+            app.after_request(self._tag)
+            app.teardown_request(self._finish)
+
+    def wants(self) -> bool:
+        if not request.path.startswith(PROFILED_PREFIX):
+            return False
+        supplied = request.headers.get(PROFILE_HEADER)
+        if supplied and self.token and hmac.compare_digest(supplied, self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def summaries(self) -> List[Dict]:
+        return [{key: value for key, value in summary.items() if key != "frames"}
+                for summary in reversed(self.recent)]
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        return next((summary for summary in self.recent if summary["id"] == profile_id), None)
+
+    def top_frames(self, limit: int = 20) -> List[Dict]:
+        """Hottest frames summed over the retained profiles"""
+        totals: Dict[str, Dict] = {}
+        for summary in list(self.recent):
+            for frame in summary["frames"]:
+                total = totals.setdefault(frame["function"], {
+                    "function": frame["function"], "calls": 0, "own_ms": 0.0, "cumulative_ms": 0.0})
+                total["calls"] += frame["calls"]
+                total["own_ms"] = round(total["own_ms"] + frame["own_ms"], 3)
+                total["cumulative_ms"] = round(total["cumulative_ms"] + frame["cumulative_ms"], 3)
+        return sorted(totals.values(), key=lambda frame: frame["own_ms"], reverse=True)[:limit]
+
+    def clear(self):
+        self.recent.clear()
+
+    def _start(self):
+        if not self.wants() or not self._busy.acquire(blocking=False):
+            return
+        try:
+            g._profile_session = ProfileSession()
+        except Exception:
+            self._busy.release()
+            raise
+
+    def _tag(self, response):
+        session = g.get('_profile_session')
+        if session is not None:
+            session.status = response.status_code
+            response.headers['X-Profile-Id'] = session.id
+        return response
+
+    def _finish(self, exc=None):
+        session = g.pop('_profile_session', None)
+        if session is None:
+            return
+        try:
+            timings = session.stop()
+        finally:
+            self._busy.release()
+
+        summary = {
+            "id": session.id,
+            "method": request.method,
+            "path": request.path,
+            "status": session.status,
+            "started_at": session.started_at.isoformat(),
+            **timings,
+            "file": None,
+            "frames": hot_frames(session.profile, FRAMES_PER_PROFILE),
+        }
+        try:
+            summary["file"] = self._write(session)
+        except OSError as e:
+            logger.warning("Could not write profile %s: %s", session.id, e)
+        self.recent.append(summary)
+        logger.info("Profiled %s %s", request.method, request.path, extra={
+            "profile_id": session.id, "wall_ms": timings["wall_ms"], "cpu_ms": timings["cpu_ms"],
+            "network_wait_ms": timings["network_wait_ms"]})
+
+    def _write(self, session: ProfileSession) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory,
+                            f"{session.started_at.strftime('%Y%m%dT%H%M%S')}-{session.id}.prof")
+        session.profile.dump_stats(path)
+        # Keep the newest files only
+        files = sorted((os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                        if name.endswith('.prof')), key=os.path.getmtime, reverse=True)
+        for stale in files[self.recent.maxlen:]:
+            os.remove(stale)
+        return path
+
+
+profiler = RequestProfiler()
@@ -0,0 +1,107 @@
+"""CPU spent per tenant on collection payloads: dicts + stdlib json versus pre-rendered byte templates.
+
+Usage: python -m benchmarks.bench_payload_encoding [--sizes 100,500] [--tenants 50] [--relations 1.5]
+       [--cycle-ratio 0.1]
+
+For every collection of a synthetic schema the "dicts" path builds the
+create payload, serializes it the way httpx does (json.dumps) and parses
+PocketBase's echo of the collection to read its id; collections on a cycle
+also get their PATCH payload. The "templates" path renders the same
+requests from the plan's byte templates and reads the id with
+json_codec.object_id. The import strategy's single request body is
+measured the same way. Templates are timed with orjson when it is
+installed and with the stdlib fallback. No network is involved.
+"""
+import argparse
+import json
+import time
+from typing import Callable, Dict
+from unittest.mock import patch
+
+from app.schemas.provisioning_plan import ProvisioningPlan, new_collection_id
+from app.utils import json_codec
+from benchmarks.synthetic_schema import synthetic_plan
+
+
+def echoes(plan: ProvisioningPlan, tenant_id: str, id_mapping: Dict[str, str]) -> Dict[str, bytes]:
+    """What PocketBase answers to each create: the whole collection, id first."""
+    return {template_id: json.dumps({"id": id_mapping[template_id],
+                                     **collection.create_payload(tenant_id, id_mapping)}).encode()
+            for template_id, collection in plan.collections.items()}
+
+
+def with_dicts(plan: ProvisioningPlan, tenant_id: str, id_mapping: Dict[str, str],
+               responses: Dict[str, bytes]):
+    known = {}
+    for wave in plan.waves:
+        for template_id in wave:
+            json.dumps(plan.collections[template_id].create_payload(tenant_id, known)).encode()
+            known[template_id] = json.loads(responses[template_id])["id"]
+    for template_id in plan.deferred:
+        json.dumps(plan.collections[template_id].update_payload(known)).encode()
+
+
+def with_templates(plan: ProvisioningPlan, tenant_id: str, id_mapping: Dict[str, str],
+                   responses: Dict[str, bytes]):
+    known = {}
+    for wave in plan.waves:
+        for template_id in wave:
+            plan.collections[template_id].create_body(tenant_id, known)
+            known[template_id] = json_codec.object_id(responses[template_id])
+    for template_id in plan.deferred:
+        plan.collections[template_id].update_body(known)
+
+
+def import_with_dicts(plan: ProvisioningPlan, tenant_id: str, id_mapping: Dict[str, str], responses):
+    _, collections = plan.import_payload(tenant_id, id_mapping)
+    json.dumps({"collections": collections, "deleteMissing": False}).encode()
+
+
+def import_with_templates(plan: ProvisioningPlan, tenant_id: str, id_mapping: Dict[str, str], responses):
+    plan.import_body(tenant_id, id_mapping)
+
+
+def cpu_per_tenant(path: Callable, plan: ProvisioningPlan, tenants: int) -> float:
+    """Microseconds of process CPU time per tenant"""
+    inputs = []
+    for n in range(tenants):
+        tenant_id = f"t{n:07d}"
+        id_mapping = {template_id: new_collection_id() for template_id in plan.collections}
+        inputs.append((tenant_id, id_mapping, echoes(plan, tenant_id, id_mapping)))
+    path(plan, *inputs[0])
+    started = time.process_time()
+    for tenant_id, id_mapping, responses in inputs:
+        path(plan, tenant_id, id_mapping, responses)
+    return (time.process_time() - started) / tenants * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,500')
+    parser.add_argument('--tenants', type=int, default=50)
+    parser.add_argument('--relations', type=float, default=1.5)
+    parser.add_argument('--cycle-ratio', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    backends = ['json'] if json_codec.orjson is None else ['orjson', 'json']
+    print(f"{'collections':>11} {'strategy':>9} {'dicts us':>10} "
+          + " ".join(f"{backend + ' us':>10} {'saved':>6}" for backend in backends))
+    for size in (int(size) for size in args.sizes.split(',')):
+        for label, baseline, optimized in (('per-call', with_dicts, with_templates),
+                                           ('import', import_with_dicts, import_with_templates)):
+            row = []
+            # Plans compile their templates with the encoder in use at the time
+            with patch.object(json_codec, 'orjson', None):
+                dicts = cpu_per_tenant(baseline, synthetic_plan(
+                    size, args.relations, args.cycle_ratio, seed=args.seed), args.tenants)
+            for backend in backends:
+                with patch.object(json_codec, 'orjson', json_codec.orjson if backend == 'orjson' else None):
+                    plan = synthetic_plan(size, args.relations, args.cycle_ratio, seed=args.seed)
+                    templates = cpu_per_tenant(optimized, plan, args.tenants)
+                row.append(f"{templates:>10.0f} {1 - templates / dicts:>6.0%}")
+            print(f"{size:>11} {label:>9} {dicts:>10.0f} " + " ".join(row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""End-to-end throughput of TenantService.create_tenant_configuration against a local PocketBase stand-in.
+
+Usage: python -m benchmarks.bench_provisioning [--sizes 5,50,500] [--tenants 10] [--latency-ms 2]
+       [--error-rate 0] [--strategy import,collections] [--output results.json]
+       [--baseline benchmarks/baselines/provisioning.json] [--save-baseline]
+
+Every tenant of a synthetic schema is provisioned over real HTTP against
+tests.fake_pocketbase.FakePocketBase, which adds --latency-ms (+ --jitter-ms)
+to each request and fails a --error-rate share of them with a 503. Results
+are written as JSON and compared with the baseline: the run exits 1 when
+throughput, p95 latency or round trips per tenant regress by more than
+--tolerance (--round-trip-tolerance for round trips, which unlike timings do
+not depend on the machine). --warmup tenants per scenario are provisioned
+first and left out, so auth and connection setup do not skew small runs.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from unittest.mock import patch
+
+from app.config import Config
+from app.services.admission import reset_admission
+from app.services.http_pool import http_clients
+from app.services.resilience import reset_resilience
+from app.services.tenant_index import TenantIdIndex
+from app.services.tenant_service import TenantService, tenant_config_cache
+from app.services.token_manager import reset_token_managers
+from benchmarks.synthetic_schema import synthetic_plan
+from tests.fake_pocketbase import FakePocketBase
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'baselines', 'provisioning.json')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def reset_clients():
+    """Fresh tokens, pools, breakers and admission limits for every scenario."""
+    reset_token_managers()
+    http_clients.reset()
+    reset_resilience()
+    reset_admission()
+    tenant_config_cache.clear()
+
+
+def run_scenario(strategy: str, size: int, args) -> Dict:
+    plan = synthetic_plan(size, args.relations, args.cycle_ratio, seed=args.seed)
+    fake = FakePocketBase(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                          import_latency=args.import_latency_ms / 1000,
+                          error_rate=args.error_rate, seed=args.seed).start()
+    Config.POCKETBASE_URL = fake.url
+    reset_clients()
+    latencies = []
+    failed = 0
+
+    def provision(n: int) -> Optional[Dict]:
+        service = TenantService(concurrency=args.collection_concurrency, strategy=strategy,
+                                index=TenantIdIndex(capacity=1))
+        started = time.perf_counter()
+        result = service.create_tenant_configuration(f"Bench {size} {n}")
+        latencies.append(time.perf_counter() - started)
+        return result
+
+    try:
+        with patch.object(TenantService, 'get_plan', return_value=plan):
+            for n in range(args.warmup):
+                TenantService(concurrency=args.collection_concurrency, strategy=strategy,
+                              index=TenantIdIndex(capacity=1)).create_tenant_configuration(
+                    f"Warmup {size} {n}")
+            fake.requests.clear()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                results = list(pool.map(provision, range(args.tenants)))
+            elapsed = time.perf_counter() - started
+        failed = sum(1 for result in results if result is None)
+    finally:
+        fake.stop()
+        reset_clients()
+
+    return {
+        "strategy": strategy,
+        "collections": size,
+        "deferred": len(plan.deferred),
+        "tenants": args.tenants,
+        "failed": failed,
+        "tenants_per_second": round(args.tenants / elapsed, 3),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 1),
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "max": round(max(latencies) * 1000, 1),
+        },
+        "round_trips_per_tenant": round(len(fake.requests) / args.tenants, 1),
+    }
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float,
+            round_trip_tolerance: float) -> List[str]:
+    """Human-readable regressions of `results` against `baseline`"""
+    previous = {(entry["strategy"], entry["collections"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry["strategy"], entry["collections"]))
+        if before is None:
+            continue
+        label = f"{entry['strategy']}/{entry['collections']}"
+        checks = (
+            ("tenants/s", before["tenants_per_second"], entry["tenants_per_second"], False, tolerance),
+            ("p95 ms", before["latency_ms"]["p95"], entry["latency_ms"]["p95"], True, tolerance),
+            ("round trips", before["round_trips_per_tenant"], entry["round_trips_per_tenant"], True,
+             round_trip_tolerance),
+        )
+        for name, old, new, lower_is_better, allowed in checks:
+            worse = new > old * (1 + allowed) if lower_is_better else new < old * (1 - allowed)
+            if worse:
+                regressions.append(f"{label}: {name} {old} -> {new}")
+        if entry["failed"] > before["failed"]:
+            regressions.append(f"{label}: failed tenants {before['failed']} -> {entry['failed']}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='5,50,500', help='comma-separated collection counts')
+    parser.add_argument('--strategy', default='import,collections')
+    parser.add_argument('--tenants', type=int, default=10, help='tenants per scenario')
+    parser.add_argument('--warmup', type=int, default=1, help='uncounted tenants per scenario')
+    parser.add_argument('--concurrency', type=int, default=1, help='tenants provisioned at once')
+    parser.add_argument('--collection-concurrency', type=int, default=Config.PROVISIONING_CONCURRENCY)
+    parser.add_argument('--relations', type=float, default=1.0, help='relation fields per collection')
+    parser.add_argument('--cycle-ratio', type=float, default=0.1)
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--import-latency-ms', type=float, default=0.2,
+                        help='extra server time per collection of an import')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed timing regression')
+    parser.add_argument('--round-trip-tolerance', type=float, default=0.05)
+    parser.add_argument('--verbose', action='store_true', help='show the service logs')
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        # Injected errors would otherwise flood stderr with the services' error logs
+        logging.getLogger('app').setLevel(logging.CRITICAL)
+
+    Config.POCKETBASE_ADMIN_EMAIL = Config.POCKETBASE_ADMIN_EMAIL or 'bench@example.com'
+    Config.POCKETBASE_ADMIN_PASSWORD = Config.POCKETBASE_ADMIN_PASSWORD or 'bench'
+    Config.PROVISIONING_JOURNAL = False
+
+    results = []
+    for strategy in args.strategy.split(','):
+        for size in (int(size) for size in args.sizes.split(',')):
+            entry = run_scenario(strategy, size, args)
+            results.append(entry)
+            print(f"{strategy:<12} {size:>4} collections: {entry['tenants_per_second']:8.2f} tenants/s  "
+                  f"p50 {entry['latency_ms']['p50']:8.1f} ms  p95 {entry['latency_ms']['p95']:8.1f} ms  "
+                  f"{entry['round_trips_per_tenant']:6.1f} round trips  {entry['failed']} failed")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            "parameters": {key: value for key, value in vars(args).items()
+                           if key not in ('output', 'baseline', 'save_baseline', 'tolerance',
+                                           'round_trip_tolerance', 'verbose')},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["meta"]["parameters"] != report["meta"]["parameters"]:
+        print("Warning: baseline was recorded with different parameters", file=sys.stderr)
+    regressions = compare(results, baseline["results"], args.tolerance, args.round_trip_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Throughput of TenantService.generate_unique_tenant_id with and without the tenant index.
+
+Usage: python -m benchmarks.bench_tenant_id_generation [--tenants 300000] [--ids 2000] [--latency-ms 20]
+
+The remote existence check is simulated with a sleep of --latency-ms, the
+typical cost of one GET /api/collections/vms_tenants/records round trip.
+"""
+import argparse
+import time
+from unittest.mock import patch
+
+from app.services.tenant_index import TenantIdIndex
+from app.services.tenant_service import TenantService
+from app.utils.helpers import generate_random_string
+
+
+class SimulatedPocketBase:
+    def __init__(self, existing, latency):
+        self.existing = existing
+        self.latency = latency
+        self.calls = 0
+
+    def tenant_id_exists(self, tenant_id):
+        self.calls += 1
+        time.sleep(self.latency)
+        return tenant_id in self.existing
+
+    def iter_tenant_ids(self, page_size):
+        return iter(self.existing)
+
+
+def run(service, pb, count):
+    pb.calls = 0
+    started = time.perf_counter()
+    for _ in range(count):
+        service.generate_unique_tenant_id()
+    elapsed = time.perf_counter() - started
+    return count / elapsed, pb.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=300000)
+    parser.add_argument('--ids', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    existing = {generate_random_string(8) for _ in range(args.tenants)}
+    pb = SimulatedPocketBase(existing, args.latency_ms / 1000)
+
+    index = TenantIdIndex(capacity=args.tenants, error_rate=0.001)
+    started = time.perf_counter()
+    index.warm(pb)
+    warm_seconds = time.perf_counter() - started
+
+    with patch('app.services.tenant_service.PocketBaseService', return_value=pb):
+        cold = TenantService(index=TenantIdIndex(capacity=1))
+        warm = TenantService(index=index)
+        # The remote-only path is slow by design: sample fewer IDs
+        remote_rate, remote_calls = run(cold, pb, max(args.ids // 20, 1))
+        local_rate, local_calls = run(warm, pb, args.ids)
+
+    print(f"existing tenants:        {len(existing)}")
+    print(f"index size:              {index.size_bytes / 1024:.0f} KiB "
+          f"({index.size_bytes * 8 / len(existing):.1f} bits/tenant), warmed in {warm_seconds:.2f}s")
+    print(f"remote check only:       {remote_rate:10.1f} ids/s ({remote_calls} remote calls)")
+    print(f"bloom filter index:      {local_rate:10.1f} ids/s ({local_calls} remote calls "
+          f"for {args.ids} ids)")
+
+
+if __name__ == '__main__':
+    main()
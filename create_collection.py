@@ -1,15 +1,23 @@
+import argparse
+import csv
 import json
+import sys
+import time
 import httpx
 import random
 import string
-from pocketbase import PocketBase
 from typing import Dict, List
 
+try:
+    from pocketbase import PocketBase
+except ImportError:  # Only the interactive mode needs the PocketBase SDK
+    PocketBase = None
+
 # Create a custom httpx client with SSL verification disabled
 http_client = httpx.Client(verify=False)
 
 # Initialize PocketBase client with the custom httpx client
-pb = PocketBase('http://localhost:8090/', http_client=http_client)
+pb = PocketBase('http://localhost:8090/', http_client=http_client) if PocketBase else None
 
 
 def clean_field(field: Dict) -> Dict:
@@ -235,6 +243,74 @@ def create_collections_from_json(tenant_name: str):
         print(f"\nError during verification: {e}")
 
 
+def read_tenant_names(path: str) -> List[str]:
+    """Read tenant names from a CSV (a `name` column, or the first column) or JSONL file."""
+    with open(path, newline='') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            names = []
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                names.append(item["name"] if isinstance(item, dict) else str(item))
+            return names
+
+        rows = [row for row in csv.reader(f) if row and row[0].strip()]
+        if not rows:
+            return []
+        header = [cell.strip().lower() for cell in rows[0]]
+        if "name" in header:
+            column = header.index("name")
+            return [row[column].strip() for row in rows[1:] if len(row) > column]
+        return [row[0].strip() for row in rows]
+
+
+def provision_batch(names: List[str], concurrency: int, output=None, strategy=None) -> int:
+    """Provision tenants through the service layer, printing each result as it completes."""
+    from app.services.batch_service import BatchProvisioner
+
+    provisioner = BatchProvisioner(concurrency, strategy)
+    started = time.perf_counter()
+    results = []
+    for result in provisioner.provision(names):
+        results.append(result)
+        line = json.dumps(result)
+        print(line, flush=True)
+        if output:
+            output.write(line + "\n")
+            output.flush()
+
+    summary = provisioner.summarize(results, started)
+    print(json.dumps({"summary": summary}), file=sys.stderr)
+    return 0 if summary["failed"] == 0 else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Create tenant collections in PocketBase.")
+    parser.add_argument("--input", help="CSV or JSONL file of tenant names (non-interactive batch mode)")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="tenants provisioned at once (default: BATCH_CONCURRENCY)")
+    parser.add_argument("--output", help="also append JSONL results to this file")
+    parser.add_argument("--strategy", choices=("import", "collections"), default=None,
+                        help="collection provisioning strategy (default: PROVISIONING_STRATEGY)")
+    args = parser.parse_args(argv)
+
+    if not args.input:
+        tenant_name = input("Enter tenant name: ")
+        create_collections_from_json(tenant_name)
+        return 0
+
+    names = read_tenant_names(args.input)
+    if not names:
+        print(f"No tenant names found in {args.input}", file=sys.stderr)
+        return 1
+
+    if args.output:
+        with open(args.output, "a") as output:
+            return provision_batch(names, args.concurrency, output, args.strategy)
+    return provision_batch(names, args.concurrency, strategy=args.strategy)
+
+
 if __name__ == "__main__":
-    tenant_name = input("Enter tenant name: ")
-    create_collections_from_json(tenant_name)
+    sys.exit(main())
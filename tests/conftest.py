@@ -1,11 +1,29 @@
 import pytest
 from app import create_app
+from app.config import Config
 from app.extensions import db
+from app.services.admission import reset_admission
+from app.services.http_pool import http_clients
+from app.services.job_queue import job_queue
+from app.services.placement import placement_router
+from app.services.progress import progress_broker
+from app.services.resilience import reset_resilience
+from app.services.single_flight import onboarding_flights
+from app.services.tenant_index import tenant_index
+from app.services.tenant_service import tenant_config_cache
+from app.services.token_manager import reset_token_managers
+from app.utils.profiling import profiler
+from tests.fake_pocketbase import FakePocketBase
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TENANT_INDEX_WARMUP = False
+
 
 @pytest.fixture
 def app():
     """Create and configure a new app instance for each test."""
-    app = create_app()
+    app = create_app(TestConfig)
     app.config.update({
         "TESTING": True,
         "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
@@ -18,6 +36,24 @@ def app():
         db.session.remove()
         db.drop_all()
 
+@pytest.fixture
+def file_app(tmp_path):
+    """Like `app`, on a SQLite file so that worker threads get connections of their own."""
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+
+    app = create_app(FileConfig)
+    app.config.update({
+        "TESTING": True,
+        "POCKETBASE_URL": "http://test-pb:8090"
+    })
+
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
 @pytest.fixture
 def client(app):
     """A test client for the app."""
@@ -29,4 +65,35 @@ def mock_pb(mocker):
     mock = mocker.patch('app.services.pocketbase_service.PocketBaseService')
     mock.return_value.authenticate.return_value = True
     mock.return_value.tenant_id_exists.return_value = False
-    return mock
\ No newline at end of file
+    return mock
+
+@pytest.fixture
+def fake_pocketbase(monkeypatch):
+    """A local PocketBase stand-in that the services are pointed at."""
+    server = FakePocketBase().start()
+    monkeypatch.setattr(Config, 'POCKETBASE_URL', server.url)
+    monkeypatch.setattr(Config, 'POCKETBASE_ADMIN_EMAIL', 'admin@example.com')
+    monkeypatch.setattr(Config, 'POCKETBASE_ADMIN_PASSWORD', 'secret')
+    yield server
+    server.stop()
+
+@pytest.fixture(autouse=True)
+def reset_shared_state():
+    """Keep process-wide tokens, pooled clients and the tenant index from leaking between tests."""
+    reset_token_managers()
+    http_clients.reset()
+    tenant_index.reset()
+    tenant_config_cache.clear()
+    progress_broker.clear()
+    reset_resilience()
+    reset_admission()
+    profiler.clear()
+    onboarding_flights.clear()
+    job_queue.clear_coalescing()
+    placement_router.reset()
+    yield
+    reset_token_managers()
+    http_clients.reset()
+    tenant_index.reset()
+    tenant_config_cache.clear()
+    placement_router.reset()
@@ -0,0 +1,231 @@
+"""Minimal in-process stand-in for the PocketBase admin API used by the provisioning code."""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from app.schemas.provisioning_plan import new_collection_id
+
+TOKEN = "fake-admin-token"
+TENANTS_INDEX = "CREATE UNIQUE INDEX `idx_vms_tenants_tenant_id` ON `vms_tenants` (`tenant_id`)"
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 drops bursts of new connections, which then wait ~1s for a SYN retry
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class FakePocketBase:
+    """Serves collections and vms_tenants records from memory and records every request.
+
+    `import_enabled = False` makes PUT /api/collections/import answer 404 like
+    a server without the import API. Like PocketBase, a collection that another
+    collection still relates to cannot be deleted. Statuses queued in `fail_next` are
+    answered, one per request, before any real handling. Records of other
+    collections are only listed, from `records` (collection name -> list).
+
+    For benchmarks, every request can be delayed by `latency` seconds (plus up
+    to `jitter` more, and `import_latency` per imported collection) and fail
+    with a 503 at `error_rate`.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0,
+                 import_latency: float = 0.0, error_rate: float = 0.0, seed=None):
+        self.collections = {}
+        self.tenants = []
+        self.records = {}
+        self.requests = []
+        self.import_enabled = True
+        self.fail_next = []
+        self.latency = latency
+        self.jitter = jitter
+        self.import_latency = import_latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.collections["tenants0000000"] = {
+            "id": "tenants0000000", "name": "vms_tenants", "type": "base",
+            "schema": [{"name": "name", "type": "text"}, {"name": "tenant_id", "type": "text"}],
+            "indexes": [TENANTS_INDEX],
+        }
+        self.server = _Server(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self) -> "FakePocketBase":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def calls(self, method: str, path: str) -> int:
+        """How many requests were made to an endpoint"""
+        return sum(1 for m, p in self.requests if m == method and p == path)
+
+    def find_collection(self, id_or_name: str):
+        return self.collections.get(id_or_name) or next(
+            (c for c in self.collections.values() if c["name"] == id_or_name), None)
+
+    def validate(self, collection, known_ids):
+        """Error payload if the collection is invalid, else None"""
+        for field in collection.get("schema", []):
+            target = field.get("options", {}).get("collectionId")
+            if field.get("type") == "relation" and target not in known_ids:
+                return {"schema": {"code": "validation_missing_rel_collection",
+                                   "message": f"Unknown collection {target}"}}
+        return None
+
+    def delay(self, method: str, path: str, raw_body: bytes) -> float:
+        """Simulated server time of one request"""
+        if not (self.latency or self.jitter or self.import_latency):
+            return 0.0
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        if self.import_latency and method == "PUT" and path == "/api/collections/import":
+            delay += self.import_latency * len(json.loads(raw_body or b"{}").get("collections", []))
+        return delay
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body=None):
+                data = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def body(self):
+                return json.loads(self.raw_body or b"{}")
+
+            def handle_any(self, method):
+                # Always drain the body so keep-alive connections stay in sync
+                self.raw_body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                # Sleep outside the lock so concurrent requests overlap like on a real server
+                delay = fake.delay(method, url.path, self.raw_body)
+                if delay:
+                    time.sleep(delay)
+                with fake._lock:
+                    fake.requests.append((method, url.path))
+                    if fake.fail_next:
+                        return self.reply(fake.fail_next.pop(0), {"message": "Injected failure"})
+                    if fake.error_rate and fake._random.random() < fake.error_rate:
+                        return self.reply(503, {"message": "Injected failure"})
+                    if url.path == "/api/admins/auth-with-password":
+                        return self.reply(200, {"token": TOKEN})
+                    if self.headers.get("Authorization") != TOKEN:
+                        return self.reply(401, {"message": "Unauthorized"})
+                    return self.route(method, url.path, query)
+
+            def route(self, method, path, query):
+                if path == "/api/collections/import" and method == "PUT":
+                    if not fake.import_enabled:
+                        return self.reply(404, {"message": "Not found"})
+                    imported = self.body()["collections"]
+                    known = set(fake.collections) | {c.get("id") for c in imported}
+                    for collection in imported:
+                        error = fake.validate(collection, known)
+                        if error:
+                            return self.reply(400, {"message": "Import failed", "data": error})
+                    for collection in imported:
+                        fake.collections[collection["id"]] = collection
+                    return self.reply(204)
+
+                if path == "/api/collections/vms_tenants/records":
+                    if method == "POST":
+                        record = self.body()
+                        if any(t["tenant_id"] == record["tenant_id"] for t in fake.tenants):
+                            return self.reply(400, {"data": {"tenant_id": {
+                                "code": "validation_not_unique"}}})
+                        record = {"id": new_collection_id(), **record}
+                        fake.tenants.append(record)
+                        return self.reply(200, record)
+                    match = re.match(r"tenant_id='(.*)'", query.get("filter", ""))
+                    items = [t for t in fake.tenants
+                             if match is None or t["tenant_id"] == match.group(1)]
+                    return self.reply(200, {"items": items})
+
+                if path.startswith("/api/collections/vms_tenants/records/") and method == "DELETE":
+                    record_id = path.rsplit("/", 1)[1]
+                    remaining = [t for t in fake.tenants if t["id"] != record_id]
+                    if len(remaining) == len(fake.tenants):
+                        return self.reply(404, {"message": "Not found"})
+                    fake.tenants[:] = remaining
+                    return self.reply(204)
+
+                if path == "/api/collections":
+                    if method == "POST":
+                        collection = self.body()
+                        error = fake.validate(collection, set(fake.collections))
+                        if error:
+                            return self.reply(400, {"data": error})
+                        # PocketBase serializes the id first
+                        collection = {"id": collection.pop("id", None) or new_collection_id(), **collection}
+                        fake.collections[collection["id"]] = collection
+                        return self.reply(200, collection)
+                    match = re.match(r"name~'(.*)%'", query.get("filter", ""))
+                    items = [c for c in fake.collections.values()
+                             if match is None or c["name"].startswith(match.group(1))]
+                    return self.reply(200, {"items": items})
+
+                records = re.match(r"/api/collections/([^/]+)/records$", path)
+                if records and method == "GET":
+                    collection = fake.find_collection(records.group(1))
+                    if collection is None:
+                        return self.reply(404, {"message": "Not found"})
+                    items = fake.records.get(collection["name"], [])
+                    return self.reply(200, {"items": items[:int(query.get("perPage", 30))],
+                                            "totalItems": len(items)})
+
+                collection = fake.find_collection(path[len("/api/collections/"):])
+                if not path.startswith("/api/collections/") or collection is None:
+                    return self.reply(404, {"message": "Not found"})
+                if method == "DELETE":
+                    referenced = any(
+                        field.get("type") == "relation"
+                        and field.get("options", {}).get("collectionId") == collection["id"]
+                        for other in fake.collections.values() if other is not collection
+                        for field in other.get("schema", []))
+                    if referenced:
+                        return self.reply(400, {"message": "The collection is referenced by another collection"})
+                    del fake.collections[collection["id"]]
+                    return self.reply(204)
+                if method == "PATCH":
+                    update = self.body()
+                    error = fake.validate(update, set(fake.collections))
+                    if error:
+                        return self.reply(400, {"data": error})
+                    collection.update(update)
+                return self.reply(200, collection)
+
+            def do_GET(self):
+                self.handle_any("GET")
+
+            def do_POST(self):
+                self.handle_any("POST")
+
+            def do_PATCH(self):
+                self.handle_any("PATCH")
+
+            def do_PUT(self):
+                self.handle_any("PUT")
+
+            def do_DELETE(self):
+                self.handle_any("DELETE")
+
+        return Handler
@@ -0,0 +1,27 @@
+import pytest
+
+
+class TestAdminRoutes:
+    def test_http_pool_stats(self, client):
+        """Test that pool usage is exposed through the admin API."""
+        response = client.get('/api/v1/admin/http-pool')
+        assert response.status_code == 200
+        assert response.json["max_connections"] == 100
+        assert response.json["in_flight"] == 0
+
+    def test_logging_stats(self, client):
+        """Test that the log queue depth and drop count are exposed."""
+        response = client.get('/api/v1/admin/logging')
+        assert response.status_code == 200
+        assert response.json["dropped"] == 0
+
+    def test_admission_stats(self, client):
+        """Test that admission queue depth and waits are exposed per PocketBase instance."""
+        from app.services.admission import get_admission
+        get_admission("http://pb:8090").release(get_admission("http://pb:8090").acquire())
+
+        response = client.get('/api/v1/admin/admission')
+        assert response.status_code == 200
+        stats = response.json["http://pb:8090"]
+        assert stats["admitted_total"] == 1
+        assert stats["queue_depth"] == 0
@@ -1,5 +1,16 @@
+import json
+import threading
+import time
 import pytest
+from datetime import timedelta
 from unittest.mock import patch
+from app.config import Config
+from app.extensions import db
+from app.models import ProvisioningJob
+from app.models.provisioning_job import utcnow
+from app.services.job_queue import job_queue
+from app.services.metrics import ONBOARDINGS_COALESCED
+from app.services.single_flight import onboarding_flights
 from app.services.tenant_service import TenantService
 
 class TestApiRoutes:
@@ -12,7 +23,7 @@ class TestApiRoutes:
         }
         
         response = client.post(
-            '/api/v1/tenants',
+            '/api/v1/tenants?sync=true',
             json={'name': 'Test Tenant'}
         )
         
@@ -41,9 +52,305 @@ class TestApiRoutes:
         mock_service.return_value.create_tenant_configuration.return_value = None
         
         response = client.post(
-            '/api/v1/tenants',
+            '/api/v1/tenants?sync=true',
             json={'name': 'Test Tenant'}
         )
         
         assert response.status_code == 400
-        assert response.json["status"] == "error"
\ No newline at end of file
+        assert response.json["status"] == "error"
+
+    @patch('app.services.tenant_service.TenantService')
+    def test_create_tenant_config_enqueues_job(self, mock_service, client):
+        """Test that provisioning runs in the background and reports through the job API."""
+        def provision(name, progress=None, idempotency_key=None):
+            progress({"event": "tenant_created", "tenant_id": "test1234",
+                      "collections_total": 2})
+            progress({"event": "collection_created", "collection": "vms_test1234_a"})
+            progress({"event": "collection_created", "collection": "vms_test1234_b"})
+            return {"status": "success", "tenant_id": "test1234", "collections_created": 2}
+
+        mock_service.return_value.create_tenant_configuration.side_effect = provision
+
+        response = client.post('/api/v1/tenants', json={'name': 'Test Tenant'})
+        assert response.status_code == 202
+        job_id = response.json["job_id"]
+        assert response.headers["Location"] == f"/api/v1/jobs/{job_id}"
+
+        job_queue.wait(job_id, timeout=5)
+        job = client.get(f'/api/v1/jobs/{job_id}').json
+        assert job["status"] == "succeeded"
+        assert job["tenant_id"] == "test1234"
+        assert job["collections_done"] == 2
+        assert job["collections_total"] == 2
+        assert job["run_seconds"] is not None
+
+        jobs = client.get('/api/v1/jobs?status=succeeded').json["items"]
+        assert [j["job_id"] for j in jobs] == [job_id]
+
+    @patch('app.services.tenant_service.TenantService')
+    def test_failed_job(self, mock_service, client):
+        """Test that a failed provisioning is reported as a failed job."""
+        mock_service.return_value.create_tenant_configuration.return_value = None
+
+        job_id = client.post('/api/v1/tenants', json={'name': 'Test Tenant'}).json["job_id"]
+        job_queue.wait(job_id, timeout=5)
+
+        job = client.get(f'/api/v1/jobs/{job_id}').json
+        assert job["status"] == "failed"
+        assert job["error"]
+
+    def test_abandoned_job_is_failed(self, client):
+        """Test that a job whose process died is reported as failed instead of running forever."""
+        stale = utcnow() - timedelta(seconds=Config.PROVISIONING_RUN_STALE + 60)
+        abandoned = ProvisioningJob(tenant_name="Acme", status=ProvisioningJob.RUNNING, updated_at=stale)
+        queued = ProvisioningJob(tenant_name="Globex", status=ProvisioningJob.QUEUED, updated_at=stale)
+        live = ProvisioningJob(tenant_name="Initech", status=ProvisioningJob.RUNNING)
+        db.session.add_all([abandoned, queued, live])
+        db.session.commit()
+
+        job = client.get(f'/api/v1/jobs/{abandoned.id}').json
+        assert job["status"] == "failed"
+        assert "Abandoned" in job["error"]
+        assert client.get(f'/api/v1/jobs/{live.id}').json["status"] == "running"
+        statuses = {j["tenant_name"]: j["status"] for j in client.get('/api/v1/jobs').json["items"]}
+        assert statuses == {"Acme": "failed", "Globex": "failed", "Initech": "running"}
+
+    def test_failed_job_commit_releases_queue_slot(self, app):
+        """Test that a job that could not be recorded does not keep counting as queued."""
+        pending = job_queue._pending
+        with patch.object(db.session, 'commit', side_effect=RuntimeError("database is locked")):
+            with pytest.raises(RuntimeError):
+                job_queue.submit("Acme")
+        assert job_queue._pending == pending
+
+    def test_unknown_job(self, client):
+        """Test that an unknown job ID returns 404."""
+        assert client.get('/api/v1/jobs/missing').status_code == 404
+
+    @patch('app.services.batch_service.TenantService')
+    def test_batch_streams_ndjson(self, mock_service, client):
+        """Test that the batch endpoint streams one line per tenant plus a summary."""
+        mock_service.return_value.create_tenant_configuration.side_effect = (
+            lambda name: {"status": "success", "tenant_id": name.lower()})
+
+        response = client.post('/api/v1/tenants/batch', json={'names': ['A', 'B', 'C']})
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert sorted(line["tenant_id"] for line in lines[:-1]) == ["a", "b", "c"]
+        assert lines[-1]["summary"]["succeeded"] == 3
+
+    def test_batch_invalid_input(self, client):
+        """Test batch input validation."""
+        assert client.post('/api/v1/tenants/batch', json={'names': []}).status_code == 400
+        assert client.post('/api/v1/tenants/batch', json={'names': [1]}).status_code == 400
+        assert client.post('/api/v1/tenants/batch', json={'names': 'A'}).status_code == 400
+
+    @patch('app.services.tenant_service.PocketBaseService')
+    def test_get_tenant_config_cached_with_etag(self, mock_pb, client):
+        """Test that repeated polls are served from cache and revalidate with 304."""
+        pb = mock_pb.return_value
+        pb.get_tenant.return_value = {"id": "rec1", "tenant_id": "abc12345", "name": "Acme"}
+        pb.list_collections.return_value = [
+            {"id": "c2", "name": "vms_abc12345_posts"},
+            {"id": "c1", "name": "vms_abc12345_users"},
+        ]
+
+        response = client.get('/api/v1/tenants/abc12345')
+        assert response.status_code == 200
+        assert response.json["tenant"]["name"] == "Acme"
+        assert [c["name"] for c in response.json["collections"]] == [
+            "vms_abc12345_posts", "vms_abc12345_users"]
+        pb.list_collections.assert_called_once_with("vms_abc12345_")
+        etag = response.headers["ETag"]
+
+        response = client.get('/api/v1/tenants/abc12345', headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.data == b""
+        assert pb.get_tenant.call_count == 1
+
+    @patch('app.services.tenant_service.PocketBaseService')
+    def test_get_tenant_config_not_found(self, mock_pb, client):
+        """Test that an unknown tenant returns 404."""
+        mock_pb.return_value.get_tenant.return_value = None
+        assert client.get('/api/v1/tenants/missing1').status_code == 404
+
+    @patch('app.services.tenant_service.TenantService')
+    def test_create_tenant_config_sse_stream(self, mock_service, client):
+        """Test that ?stream=sse emits one event per provisioning step."""
+        def provision(name, progress=None, idempotency_key=None):
+            progress({"event": "tenant_created", "tenant_id": "test1234",
+                      "collections_total": 1})
+            progress({"event": "collection_created", "collection": "vms_test1234_a",
+                      "duration_ms": 12.5})
+            return {"status": "success", "tenant_id": "test1234", "collections_created": 1}
+
+        mock_service.return_value.create_tenant_configuration.side_effect = provision
+
+        response = client.post('/api/v1/tenants?stream=sse', json={'name': 'Test Tenant'})
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+
+        events = [line[len("event: "):] for line in response.data.decode().splitlines()
+                  if line.startswith("event: ")]
+        assert events == ["job_queued", "job_started", "tenant_created",
+                          "collection_created", "job_succeeded"]
+
+        # The finished run can be replayed by tenant_id as NDJSON
+        response = client.get('/api/v1/tenants/test1234/events?stream=ndjson')
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert lines[3]["duration_ms"] == 12.5
+        assert lines[-1]["result"]["tenant_id"] == "test1234"
+
+    def test_tenant_events_unknown(self, client):
+        """Test that streaming an unknown tenant returns 404."""
+        assert client.get('/api/v1/tenants/missing1/events').status_code == 404
+
+    @patch('app.routes.api.TenantService')
+    def test_create_tenant_config_strategy(self, mock_service, client):
+        """Test that the provisioning strategy can be chosen per request."""
+        mock_service.return_value.create_tenant_configuration.return_value = {
+            "status": "success", "tenant_id": "test1234", "strategy": "collections"}
+
+        response = client.post('/api/v1/tenants?sync=true',
+                               json={'name': 'Test Tenant', 'strategy': 'collections'})
+        assert response.status_code == 201
+        mock_service.assert_called_once_with(strategy='collections')
+
+        response = client.post('/api/v1/tenants?strategy=bulk', json={'name': 'Test Tenant'})
+        assert response.status_code == 400
+
+    @patch('app.routes.api.TenantService')
+    def test_create_tenant_config_idempotency_key(self, mock_service, client):
+        """Test that the Idempotency-Key header is passed on and a running key gets 409."""
+        from app.services.provisioning_journal import ProvisioningInProgressError
+        create = mock_service.return_value.create_tenant_configuration
+        create.return_value = {"status": "success", "tenant_id": "test1234"}
+
+        response = client.post('/api/v1/tenants?sync=true', json={'name': 'Test Tenant'},
+                               headers={'Idempotency-Key': 'abc'})
+        assert response.status_code == 201
+        assert create.call_args.kwargs["idempotency_key"] == "abc"
+
+        # The journal answers for runs this process is not coalescing, e.g. another worker's
+        onboarding_flights.clear()
+        create.side_effect = ProvisioningInProgressError("run1")
+        response = client.post('/api/v1/tenants?sync=true', json={'name': 'Test Tenant'},
+                               headers={'Idempotency-Key': 'abc'})
+        assert response.status_code == 409
+
+    @patch('app.routes.api.TenantService')
+    def test_delete_tenant_config(self, mock_service, client):
+        """Test that DELETE maps deleted, missing and partial deletions to status codes."""
+        delete = mock_service.return_value.delete_tenant_configuration
+        delete.return_value = {"tenant_id": "test1234", "status": "deleted",
+                               "collections_deleted": 3, "collections_failed": [],
+                               "tenant_record_deleted": True}
+        response = client.delete('/api/v1/tenants/test1234')
+        assert response.status_code == 200
+        assert response.json["collections_deleted"] == 3
+
+        delete.return_value = None
+        assert client.delete('/api/v1/tenants/test1234').status_code == 404
+
+        delete.return_value = {"tenant_id": "test1234", "status": "incomplete",
+                               "collections_deleted": 1, "collections_failed": ["vms_test1234_a"],
+                               "tenant_record_deleted": False}
+        assert client.delete('/api/v1/tenants/test1234').status_code == 502
+
+    @patch('app.routes.api.TenantService')
+    def test_delete_tenant_config_stream(self, mock_service, client):
+        """Test that ?stream=ndjson reports each deleted collection."""
+        def delete(tenant_id, progress=None):
+            progress({"event": "deprovision_started", "tenant_id": tenant_id, "collections_total": 1})
+            progress({"event": "collection_deleted", "collection": "vms_test1234_a"})
+            progress({"event": "tenant_deleted", "tenant_id": tenant_id})
+            return {"tenant_id": tenant_id, "status": "deleted", "collections_deleted": 1,
+                    "collections_failed": [], "tenant_record_deleted": True}
+
+        mock_service.return_value.delete_tenant_configuration.side_effect = delete
+
+        response = client.delete('/api/v1/tenants/test1234?stream=ndjson')
+        assert response.status_code == 200
+        events = [json.loads(line)["event"] for line in response.data.decode().splitlines() if line]
+        assert events == ["deprovision_started", "collection_deleted", "tenant_deleted",
+                          "deprovision_finished"]
+
+    @patch('app.routes.api.TenantService')
+    def test_saturated_pocketbase_returns_503(self, mock_service, client):
+        """Test that onboarding is shed with Retry-After while the admission queue is full."""
+        with patch('app.services.admission.AdmissionController.saturated', return_value=True), \
+                patch('app.services.admission.AdmissionController.retry_after', return_value=7):
+            response = client.post('/api/v1/tenants?sync=true', json={'name': 'Test Tenant'})
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '7'
+        mock_service.return_value.create_tenant_configuration.assert_not_called()
+
+    @patch('app.services.tenant_service.TenantService')
+    def test_duplicate_onboardings_share_a_job(self, mock_service, file_app):
+        """Test that a duplicate POST while the first one runs gets the same job."""
+        # Two jobs commit from worker threads while requests commit from this one
+        client = file_app.test_client()
+        release = threading.Event()
+
+        def provision(name, progress=None, idempotency_key=None):
+            release.wait(5)
+            return {"status": "success", "tenant_id": "test1234"}
+
+        mock_service.return_value.create_tenant_configuration.side_effect = provision
+
+        first = client.post('/api/v1/tenants', json={'name': 'Test Tenant'})
+        second = client.post('/api/v1/tenants', json={'name': '  test   TENANT '})
+        other = client.post('/api/v1/tenants', json={'name': 'Test Tenant'},
+                            headers={'Idempotency-Key': 'abc'})
+        release.set()
+
+        assert second.json["job_id"] == first.json["job_id"]
+        assert second.headers['X-Coalesced'] == 'true'
+        assert 'X-Coalesced' not in first.headers
+        assert other.json["job_id"] != first.json["job_id"]
+        job_queue.wait(first.json["job_id"], timeout=5)
+        job_queue.wait(other.json["job_id"], timeout=5)
+
+        # A late retry is answered with the finished job
+        retry = client.post('/api/v1/tenants', json={'name': 'Test Tenant'})
+        assert retry.json["job_id"] == first.json["job_id"]
+        assert retry.json["status"] == "succeeded"
+        assert mock_service.return_value.create_tenant_configuration.call_count == 2
+
+    @patch('app.routes.api.TenantService')
+    def test_duplicate_sync_onboardings_share_a_result(self, mock_service, app):
+        """Test that concurrent ?sync=true duplicates provision once."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def provision(name, idempotency_key=None):
+            started.set()
+            release.wait(5)
+            return {"status": "success", "tenant_id": "test1234"}
+
+        mock_service.return_value.create_tenant_configuration.side_effect = provision
+        coalesced = ONBOARDINGS_COALESCED.value(mode='sync')
+        responses = {}
+
+        def post(n):
+            responses[n] = app.test_client().post('/api/v1/tenants?sync=true',
+                                                  json={'name': 'Test Tenant'})
+
+        first = threading.Thread(target=post, args=(1,))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=post, args=(2,))
+        second.start()
+        while ONBOARDINGS_COALESCED.value(mode='sync') == coalesced:
+            time.sleep(0.001)
+        release.set()
+        first.join()
+        second.join()
+
+        assert [responses[n].status_code for n in (1, 2)] == [201, 201]
+        assert responses[2].json == responses[1].json
+        assert responses[2].headers['X-Coalesced'] == 'true'
+        mock_service.return_value.create_tenant_configuration.assert_called_once()
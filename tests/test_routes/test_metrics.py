@@ -0,0 +1,12 @@
+import pytest
+
+
+class TestMetricsRoutes:
+    def test_metrics_exposition(self, client):
+        """Test that /metrics serves the Prometheus text format."""
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        body = response.data.decode()
+        assert '# TYPE pocketbase_request_duration_seconds histogram' in body
+        assert 'provisionings_in_flight 0' in body
@@ -0,0 +1,66 @@
+import json
+import pytest
+from unittest.mock import patch
+from app.schemas.provisioning_plan import compile_plan
+from app.utils import json_codec
+
+SCHEMA = [
+    {"id": "col1", "name": "app_users", "type": "auth", "listRule": "@request.auth.id != \"\"",
+     "options": {"allowEmailAuth": True},
+     "schema": [{"name": "email", "type": "email", "required": True},
+                {"name": "team", "type": "relation",
+                 "options": {"collectionId": "col2", "maxSelect": 1}}]},
+    {"id": "col2", "name": "app_teams", "type": "base",
+     "schema": [{"name": "owner", "type": "relation", "options": {"collectionId": "col1"}},
+                {"name": "title", "type": "text"}]},
+    {"id": "col3", "name": "app_posts", "type": "base",
+     "schema": [{"name": "author", "type": "relation", "options": {"collectionId": "col1"}},
+                {"name": "legacy", "type": "relation", "options": {"collectionId": "gone0"}}]},
+]
+IDS = {"col1": "aaaaaaaaaaaaaaa", "col2": "bbbbbbbbbbbbbbb", "col3": "ccccccccccccccc"}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def plan(request):
+    """The plan compiled with orjson and with the stdlib encoder."""
+    if request.param == "json":
+        with patch.object(json_codec, 'orjson', None):
+            yield compile_plan(SCHEMA)
+    elif json_codec.orjson is None:
+        pytest.skip("orjson is not installed")
+    else:
+        yield compile_plan(SCHEMA)
+
+
+class TestPayloadTemplates:
+    def test_bodies_match_payloads(self, plan):
+        """Test that the byte templates render exactly what the dict payloads hold."""
+        for collection in plan.collections.values():
+            assert json.loads(collection.create_body("ab12cd34", IDS)) == \
+                collection.create_payload("ab12cd34", IDS)
+            assert json.loads(collection.update_body(IDS)) == collection.update_payload(IDS)
+            assert json.loads(collection.import_body("ab12cd34", IDS)) == \
+                collection.import_payload("ab12cd34", IDS)
+
+        id_mapping, body = plan.import_body("ab12cd34", IDS)
+        assert id_mapping == IDS
+        assert json.loads(body) == plan.import_payload("ab12cd34", IDS)[1]
+
+    def test_only_tenant_parts_are_slots(self, plan):
+        """Test that a template splices in the tenant_id and the IDs of related collections only."""
+        posts = plan.collections["col3"]
+        assert posts.create_template.slots == (None, "col1")
+        assert posts.import_template.slots == (None, "col1", "col3")
+        assert posts.update_template is None
+        assert plan.collections["col2"].update_template.slots == ("col1",)
+
+    def test_unresolved_relation_falls_back(self, plan):
+        """Test that a relation whose target has no ID yet is rendered like the dict payload."""
+        posts = plan.collections["col3"]
+        assert posts.create_template.render("ab12cd34", {}) is None
+        assert json.loads(posts.create_body("ab12cd34", {})) == posts.create_payload("ab12cd34", {})
+
+    def test_tenant_id_is_escaped(self, plan):
+        """Test that a tenant_id with JSON metacharacters cannot break out of the name."""
+        body = plan.collections["col1"].create_body('x"y', IDS)
+        assert json.loads(body)["name"] == 'vms_x"y_users'
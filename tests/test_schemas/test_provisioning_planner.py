@@ -0,0 +1,44 @@
+import pytest
+from app.schemas.provisioning_planner import build_relation_graph, plan_collection_waves
+from app.services.tenant_service import TenantService
+
+
+def relation(name, target):
+    return {"name": name, "type": "relation", "options": {"collectionId": target}}
+
+
+class TestProvisioningPlanner:
+    is_relation_field = staticmethod(
+        lambda field: TenantService.is_relation_field(None, field))
+
+    def test_relation_graph_ignores_external_targets(self):
+        """Test that relations to collections outside the template are not edges."""
+        schema = [
+            {"id": "a", "schema": [relation("user", "_pb_users_auth_")]},
+            {"id": "b", "schema": [relation("a", "a"), {"name": "x", "type": "text"}]},
+        ]
+        graph = build_relation_graph(schema, self.is_relation_field)
+        assert graph == {"a": set(), "b": {"a"}}
+
+    def test_acyclic_schema_has_no_deferred_fields(self):
+        """Test that a chain is split into one wave per level."""
+        schema = [
+            {"id": "c", "schema": [relation("b", "b")]},
+            {"id": "b", "schema": [relation("a", "a")]},
+            {"id": "a", "schema": []},
+            {"id": "d", "schema": [relation("a", "a")]},
+        ]
+        plan = plan_collection_waves(schema, self.is_relation_field)
+        assert plan.waves == [["a"], ["b", "d"], ["c"]]
+        assert plan.deferred_fields == {}
+
+    def test_cycles_and_self_relations_are_deferred(self):
+        """Test that only edges inside a strongly connected component are deferred."""
+        schema = [
+            {"id": "a", "schema": [relation("b", "b"), relation("parent", "a")]},
+            {"id": "b", "schema": [relation("a", "a"), relation("c", "c")]},
+            {"id": "c", "schema": []},
+        ]
+        plan = plan_collection_waves(schema, self.is_relation_field)
+        assert plan.waves == [["a", "c"], ["b"]]
+        assert plan.deferred_fields == {"a": {"b", "parent"}, "b": {"a"}}
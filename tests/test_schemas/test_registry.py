@@ -0,0 +1,83 @@
+import json
+import os
+import pytest
+from app.schemas.provisioning_plan import compile_plan
+from app.schemas.registry import SchemaRegistry
+
+SCHEMA = [
+    {"id": "col1", "name": "app_users", "type": "auth", "listRule": "",
+     "schema": [{"name": "created", "type": "autodate", "system": True},
+                {"name": "team", "type": "relation",
+                 "options": {"collectionId": "col2", "maxSelect": 1}}]},
+    {"id": "col2", "name": "app_teams", "type": "base",
+     "schema": [{"name": "owner", "type": "relation",
+                 "options": {"collectionId": "col1"}}]},
+]
+
+
+def write_schema(root, version, schema):
+    os.makedirs(root / version, exist_ok=True)
+    path = root / version / "pb_schema.json"
+    path.write_text(json.dumps(schema))
+    return path
+
+
+class TestProvisioningPlan:
+    def test_compile_does_not_mutate_template(self):
+        """Test that compiling leaves autodate fields in the template untouched."""
+        schema = json.loads(json.dumps(SCHEMA))
+        plan = compile_plan(schema)
+        assert schema == SCHEMA
+        created = plan.collections["col1"].fields[0]
+        assert created.skeleton["type"] == "date"
+        assert "system" not in created.skeleton
+
+    def test_payloads_substitute_tenant_and_ids(self):
+        """Test that rendered payloads only differ by prefix and collection IDs."""
+        plan = compile_plan(SCHEMA)
+        users = plan.collections["col1"]
+
+        payload = users.create_payload("t1", {})
+        assert payload["name"] == "vms_t1_users"
+        assert payload["type"] == "auth"
+        assert [f["name"] for f in payload["schema"]] == ["created"]
+
+        update = users.update_payload({"col1": "new1", "col2": "new2"})
+        team = update["schema"][1]
+        assert team["options"]["collectionId"] == "new2"
+        assert team["options"]["maxSelect"] == 1
+
+        # Rendered payloads are copies; mutating them leaves the plan intact
+        payload["schema"][0]["type"] = "text"
+        assert users.create_payload("t2", {})["schema"][0]["type"] == "date"
+
+
+class TestSchemaRegistry:
+    def test_versions_sorted_naturally(self, tmp_path):
+        """Test that every directory with a template is a version."""
+        for version in ("v10", "v2", "v1"):
+            write_schema(tmp_path, version, SCHEMA)
+        os.makedirs(tmp_path / "drafts")
+        assert SchemaRegistry(str(tmp_path)).versions() == ["v1", "v2", "v10"]
+
+    def test_plan_cached_until_file_changes(self, tmp_path):
+        """Test that a plan is reused until the template's mtime changes."""
+        path = write_schema(tmp_path, "v1", SCHEMA)
+        registry = SchemaRegistry(str(tmp_path), default_version="v1")
+
+        plan = registry.get_plan()
+        assert registry.get_plan() is plan
+        assert len(plan.collections) == 2
+
+        path.write_text(json.dumps(SCHEMA[:1]))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        reloaded = registry.get_plan()
+        assert reloaded is not plan
+        assert len(reloaded.collections) == 1
+        assert reloaded.fingerprint != plan.fingerprint
+
+    def test_missing_version_raises(self, tmp_path):
+        """Test that an unknown version surfaces FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            SchemaRegistry(str(tmp_path)).get_plan("v9")
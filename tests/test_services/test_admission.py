@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.services.admission import AdmissionController, AdmissionRejectedError
+
+
+def controller(**kwargs):
+    settings = {"rate": 0, "max_in_flight": 1, "max_queue": 100, "queue_timeout": 5, "shared_path": ""}
+    return AdmissionController("pb", **{**settings, **kwargs})
+
+
+def start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+class TestAdmissionController:
+    def test_limits_calls_in_flight(self):
+        """Test that no more than max_in_flight calls run at once."""
+        admission = controller(max_in_flight=2)
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def call():
+            with admission.slot():
+                with lock:
+                    running.append(1)
+                    peak.append(len(running))
+                time.sleep(0.02)
+                with lock:
+                    running.pop()
+
+        threads = [start(call) for _ in range(6)]
+        for thread in threads:
+            thread.join()
+        assert max(peak) == 2
+        assert admission.stats()["admitted_total"] == 6
+        assert admission.stats()["in_flight"] == 0
+
+    def test_admits_in_arrival_order(self):
+        """Test that queued callers are admitted first come, first served."""
+        admission = controller()
+        order = []
+        lease = admission.acquire()
+
+        def call(n):
+            with admission.slot():
+                order.append(n)
+
+        threads = []
+        for n in range(5):
+            threads.append(start(call, n))
+            while admission.queue_depth < n + 1:
+                time.sleep(0.001)
+        admission.release(lease)
+        for thread in threads:
+            thread.join()
+        assert order == [0, 1, 2, 3, 4]
+
+    def test_rejects_when_queue_is_full(self):
+        """Test that a caller beyond max_queue is rejected at once with a retry hint."""
+        admission = controller(max_queue=1)
+        lease = admission.acquire()
+        waiting = start(lambda: admission.release(admission.acquire()))
+        while admission.queue_depth < 1:
+            time.sleep(0.001)
+
+        assert admission.saturated()
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            admission.acquire()
+        assert rejected.value.reason == "queue full"
+        assert rejected.value.retry_after >= 1
+
+        admission.release(lease)
+        waiting.join()
+        assert admission.stats()["rejected_total"] == 1
+
+    def test_rejects_after_queue_timeout(self):
+        """Test that a caller gives up once it has waited queue_timeout seconds."""
+        admission = controller(queue_timeout=0.05)
+        lease = admission.acquire()
+        started = time.monotonic()
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            admission.acquire()
+        assert rejected.value.reason == "queue timeout"
+        assert time.monotonic() - started >= 0.05
+        assert admission.queue_depth == 0
+        admission.release(lease)
+
+    def test_token_bucket_paces_calls(self):
+        """Test that calls beyond the burst are spaced by the rate."""
+        admission = controller(rate=100, burst=1, max_in_flight=0)
+        started = time.monotonic()
+        for _ in range(6):
+            admission.release(admission.acquire())
+        assert time.monotonic() - started >= 0.045
+
+    def test_async_callers_share_the_limit(self):
+        """Test that coroutines queue for the same slots as threads."""
+        admission = controller(max_in_flight=2)
+        running = []
+        peak = []
+
+        async def call():
+            async with admission.aslot():
+                running.append(1)
+                peak.append(len(running))
+                await asyncio.sleep(0.01)
+                running.pop()
+
+        async def main():
+            await asyncio.gather(*(call() for _ in range(8)))
+
+        asyncio.run(main())
+        assert max(peak) == 2
+        assert admission.stats()["in_flight"] == 0
+
+    def test_shared_limits_across_controllers(self, tmp_path):
+        """Test that controllers sharing a SQLite file share the in-flight limit."""
+        path = str(tmp_path / "admission.db")
+        first = controller(shared_path=path, queue_timeout=0.1)
+        second = controller(shared_path=path, queue_timeout=0.1)
+
+        lease = first.acquire()
+        with pytest.raises(AdmissionRejectedError):
+            second.acquire()
+        first.release(lease)
+        second.release(second.acquire())
@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+from app.services.async_pocketbase_service import AsyncPocketBaseService
+from app.services.token_manager import AdminTokenManager
+
+class TestAsyncPocketBaseService:
+    @patch('httpx.AsyncClient')
+    def test_authenticate_success(self, mock_client):
+        """Test successful authentication."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"token": "test-token"}
+        mock_client.return_value.post = AsyncMock(return_value=mock_response)
+
+        pb = AsyncPocketBaseService()
+        assert asyncio.run(pb.authenticate()) is True
+        assert pb.token == "test-token"
+
+    @patch('httpx.AsyncClient')
+    def test_concurrent_calls_authenticate_once(self, mock_client):
+        """Test that concurrent calls without a token share one auth request."""
+        mock_auth_response = MagicMock()
+        mock_auth_response.json.return_value = {"token": "test-token"}
+        mock_create_response = MagicMock()
+        mock_create_response.json.return_value = {"id": "col123"}
+
+        async def post(url, **kwargs):
+            await asyncio.sleep(0)
+            if url.endswith("/auth-with-password"):
+                return mock_auth_response
+            return mock_create_response
+
+        mock_client.return_value.post = AsyncMock(side_effect=post)
+
+        async def run():
+            pb = AsyncPocketBaseService()
+            return await asyncio.gather(
+                *(pb.create_collection({"name": f"c{i}"}) for i in range(5)))
+
+        results = asyncio.run(run())
+        assert results == [{"id": "col123"}] * 5
+        auth_calls = [c for c in mock_client.return_value.post.call_args_list
+                      if c.args[0].endswith("/auth-with-password")]
+        assert len(auth_calls) == 1
+
+    @patch('httpx.AsyncClient')
+    def test_update_collection_failure(self, mock_client):
+        """Test that a failed update returns None."""
+        mock_client.return_value.patch = AsyncMock(side_effect=Exception("boom"))
+
+        tokens = AdminTokenManager()
+        tokens.store("test-token")
+        pb = AsyncPocketBaseService(tokens)
+        assert asyncio.run(pb.update_collection("col123", {"schema": []})) is None
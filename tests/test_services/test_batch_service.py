@@ -0,0 +1,56 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from app.services.batch_service import BatchProvisioner
+
+
+class TestBatchProvisioner:
+    @patch('app.services.batch_service.TenantService')
+    def test_results_stream_in_completion_order(self, mock_service):
+        """Test that a slow tenant does not hold back results of faster ones."""
+        def provision(name):
+            if name == "slow":
+                time.sleep(0.2)
+            return {"status": "success", "tenant_id": name}
+
+        mock_service.return_value.create_tenant_configuration.side_effect = provision
+
+        results = list(BatchProvisioner(concurrency=4).provision(["slow", "a", "b"]))
+        assert [r["name"] for r in results][-1] == "slow"
+        assert {r["index"] for r in results} == {0, 1, 2}
+        assert all(r["status"] == "success" for r in results)
+
+    @patch('app.services.batch_service.TenantService')
+    def test_concurrency_is_bounded(self, mock_service):
+        """Test that no more than `concurrency` tenants provision at once."""
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def provision(name):
+            with lock:
+                active.append(name)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(name)
+            return {"status": "success", "tenant_id": name}
+
+        mock_service.return_value.create_tenant_configuration.side_effect = provision
+
+        results = list(BatchProvisioner(concurrency=3).provision([f"t{i}" for i in range(12)]))
+        assert len(results) == 12
+        assert max(peak) <= 3
+
+    @patch('app.services.batch_service.TenantService')
+    def test_failures_reported_per_tenant(self, mock_service):
+        """Test that one failed tenant does not fail the batch."""
+        mock_service.return_value.create_tenant_configuration.side_effect = [
+            None, {"status": "success", "tenant_id": "ok"}]
+
+        provisioner = BatchProvisioner(concurrency=1)
+        results = list(provisioner.provision(["bad", "good"]))
+        summary = provisioner.summarize(results, time.perf_counter())
+        assert summary["succeeded"] == 1
+        assert summary["failed"] == 1
@@ -0,0 +1,116 @@
+from datetime import timedelta
+from unittest.mock import patch
+from app.models import ProvisioningRun
+from app.models.provisioning_job import utcnow
+from app.extensions import db
+from app.schemas.provisioning_plan import compile_plan
+from app.services.orphan_sweep import OrphanSweeper
+from app.services.tenant_service import TenantService
+
+SCHEMA = [
+    {"id": "col1", "name": "app_users", "type": "base",
+     "schema": [{"name": "email", "type": "email"},
+                {"name": "team", "type": "relation", "options": {"collectionId": "col2"}},
+                {"name": "manager", "type": "relation", "options": {"collectionId": "col1"}}]},
+    {"id": "col2", "name": "app_teams", "type": "base",
+     "schema": [{"name": "owner", "type": "relation", "options": {"collectionId": "col1"}}]},
+    {"id": "col3", "name": "app_posts", "type": "base",
+     "schema": [{"name": "author", "type": "relation", "options": {"collectionId": "col1"}}]},
+    {"id": "col4", "name": "app_comments", "type": "base",
+     "schema": [{"name": "post", "type": "relation", "options": {"collectionId": "col3"}}]},
+    {"id": "col5", "name": "app_tags", "type": "base",
+     "schema": [{"name": "label", "type": "text"}]},
+]
+
+
+def provision(name):
+    with patch.object(TenantService, 'get_plan', return_value=compile_plan(SCHEMA)):
+        return TenantService(concurrency=2).create_tenant_configuration(name)["tenant_id"]
+
+
+def tenant_collections(fake, tenant_id):
+    return [c["name"] for c in fake.collections.values() if c["name"].startswith(f"vms_{tenant_id}_")]
+
+
+class TestDeleteTenantConfiguration:
+    def test_deletes_collections_before_what_they_relate_to(self, app, fake_pocketbase):
+        """Test that collections go in reverse dependency order and the record goes last."""
+        tenant_id = provision("Acme")
+        events = []
+
+        result = TenantService(concurrency=4).delete_tenant_configuration(tenant_id, events.append)
+
+        assert result == {"tenant_id": tenant_id, "status": "deleted", "collections_deleted": 5,
+                          "collections_failed": [], "tenant_record_deleted": True}
+        assert tenant_collections(fake_pocketbase, tenant_id) == []
+        assert fake_pocketbase.tenants == []
+        deleted = [e["collection"].rsplit("_", 1)[1] for e in events if e["event"] == "collection_deleted"]
+        assert deleted.index("comments") < deleted.index("posts") < deleted.index("users")
+        assert events[0]["event"] == "deprovision_started"
+        assert events[-1]["event"] == "tenant_deleted"
+
+    def test_unknown_tenant(self, app, fake_pocketbase):
+        """Test that deleting a tenant that does not exist returns None."""
+        assert TenantService().delete_tenant_configuration("missing1") is None
+
+    def test_failed_run_keeps_record_and_resumes(self, app, fake_pocketbase):
+        """Test that a partial deletion keeps the tenant record and a retry finishes it."""
+        tenant_id = provision("Acme")
+        users = next(c for c in fake_pocketbase.collections.values() if c["name"].endswith("_users"))
+        # A collection outside the tenant still points at its users, so PocketBase refuses to delete them
+        fake_pocketbase.collections["external0000000"] = {
+            "id": "external0000000", "name": "audit_log", "type": "base",
+            "schema": [{"name": "user", "type": "relation", "options": {"collectionId": users["id"]}}]}
+
+        result = TenantService(concurrency=1).delete_tenant_configuration(tenant_id)
+        assert result["status"] == "incomplete"
+        assert result["collections_failed"] == [users["name"]]
+        assert result["tenant_record_deleted"] is False
+        assert len(fake_pocketbase.tenants) == 1
+
+        del fake_pocketbase.collections["external0000000"]
+
+        result = TenantService().delete_tenant_configuration(tenant_id)
+        assert result["status"] == "deleted"
+        assert tenant_collections(fake_pocketbase, tenant_id) == []
+        assert fake_pocketbase.tenants == []
+
+    def test_marks_journal_runs_deleted(self, app, fake_pocketbase):
+        """Test that the provisioning runs of a deleted tenant are not resumed into it."""
+        tenant_id = provision("Acme")
+        TenantService().delete_tenant_configuration(tenant_id)
+        assert ProvisioningRun.query.one().status == ProvisioningRun.DELETED
+
+
+class TestOrphanSweeper:
+    def test_finds_and_sweeps_orphans(self, app, fake_pocketbase):
+        """Test that collections without a record and stale failed runs are swept."""
+        healthy = provision("Healthy")
+        headless = provision("Headless")
+        fake_pocketbase.tenants[:] = [t for t in fake_pocketbase.tenants if t["tenant_id"] != headless]
+        failed = provision("Failed")
+        run = ProvisioningRun.query.filter_by(tenant_id=failed).one()
+        run.status = ProvisioningRun.FAILED
+        run.updated_at = utcnow() - timedelta(hours=1)
+        db.session.commit()
+
+        sweeper = OrphanSweeper(concurrency=2, min_age=60, app=app)
+        orphans = sweeper.find_orphans()
+        assert orphans == {headless: "no tenant record", failed: "failed provisioning"}
+
+        results = {r["tenant_id"]: r for r in sweeper.sweep(orphans)}
+        assert results[headless]["status"] == "deleted"
+        assert results[headless]["tenant_record_deleted"] is False
+        assert results[failed]["status"] == "deleted"
+        assert tenant_collections(fake_pocketbase, headless) == []
+        assert tenant_collections(fake_pocketbase, failed) == []
+        assert len(tenant_collections(fake_pocketbase, healthy)) == 5
+        assert sweeper.find_orphans() == {}
+
+    def test_recent_failures_are_left_alone(self, app, fake_pocketbase):
+        """Test that a failed run younger than min_age is not an orphan yet."""
+        failed = provision("Failed")
+        ProvisioningRun.query.filter_by(tenant_id=failed).one().status = ProvisioningRun.FAILED
+        db.session.commit()
+
+        assert OrphanSweeper(min_age=600, app=app).find_orphans() == {}
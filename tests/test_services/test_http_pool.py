@@ -0,0 +1,63 @@
+import asyncio
+import httpx
+import pytest
+from app.services.async_pocketbase_service import AsyncPocketBaseService
+from app.services.http_pool import HttpClientRegistry
+from app.services.pocketbase_service import PocketBaseService
+
+
+@pytest.fixture
+def registry():
+    registry = HttpClientRegistry()
+    yield registry
+    registry.close()
+
+
+class TestHttpClientRegistry:
+    def test_services_share_pooled_client(self, mocker, registry):
+        """Test that every PocketBaseService reuses the same pooled client."""
+        mocker.patch('app.services.pocketbase_service.http_clients', registry)
+        first, second = PocketBaseService(), PocketBaseService()
+        assert first.client is second.client
+        assert registry.get_client("http://other:8090") is not first.client
+
+    def test_stats_count_requests(self, registry):
+        """Test that in-flight and total counters follow requests through the pool."""
+        client = registry.get_client("http://pb")
+        seen = []
+
+        def handler(request):
+            seen.append(registry.stats()["in_flight"])
+            return httpx.Response(200, json={})
+
+        client._transport.transport = httpx.MockTransport(handler)
+        client.get("http://pb/api/health")
+        client.get("http://pb/api/health")
+
+        stats = registry.stats()
+        assert seen == [1, 1]
+        assert stats["in_flight"] == 0
+        assert stats["requests_total"] == 2
+
+    def test_async_client_shared_on_registry_loop(self, mocker, registry):
+        """Test that async services only share the pool on the registry's loop."""
+        mocker.patch('app.services.async_pocketbase_service.http_clients', registry)
+
+        async def clients():
+            async with AsyncPocketBaseService() as a, AsyncPocketBaseService() as b:
+                return a.client, b.client
+
+        first, second = registry.run_async(clients())
+        assert first is second
+        assert not first.is_closed
+
+        own, _ = asyncio.run(clients())
+        assert own is not first
+
+    def test_after_fork_drops_clients(self, registry):
+        """Test that a forked child builds its own clients instead of reusing the parent's."""
+        client = registry.get_client("http://pb")
+        registry._after_fork()
+        assert registry.get_client("http://pb") is not client
+        assert not client.is_closed
+
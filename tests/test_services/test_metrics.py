@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.schemas.provisioning_plan import compile_plan
+from app.services.metrics import (MetricsRegistry, POCKETBASE_DURATION, POCKETBASE_ERRORS,
+                                  PROVISIONING_PHASE_DURATION, PROVISIONINGS, timed_operation)
+from app.services.tenant_service import TenantService
+
+
+class TestMetricsRegistry:
+    def test_histogram_exposition(self):
+        """Test that histograms render cumulative buckets, sum and count."""
+        registry = MetricsRegistry()
+        latency = registry.histogram('op_seconds', 'Op latency', ['op'], buckets=(0.1, 1))
+        latency.observe(0.05, op='a')
+        latency.observe(0.5, op='a')
+        latency.observe(3, op='a')
+
+        lines = registry.render().splitlines()
+        assert '# TYPE op_seconds histogram' in lines
+        assert 'op_seconds_bucket{op="a",le="0.1"} 1' in lines
+        assert 'op_seconds_bucket{op="a",le="1"} 2' in lines
+        assert 'op_seconds_bucket{op="a",le="+Inf"} 3' in lines
+        assert 'op_seconds_sum{op="a"} 3.55' in lines
+        assert 'op_seconds_count{op="a"} 3' in lines
+
+    def test_counter_and_gauge(self):
+        """Test label escaping and gauge tracking."""
+        registry = MetricsRegistry()
+        errors = registry.counter('errors_total', 'Errors', ['kind'])
+        errors.inc(kind='say "hi"')
+        running = registry.gauge('running', 'Running')
+        with running.track_inprogress():
+            assert running.value() == 1
+        assert running.value() == 0
+
+        assert 'errors_total{kind="say \\"hi\\""} 1' in registry.render()
+
+    def test_labels_are_checked(self):
+        """Test that a misspelt label fails loudly."""
+        registry = MetricsRegistry()
+        with pytest.raises(ValueError):
+            registry.counter('c', 'C', ['a']).inc(b='x')
+
+    def test_timed_operation(self):
+        """Test that sync and async service methods record latency and failures."""
+        @timed_operation('test_sync')
+        def fails():
+            return None
+
+        @timed_operation('test_async', error_result=False)
+        async def succeeds():
+            return True
+
+        errors = POCKETBASE_ERRORS.value(operation='test_sync')
+        fails()
+        asyncio.run(succeeds())
+        assert POCKETBASE_ERRORS.value(operation='test_sync') == errors + 1
+        assert POCKETBASE_ERRORS.value(operation='test_async') == 0
+        assert POCKETBASE_DURATION.count(operation='test_async') >= 1
+
+
+class TestProvisioningMetrics:
+    def test_provisioning_is_instrumented(self, fake_pocketbase):
+        """Test that a provisioning records its phases and PocketBase calls."""
+        schema = [{"id": "col1", "name": "app_users", "type": "base", "schema": []}]
+        phases = {phase: PROVISIONING_PHASE_DURATION.count(phase=phase)
+                  for phase in ('id_generation', 'tenant_record', 'pass_one', 'pass_two', 'total')}
+        creates = POCKETBASE_DURATION.count(operation='create_collection')
+        successes = PROVISIONINGS.value(outcome='success')
+
+        service = TenantService(concurrency=1, strategy='collections')
+        with patch.object(TenantService, 'get_plan', return_value=compile_plan(schema)):
+            assert service.create_tenant_configuration("Acme")
+
+        assert all(PROVISIONING_PHASE_DURATION.count(phase=phase) == count + 1
+                   for phase, count in phases.items())
+        assert POCKETBASE_DURATION.count(operation='create_collection') == creates + 1
+        assert PROVISIONINGS.value(outcome='success') == successes + 1
@@ -0,0 +1,213 @@
+from unittest.mock import patch
+import pytest
+from app.config import Config
+from app.extensions import db
+from app.models import TenantPlacement
+from app.services.admission import get_admission
+from app.schemas.provisioning_plan import compile_plan
+from app.services.placement import HashRing, placement_router
+from app.services.rebalance import Rebalancer
+from app.services.tenant_service import TenantService
+from tests.fake_pocketbase import FakePocketBase
+
+SCHEMA = [
+    {"id": "col1", "name": "app_users", "type": "base",
+     "schema": [{"name": "email", "type": "email"},
+                {"name": "team", "type": "relation", "options": {"collectionId": "col2"}}]},
+    {"id": "col2", "name": "app_teams", "type": "base",
+     "schema": [{"name": "owner", "type": "relation", "options": {"collectionId": "col1"}}]},
+    {"id": "col3", "name": "app_tags", "type": "base",
+     "schema": [{"name": "label", "type": "text"}]},
+]
+
+
+def provision(name):
+    with patch.object(TenantService, 'get_plan', return_value=compile_plan(SCHEMA)):
+        return TenantService(concurrency=2).create_tenant_configuration(name)["tenant_id"]
+
+
+def holding(servers, tenant_id):
+    """URLs of the servers with a vms_tenants record for tenant_id"""
+    return [server.url for server in servers
+            if any(t["tenant_id"] == tenant_id for t in server.tenants)]
+
+
+def use_backends(monkeypatch, servers):
+    monkeypatch.setattr(Config, 'POCKETBASE_URLS', ",".join(server.url for server in servers))
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    """Three local PocketBase stand-ins, the first one being POCKETBASE_URL."""
+    servers = [FakePocketBase().start() for _ in range(3)]
+    monkeypatch.setattr(Config, 'POCKETBASE_URL', servers[0].url)
+    monkeypatch.setattr(Config, 'POCKETBASE_ADMIN_EMAIL', 'admin@example.com')
+    monkeypatch.setattr(Config, 'POCKETBASE_ADMIN_PASSWORD', 'secret')
+    use_backends(monkeypatch, servers)
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+class TestHashRing:
+    def test_adding_a_backend_only_moves_keys_to_it(self):
+        """Test that a new backend takes over about its share of keys and nothing else moves."""
+        keys = [f"tenant{n:04d}" for n in range(2000)]
+        before = HashRing(["a", "b", "c"])
+        after = HashRing(["a", "b", "c", "d"])
+
+        moved = [key for key in keys if before.node_for(key) != after.node_for(key)]
+        assert all(after.node_for(key) == "d" for key in moved)
+        assert 0.15 < len(moved) / len(keys) < 0.35
+        assert {before.node_for(key) for key in keys} == {"a", "b", "c"}
+
+
+class TestPlacement:
+    def test_tenants_spread_and_stay_reachable(self, app, backends):
+        """Test that onboarding spreads tenants and later reads and deletes reach their backend."""
+        tenant_ids = [provision(f"Tenant {n}") for n in range(12)]
+
+        placements = {row.tenant_id: row.backend for row in TenantPlacement.query}
+        assert set(placements) == set(tenant_ids)
+        assert len(set(placements.values())) > 1
+        for tenant_id in tenant_ids:
+            assert holding(backends, tenant_id) == [placements[tenant_id]]
+        # Each backend authenticates with its own admin token
+        for server in backends:
+            if server.url in placements.values():
+                assert server.calls("POST", "/api/admins/auth-with-password") == 1
+
+        placement_router.reset()
+        tenant_id = next(t for t in tenant_ids if placements[t] != Config.POCKETBASE_URL)
+        config, _ = TenantService().get_tenant_configuration(tenant_id)
+        assert config["tenant"]["tenant_id"] == tenant_id
+
+        result = TenantService().delete_tenant_configuration(tenant_id)
+        assert result["status"] == "deleted"
+        assert holding(backends, tenant_id) == []
+        assert db.session.get(TenantPlacement, tenant_id) is None
+
+    def test_least_loaded_policy(self, app, backends, monkeypatch):
+        """Test that least_loaded places a new tenant on the backend holding the fewest."""
+        monkeypatch.setattr(Config, 'PLACEMENT_POLICY', 'least_loaded')
+        db.session.add_all([TenantPlacement(tenant_id="aaa11111", backend=backends[0].url),
+                            TenantPlacement(tenant_id="bbb22222", backend=backends[1].url)])
+        db.session.commit()
+
+        tenant_id = provision("Acme")
+        assert holding(backends, tenant_id) == [backends[2].url]
+
+    def test_unplaced_tenants_live_on_the_home_backend(self, app, backends):
+        """Test that tenants from before sharding are found on POCKETBASE_URL and recorded by sync."""
+        with patch.object(TenantService, 'get_plan', return_value=compile_plan(SCHEMA)):
+            legacy = TenantService(backend=backends[0].url).create_tenant_configuration("Legacy")["tenant_id"]
+        assert TenantPlacement.query.count() == 0
+        assert placement_router.backend_for(legacy) == backends[0].url
+
+        summary = placement_router.sync()
+        assert summary["recorded"] == 1
+        assert summary["duplicates"] == {}
+        assert db.session.get(TenantPlacement, legacy).backend == backends[0].url
+
+    def test_admin_endpoint_reports_backends(self, client, backends):
+        """Test that the placement endpoint lists every backend with its tenant count."""
+        tenant_id = provision("Acme")
+
+        response = client.get('/api/v1/admin/placement')
+
+        assert response.status_code == 200
+        counts = {backend["url"]: backend["tenants"] for backend in response.get_json()["backends"]}
+        assert set(counts) == {server.url for server in backends}
+        assert counts[holding(backends, tenant_id)[0]] == 1
+
+    def test_saturated_backend_sheds_its_requests(self, client, backends):
+        """Test that a saturated shard gets onboardings and its own tenants' deletes shed with 503."""
+        db.session.add_all([TenantPlacement(tenant_id="busy1234", backend=backends[2].url),
+                            TenantPlacement(tenant_id="idle1234", backend=backends[1].url)])
+        db.session.commit()
+        admission = get_admission(backends[2].url)
+
+        with patch.object(admission, 'saturated', return_value=True), \
+                patch.object(admission, 'retry_after', return_value=4):
+            onboarding = client.post('/api/v1/tenants?sync=true', json={'name': 'Acme'})
+            busy = client.delete('/api/v1/tenants/busy1234')
+            idle = client.delete('/api/v1/tenants/idle1234')
+
+        assert onboarding.status_code == 503
+        assert onboarding.headers['Retry-After'] == '4'
+        assert busy.status_code == 503
+        assert idle.status_code == 404
+        assert not any(server.tenants for server in backends)
+
+
+class TestRebalancer:
+    def test_moves_tenants_onto_an_added_backend(self, app, backends, monkeypatch):
+        """Test that after adding a backend the tenants the ring now gives it are moved there."""
+        use_backends(monkeypatch, backends[:2])
+        tenant_ids = [provision(f"Tenant {n}") for n in range(12)]
+        assert not backends[2].tenants
+
+        use_backends(monkeypatch, backends)
+        rebalancer = Rebalancer(concurrency=3, app=app)
+        moves = rebalancer.plan()
+        assert moves and all(target == backends[2].url for _, _, target in moves)
+
+        results = list(rebalancer.run(moves))
+        assert {result["status"] for result in results} == {"moved"}
+        assert all(result["source_deleted"] for result in results)
+        for tenant_id in tenant_ids:
+            backend = db.session.get(TenantPlacement, tenant_id).backend
+            assert holding(backends, tenant_id) == [backend]
+            server = next(s for s in backends if s.url == backend)
+            assert len([c for c in server.collections.values()
+                        if c["name"].startswith(f"vms_{tenant_id}_")]) == len(SCHEMA)
+        assert rebalancer.plan() == []
+
+        placement_router.reset()
+        moved = moves[0][0]
+        config, _ = TenantService().get_tenant_configuration(moved)
+        assert config["tenant"]["tenant_id"] == moved
+
+    def test_skips_tenants_holding_records(self, app, backends, monkeypatch):
+        """Test that a tenant whose collections hold records is left where it is."""
+        use_backends(monkeypatch, backends[:2])
+        for n in range(12):
+            provision(f"Tenant {n}")
+        use_backends(monkeypatch, backends)
+        moves = Rebalancer(app=app).plan()
+        tenant_id, source, _ = moves[0]
+        server = next(s for s in backends if s.url == source)
+        server.records[f"vms_{tenant_id}_users"] = [{"id": "rec000000000001"}]
+
+        results = {result["tenant_id"]: result for result in Rebalancer(app=app).run(moves[:1])}
+
+        assert results[tenant_id]["status"] == "skipped"
+        assert results[tenant_id]["message"] == "holds records"
+        assert db.session.get(TenantPlacement, tenant_id).backend == source
+        assert holding(backends, tenant_id) == [source]
+
+    def test_records_written_during_the_copy_cancel_the_move(self, app, backends, monkeypatch):
+        """Test that a tenant gaining records mid-copy stays on its source and the target copy goes."""
+        use_backends(monkeypatch, backends[:2])
+        for n in range(12):
+            provision(f"Tenant {n}")
+        use_backends(monkeypatch, backends)
+        tenant_id, source, target = Rebalancer(app=app).plan()[0]
+        server = next(s for s in backends if s.url == source)
+        copy_one = Rebalancer.copy_one
+
+        def copy_then_write(self, *move):
+            outcome = copy_one(self, *move)
+            server.records[f"vms_{tenant_id}_users"] = [{"id": "rec000000000001"}]
+            return outcome
+
+        with patch.object(Rebalancer, 'copy_one', copy_then_write):
+            [result] = Rebalancer(app=app).run([(tenant_id, source, target)])
+
+        assert result["status"] == "skipped"
+        assert result["message"] == "holds records after the copy"
+        assert result["target_deleted"] is True
+        assert db.session.get(TenantPlacement, tenant_id).backend == source
+        assert holding(backends, tenant_id) == [source]
+        target_server = next(s for s in backends if s.url == target)
+        assert not any(c["name"].startswith(f"vms_{tenant_id}_") for c in target_server.collections.values())
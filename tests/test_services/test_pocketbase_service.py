@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from app.services.pocketbase_service import PocketBaseService
+from app.services.pocketbase_service import PocketBaseService, TenantIdConflictError, TENANT_ID_INDEX
 
 class TestPocketBaseService:
     @patch('httpx.Client')
@@ -53,4 +53,59 @@ class TestPocketBaseService:
 
         pb = PocketBaseService()
         assert pb.tenant_id_exists("exists123") is True
-        assert pb.tenant_id_exists("nonexistent") is False
\ No newline at end of file
+        assert pb.tenant_id_exists("nonexistent") is False
+    @patch('httpx.Client')
+    def test_create_tenant_unique_violation(self, mock_client):
+        """Test that a duplicate tenant_id is reported as a conflict, not a generic failure."""
+        mock_auth_response = MagicMock()
+        mock_auth_response.status_code = 200
+        mock_auth_response.json.return_value = {"token": "test-token"}
+
+        mock_conflict_response = MagicMock()
+        mock_conflict_response.status_code = 400
+        mock_conflict_response.json.return_value = {"code": 400, "data": {
+            "tenant_id": {"code": "validation_not_unique", "message": "Value must be unique."}}}
+
+        mock_client.return_value.post.side_effect = [mock_auth_response, mock_conflict_response]
+
+        pb = PocketBaseService()
+        with pytest.raises(TenantIdConflictError):
+            pb.create_tenant({"name": "Test", "tenant_id": "taken123"})
+
+    @patch('httpx.Client')
+    def test_ensure_tenant_id_index_adds_missing_index(self, mock_client):
+        """Test that the unique index is added only when it is missing."""
+        mock_auth_response = MagicMock()
+        mock_auth_response.status_code = 200
+        mock_auth_response.json.return_value = {"token": "test-token"}
+        mock_client.return_value.post.return_value = mock_auth_response
+
+        mock_collection = MagicMock()
+        mock_collection.status_code = 200
+        mock_collection.json.return_value = {"indexes": []}
+        mock_client.return_value.get.return_value = mock_collection
+        mock_client.return_value.patch.return_value = MagicMock(status_code=200)
+
+        pb = PocketBaseService()
+        assert pb.ensure_tenant_id_index() is True
+        indexes = mock_client.return_value.patch.call_args.kwargs["json"]["indexes"]
+        assert indexes == [TENANT_ID_INDEX]
+
+    @patch('httpx.Client')
+    def test_list_collections_filters_by_prefix(self, mock_client):
+        """Test that collections are filtered server-side and the literal prefix is enforced."""
+        mock_auth_response = MagicMock()
+        mock_auth_response.status_code = 200
+        mock_auth_response.json.return_value = {"token": "test-token"}
+        mock_client.return_value.post.return_value = mock_auth_response
+
+        mock_list_response = MagicMock()
+        mock_list_response.status_code = 200
+        mock_list_response.json.return_value = {"items": [
+            {"name": "vms_abc_users"}, {"name": "vmsXabcXusers"}]}
+        mock_client.return_value.get.return_value = mock_list_response
+
+        pb = PocketBaseService()
+        assert pb.list_collections("vms_abc_") == [{"name": "vms_abc_users"}]
+        params = mock_client.return_value.get.call_args.kwargs["params"]
+        assert params["filter"] == "name~'vms_abc_%'"
@@ -0,0 +1,34 @@
+import threading
+import time
+import pytest
+from app.services.progress import ProgressBroker, ProgressChannel, format_sse
+
+
+class TestProgressChannel:
+    def test_follow_streams_live_events(self):
+        """Test that a reader receives events published after it subscribed."""
+        channel = ProgressChannel(max_events=100)
+        channel.publish({"event": "first"})
+
+        def producer():
+            time.sleep(0.02)
+            channel.publish({"event": "second"})
+            channel.close()
+
+        threading.Thread(target=producer).start()
+        events = [e["event"] for e in channel.follow(heartbeat=5) if e is not None]
+        assert events == ["first", "second"]
+
+    def test_heartbeat_while_idle(self):
+        """Test that idle streams yield keep-alives."""
+        channel = ProgressChannel(max_events=100)
+        stream = channel.follow(heartbeat=0.01)
+        assert next(stream) is None
+        assert format_sse(None) == ": keep-alive\n\n"
+
+    def test_broker_alias(self):
+        """Test that a channel can be looked up by tenant_id once it is known."""
+        broker = ProgressBroker()
+        broker.open("job1").publish({"event": "job_queued"})
+        broker.alias("tenant1", "job1")
+        assert broker.get("tenant1") is broker.get("job1")
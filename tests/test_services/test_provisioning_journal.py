@@ -0,0 +1,127 @@
+import json
+from datetime import timedelta
+import pytest
+from unittest.mock import patch
+from app.config import Config
+from app.extensions import db
+from app.models import ProvisioningRun, ProvisioningStep
+from app.models.provisioning_job import utcnow
+from app.schemas.provisioning_plan import compile_plan
+from app.services.pocketbase_service import PocketBaseService
+from app.services.provisioning_journal import ProvisioningInProgressError
+from app.services.tenant_service import TenantService
+
+SCHEMA = [
+    {"id": "col1", "name": "app_users", "type": "base",
+     "schema": [{"name": "team", "type": "relation", "options": {"collectionId": "col2"}}]},
+    {"id": "col2", "name": "app_teams", "type": "base",
+     "schema": [{"name": "owner", "type": "relation", "options": {"collectionId": "col1"}}]},
+    {"id": "col3", "name": "app_posts", "type": "base",
+     "schema": [{"name": "author", "type": "relation", "options": {"collectionId": "col1"}}]},
+]
+
+
+def provision(strategy="collections", fail=(), **kwargs):
+    """Provision "Acme", failing the creation of collections whose name ends with `fail`"""
+    service = TenantService(concurrency=1, strategy=strategy)
+    if fail:
+        create = service.pb.create_collection
+        service.pb.create_collection = lambda data: (
+            None if json.loads(data)["name"].endswith(tuple(fail)) else create(data))
+    with patch.object(TenantService, 'get_plan', return_value=compile_plan(SCHEMA, fingerprint="f1")):
+        return service.create_tenant_configuration("Acme", **kwargs)
+
+
+class TestProvisioningJournal:
+    def test_retry_resumes_after_partial_failure(self, app, fake_pocketbase, monkeypatch):
+        """Test that a retry reuses the tenant and only creates what is missing."""
+        monkeypatch.setattr(Config, 'PROVISIONING_RESUME_BY_NAME', True)
+        assert provision(fail=["_posts"]) is None
+        run = ProvisioningRun.query.one()
+        assert run.status == ProvisioningRun.FAILED
+        kinds = sorted(step.kind for step in run.steps)
+        assert kinds == ["collection", "collection", "relations", "relations", "tenant"]
+
+        fake_pocketbase.requests.clear()
+        result = provision()
+
+        assert result["tenant_id"] == run.tenant_id
+        assert result["collections_created"] == 3
+        assert fake_pocketbase.calls("POST", "/api/collections") == 1
+        assert fake_pocketbase.calls("POST", "/api/collections/vms_tenants/records") == 0
+        assert not any(method == "PATCH" for method, _ in fake_pocketbase.requests)
+        assert len(fake_pocketbase.tenants) == 1
+
+        run = ProvisioningRun.query.one()
+        assert run.status == ProvisioningRun.SUCCEEDED
+        assert run.attempts == 2
+
+    def test_same_name_does_not_resume_by_default(self, app, fake_pocketbase):
+        """Test that without an Idempotency-Key a failed run of the same name is left alone."""
+        assert provision(fail=["_posts"]) is None
+        failed = ProvisioningRun.query.one().tenant_id
+
+        result = provision()
+
+        assert result["tenant_id"] != failed
+        assert ProvisioningRun.query.count() == 2
+
+    def test_resume_by_name_ignores_old_runs(self, app, fake_pocketbase, monkeypatch):
+        """Test that resuming by name only considers runs inside PROVISIONING_RESUME_WINDOW."""
+        monkeypatch.setattr(Config, 'PROVISIONING_RESUME_BY_NAME', True)
+        assert provision(fail=["_posts"]) is None
+        run = ProvisioningRun.query.one()
+        run.updated_at = utcnow() - timedelta(seconds=Config.PROVISIONING_RESUME_WINDOW + 60)
+        db.session.commit()
+
+        assert provision()["tenant_id"] != run.tenant_id
+        assert db.session.get(ProvisioningRun, run.id).status == ProvisioningRun.FAILED
+
+    def test_idempotency_key_returns_first_result(self, app, fake_pocketbase):
+        """Test that repeating a finished request does no PocketBase work."""
+        first = provision("import", idempotency_key="key-1")
+        fake_pocketbase.requests.clear()
+
+        assert provision("import", idempotency_key="key-1") == first
+        assert fake_pocketbase.requests == []
+        assert ProvisioningStep.query.filter_by(kind="collection").count() == 3
+
+    def test_import_retry_reuses_collection_ids(self, app, fake_pocketbase, monkeypatch):
+        """Test that a retried import updates the collections of the lost attempt."""
+        monkeypatch.setattr(Config, 'PROVISIONING_RESUME_BY_NAME', True)
+        with patch('app.services.pocketbase_service.PocketBaseService.import_collections',
+                   return_value=False):
+            assert provision("import", fail=["_users", "_teams", "_posts"]) is None
+        planned = ProvisioningRun.query.one().import_ids
+
+        result = provision("import")
+        assert result["strategy"] == "import"
+        assert fake_pocketbase.find_collection(f"vms_{result['tenant_id']}_users")["id"] == planned["col1"]
+
+    def test_import_committed_before_a_timeout_is_kept(self, app, fake_pocketbase):
+        """Test that an import whose response was lost is not redone one collection at a time."""
+        import_collections = PocketBaseService.import_collections
+
+        def import_then_time_out(self, *args, **kwargs):
+            import_collections(self, *args, **kwargs)
+            return False
+
+        with patch.object(PocketBaseService, 'import_collections', import_then_time_out):
+            result = provision("import")
+
+        assert result["status"] == "success"
+        assert result["strategy"] == "import"
+        assert fake_pocketbase.calls("POST", "/api/collections") == 0
+        assert len(fake_pocketbase.collections) == 3 + 1
+
+    def test_running_key_is_rejected(self, app, fake_pocketbase):
+        """Test that a second attempt under a running key does not start."""
+        db.session.add(ProvisioningRun(idempotency_key="key-2", tenant_name="Acme"))
+        db.session.commit()
+
+        with pytest.raises(ProvisioningInProgressError):
+            provision(idempotency_key="key-2")
+
+    def test_without_app_keeps_no_journal(self, fake_pocketbase):
+        """Test that provisioning still works outside the Flask app."""
+        assert provision()["collections_created"] == 3
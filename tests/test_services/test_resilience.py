@@ -0,0 +1,134 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import MagicMock, AsyncMock, patch
+from app.services.admission import AdmissionRejectedError
+from app.services.pocketbase_service import PocketBaseService
+from app.services.resilience import (CircuitBreaker, CircuitOpenError, ResiliencePolicy,
+                                     get_resilience)
+
+
+def response(status):
+    result = MagicMock()
+    result.status_code = status
+    result.headers = {}
+    return result
+
+
+def policy(attempts=3, threshold=5):
+    return ResiliencePolicy(CircuitBreaker("pb", threshold, 30), attempts=attempts,
+                            base_delay=0, max_delay=0)
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        """Test that the breaker fails fast once the threshold is reached."""
+        breaker = CircuitBreaker("pb", failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        assert breaker.snapshot()["rejected_total"] == 1
+
+    def test_half_open_probe(self):
+        """Test that one probe is let through after the reset timeout."""
+        breaker = CircuitBreaker("pb", failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+
+        with patch('app.services.resilience.time.monotonic', return_value=breaker.opened_at + 31):
+            breaker.before_call()
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+            with pytest.raises(CircuitOpenError):
+                breaker.before_call()
+            breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestResiliencePolicy:
+    def test_retries_safe_operation(self):
+        """Test that a read is retried on a 502 and returns the next response."""
+        send = MagicMock(side_effect=[response(502), response(200)])
+        result = policy().call("read", send)
+
+        assert result.status_code == 200
+        assert send.call_count == 2
+        send.assert_called_with(10.0)
+
+    def test_does_not_repeat_create_after_response(self):
+        """Test that a create is not retried once PocketBase may have applied it."""
+        send = MagicMock(side_effect=[response(503), response(200)])
+        assert policy().call("create", send).status_code == 503
+
+        send = MagicMock(side_effect=httpx.ReadTimeout("slow"))
+        with pytest.raises(httpx.ReadTimeout):
+            policy().call("create", send)
+        assert send.call_count == 1
+
+    def test_retries_create_when_connection_failed(self):
+        """Test that any call is retried when the request never left."""
+        send = MagicMock(side_effect=[httpx.ConnectError("refused"), response(200)])
+        assert policy().call("create", send).status_code == 200
+
+    def test_gives_up_after_attempts(self):
+        """Test that the last failure is surfaced and counted by the breaker."""
+        retry = policy(attempts=2)
+        send = MagicMock(side_effect=httpx.ConnectError("refused"))
+        with pytest.raises(httpx.ConnectError):
+            retry.call("read", send)
+        assert send.call_count == 2
+        assert retry.breaker.failures == 2
+
+    def test_async_retries(self):
+        """Test that the async variant follows the same rules."""
+        send = AsyncMock(side_effect=[response(504), response(200)])
+        result = asyncio.run(policy().acall("update", send))
+        assert result.status_code == 200
+
+    def test_rejected_probe_does_not_wedge_half_open_breaker(self):
+        """Test that a half-open probe rejected by admission control lets the next call probe."""
+        retry = policy(attempts=1, threshold=1)
+        with pytest.raises(httpx.ConnectError):
+            retry.call("read", MagicMock(side_effect=httpx.ConnectError("refused")))
+        assert retry.breaker.state == CircuitBreaker.OPEN
+
+        rejected = AdmissionRejectedError("pb", "queue full", 1)
+        with patch('app.services.resilience.time.monotonic', return_value=retry.breaker.opened_at + 31):
+            with pytest.raises(AdmissionRejectedError):
+                retry.call("read", MagicMock(side_effect=rejected))
+            with pytest.raises(AdmissionRejectedError):
+                asyncio.run(retry.acall("read", AsyncMock(side_effect=rejected)))
+            assert retry.breaker.state == CircuitBreaker.HALF_OPEN
+
+            assert retry.call("read", MagicMock(return_value=response(200))).status_code == 200
+        assert retry.breaker.state == CircuitBreaker.CLOSED
+
+
+class TestPocketBaseResilience:
+    def test_transient_errors_are_retried(self, fake_pocketbase, monkeypatch):
+        """Test that a transient 502 no longer fails a PocketBase call."""
+        monkeypatch.setattr('app.config.Config.POCKETBASE_RETRY_BASE_DELAY', 0)
+        fake_pocketbase.fail_next = [502]
+
+        assert PocketBaseService().ensure_token()
+        assert PocketBaseService().list_collections("vms_") is not None
+
+    def test_open_circuit_fails_fast(self, fake_pocketbase, monkeypatch, client):
+        """Test that an unhealthy PocketBase is not called while the circuit is open."""
+        monkeypatch.setattr('app.config.Config.POCKETBASE_RETRY_ATTEMPTS', 1)
+        monkeypatch.setattr('app.config.Config.CIRCUIT_FAILURE_THRESHOLD', 2)
+        fake_pocketbase.fail_next = [503, 503]
+        pb = PocketBaseService()
+
+        assert pb.ensure_token() is False
+        assert pb.ensure_token() is False
+        calls = len(fake_pocketbase.requests)
+        assert pb.ensure_token() is False
+        assert len(fake_pocketbase.requests) == calls
+
+        health = client.get('/api/v1/admin/pocketbase-health').json
+        assert health[fake_pocketbase.url]["circuit"]["state"] == "open"
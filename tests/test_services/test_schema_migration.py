@@ -0,0 +1,141 @@
+import json
+import pytest
+from unittest.mock import patch
+from app.models import SchemaMigration, SchemaMigrationTenant
+from app.schemas.provisioning_plan import compile_plan
+from app.services.schema_migration import diff_tenant, migrate_schema
+from app.services.tenant_service import TenantService
+
+V1 = [
+    {"id": "col1", "name": "app_users", "type": "base",
+     "schema": [{"name": "email", "type": "email"},
+                {"name": "team", "type": "relation", "options": {"collectionId": "col2"}}]},
+    {"id": "col2", "name": "app_teams", "type": "base",
+     "schema": [{"name": "owner", "type": "relation", "options": {"collectionId": "col1"}}]},
+    {"id": "col3", "name": "app_posts", "type": "base",
+     "schema": [{"name": "author", "type": "relation", "options": {"collectionId": "col1"}}]},
+]
+V2 = [
+    {"id": "col1", "name": "app_users", "type": "base",
+     "schema": [{"name": "email", "type": "email", "required": True},
+                {"name": "team", "type": "relation", "options": {"collectionId": "col2"}},
+                {"name": "nickname", "type": "text"}]},
+    V1[1],
+    {"id": "col3", "name": "app_posts", "type": "base", "listRule": "",
+     "schema": [{"name": "author", "type": "relation", "options": {"collectionId": "col1"}}]},
+    {"id": "col4", "name": "app_comments", "type": "base",
+     "schema": [{"name": "post", "type": "relation", "options": {"collectionId": "col3"}}]},
+]
+
+
+def provision(name, schema=V1):
+    with patch.object(TenantService, 'get_plan', return_value=compile_plan(schema, "v1", "f1")):
+        return TenantService(concurrency=1).create_tenant_configuration(name)["tenant_id"]
+
+
+def live_collections(fake, tenant_id):
+    return [c for c in fake.collections.values() if c["name"].startswith(f"vms_{tenant_id}_")]
+
+
+@pytest.fixture
+def target_v2():
+    with patch('app.services.schema_migration.schema_registry.get_plan',
+               return_value=compile_plan(V2, "v2", "f2")) as get_plan:
+        yield get_plan
+
+
+class TestDiffTenant:
+    def test_unchanged_tenant_has_no_diff(self, app, fake_pocketbase):
+        """Test that a tenant provisioned from the plan diffs clean."""
+        tenant_id = provision("Acme")
+        assert diff_tenant(compile_plan(V1), tenant_id, live_collections(fake_pocketbase, tenant_id)) == []
+
+    def test_reports_field_rule_and_collection_changes(self, app, fake_pocketbase):
+        """Test that only the collections that differ are in the diff."""
+        tenant_id = provision("Acme")
+        diffs = {d.name.rsplit("_", 1)[1]: d
+                 for d in diff_tenant(compile_plan(V2), tenant_id, live_collections(fake_pocketbase, tenant_id))}
+
+        assert set(diffs) == {"users", "posts", "comments"}
+        assert diffs["users"].summary["fields_added"] == ["nickname"]
+        assert diffs["users"].summary["fields_changed"] == {"email": ["required"]}
+        assert diffs["posts"].patch == {"listRule": ""}
+        assert diffs["comments"].action == "create"
+
+    def test_patch_keeps_live_field_ids_and_extra_fields(self, app, fake_pocketbase):
+        """Test that patched schemas keep field IDs and fields the template dropped."""
+        tenant_id = provision("Acme")
+        users = next(c for c in live_collections(fake_pocketbase, tenant_id) if c["name"].endswith("_users"))
+        users["schema"][0]["id"] = "fieldid0000001"
+        users["schema"].append({"id": "fieldid0000002", "name": "legacy", "type": "text"})
+
+        diff = next(d for d in diff_tenant(compile_plan(V2), tenant_id, [users]) if d.name == users["name"])
+        schema = {field["name"]: field for field in diff.patch["schema"]}
+        assert schema["email"]["id"] == "fieldid0000001"
+        assert schema["email"]["required"] is True
+        assert schema["legacy"]["id"] == "fieldid0000002"
+        assert diff.summary["fields_kept"] == ["legacy"]
+
+        pruned = next(d for d in diff_tenant(compile_plan(V2), tenant_id, [users], prune=True)
+                      if d.name == users["name"])
+        assert "legacy" not in {field["name"] for field in pruned.patch["schema"]}
+
+
+class TestMigrateSchema:
+    def test_dry_run_changes_nothing(self, app, fake_pocketbase, target_v2):
+        """Test that a dry run reports planned changes without writing."""
+        tenant_id = provision("Acme")
+        fake_pocketbase.requests.clear()
+
+        migration = migrate_schema(dry_run=True)
+        rows = migration.tenants.all()
+        assert [(row.tenant_id, row.status) for row in rows] == [(tenant_id, SchemaMigrationTenant.PLANNED)]
+        assert not any(method in ("POST", "PATCH", "PUT") for method, _ in fake_pocketbase.requests)
+
+    def test_patches_only_changed_collections(self, app, fake_pocketbase, target_v2):
+        """Test that a migration patches what differs, creates what is missing, and is idempotent."""
+        tenants = [provision("Acme"), provision("Globex")]
+        fake_pocketbase.requests.clear()
+
+        migration = migrate_schema(concurrency=2)
+        assert migration.to_dict()["tenants"] == {SchemaMigrationTenant.MIGRATED: 2}
+        patched = [path for method, path in fake_pocketbase.requests if method == "PATCH"]
+        # users and posts differ; comments is created and has nothing deferred to patch
+        assert len(patched) == 4
+        for tenant_id in tenants:
+            assert diff_tenant(compile_plan(V2), tenant_id, live_collections(fake_pocketbase, tenant_id)) == []
+
+        fake_pocketbase.requests.clear()
+        again = migrate_schema()
+        assert again.to_dict()["tenants"] == {SchemaMigrationTenant.UNCHANGED: 2}
+        assert not any(method == "PATCH" for method, _ in fake_pocketbase.requests)
+
+    def test_resume_skips_migrated_tenants(self, app, fake_pocketbase, target_v2):
+        """Test that resuming retries only the tenants that failed."""
+        provision("Acme")
+        globex = provision("Globex")
+        with patch('app.services.schema_migration.SchemaMigrator.apply',
+                   side_effect=RuntimeError("boom")):
+            migration = migrate_schema(tenant_ids=[globex])
+        assert migration.to_dict()["tenants"] == {SchemaMigrationTenant.FAILED: 1}
+
+        fake_pocketbase.requests.clear()
+        resumed = migrate_schema(tenant_ids=[globex], resume=migration.id)
+        assert resumed.id == migration.id
+        assert resumed.to_dict()["tenants"] == {SchemaMigrationTenant.MIGRATED: 1}
+
+        fake_pocketbase.requests.clear()
+        migrate_schema(tenant_ids=[globex], resume=migration.id)
+        assert fake_pocketbase.requests == []
+
+    def test_cli(self, app, fake_pocketbase, target_v2, tmp_path):
+        """Test the flask schema migrate command and its report."""
+        tenant_id = provision("Acme")
+        report = tmp_path / "report.json"
+        result = app.test_cli_runner().invoke(
+            args=["schema", "migrate", "--dry-run", "--report", str(report)])
+
+        assert result.exit_code == 0, result.output
+        assert json.loads(result.output.splitlines()[0])["tenant_id"] == tenant_id
+        assert json.loads(report.read_text())["tenants"][0]["status"] == "planned"
+        assert SchemaMigration.query.one().dry_run is True
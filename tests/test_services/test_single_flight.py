@@ -0,0 +1,85 @@
+import threading
+import time
+import pytest
+from app.services.single_flight import SingleFlight, normalize_tenant_name, onboarding_key
+
+
+def start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+class TestSingleFlight:
+    def test_concurrent_callers_share_one_call(self):
+        """Test that callers arriving while the first one runs get its result without calling."""
+        flights = SingleFlight(window=0)
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return {"tenant_id": "abc"}
+
+        threads = [start(lambda: results.append(flights.do("key", fn))) for _ in range(5)]
+        while len(calls) < 1:
+            time.sleep(0.001)
+        time.sleep(0.02)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert [result for result, _ in results] == [{"tenant_id": "abc"}] * 5
+        assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+        assert flights.in_flight() == 0
+
+    def test_window_serves_late_retries(self):
+        """Test that a success is reused within the window and the next call runs after it."""
+        flights = SingleFlight(window=0.05)
+        calls = []
+
+        def fn():
+            calls.append(1)
+            return len(calls)
+
+        assert flights.do("key", fn) == (1, False)
+        assert flights.do("key", fn) == (1, True)
+        assert flights.do("other", fn) == (2, False)
+        time.sleep(0.06)
+        assert flights.do("key", fn) == (3, False)
+
+    def test_failures_are_shared_but_not_kept(self):
+        """Test that waiting callers see the exception and a later call runs again."""
+        flights = SingleFlight(window=10)
+        release = threading.Event()
+        errors = []
+
+        def fail():
+            release.wait(5)
+            raise RuntimeError("boom")
+
+        def call():
+            try:
+                flights.do("key", fail)
+            except RuntimeError as e:
+                errors.append(e)
+
+        threads = [start(call) for _ in range(3)]
+        time.sleep(0.02)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(errors) == 3
+        assert flights.do("key", lambda: None) == (None, False)
+        assert flights.do("key", lambda: "ok") == ("ok", False)
+
+    @pytest.mark.parametrize("name", ["Acme Corp", "  acme   corp ", "ACME\tCORP", "Ａｃｍｅ Corp"])
+    def test_normalized_names_share_a_key(self, name):
+        """Test that names differing only in case, width or spacing are the same onboarding."""
+        assert normalize_tenant_name(name) == "acme corp"
+        assert onboarding_key(name) == ("acme corp", "")
+        assert onboarding_key(name, "k1") != onboarding_key(name, "k2")
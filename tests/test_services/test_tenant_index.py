@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from app.services.tenant_index import BloomFilter, TenantIdIndex
+from app.services.tenant_service import TenantService
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self):
+        """Test that every added key is reported as present."""
+        bloom = BloomFilter(1000, 0.01)
+        keys = [f"tenant{i:04d}" for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        assert all(key in bloom for key in keys)
+
+    def test_false_positive_rate(self):
+        """Test that the false positive rate stays near the configured rate."""
+        bloom = BloomFilter(5000, 0.01)
+        for i in range(5000):
+            bloom.add(f"in{i}")
+        false_positives = sum(f"out{i}" in bloom for i in range(10000))
+        assert false_positives < 300
+
+
+class TestTenantIdIndex:
+    def test_index_grows_past_capacity(self):
+        """Test that chained filters keep answering correctly past the initial capacity."""
+        index = TenantIdIndex(capacity=10, error_rate=0.01)
+        for i in range(50):
+            index.add(f"t{i}")
+        assert len(index) == 50
+        assert all(index.might_contain(f"t{i}") for i in range(50))
+
+    def test_warm_pages_through_tenants(self):
+        """Test that warming indexes every tenant_id and marks the index ready."""
+        pb = MagicMock()
+        pb.iter_tenant_ids.return_value = iter(["abc12345", "def67890"])
+        index = TenantIdIndex(capacity=100)
+
+        assert index.warm(pb, page_size=2) == 2
+        assert index.ready
+        assert index.might_contain("abc12345")
+
+    @patch('app.services.tenant_service.PocketBaseService')
+    def test_generate_id_without_network_when_warm(self, mock_pb):
+        """Test that a warmed index answers definite misses locally."""
+        index = TenantIdIndex(capacity=100)
+        index.ready = True
+
+        service = TenantService(index=index)
+        assert len(service.generate_unique_tenant_id()) == 8
+        mock_pb.return_value.tenant_id_exists.assert_not_called()
+
+    @patch('app.services.tenant_service.PocketBaseService')
+    def test_probable_hit_confirmed_remotely(self, mock_pb):
+        """Test that probable hits are confirmed and errors are not treated as free IDs."""
+        index = TenantIdIndex(capacity=100)
+        index.ready = True
+        index.might_contain = MagicMock(return_value=True)
+        mock_pb.return_value.tenant_id_exists.side_effect = [True, None, False]
+
+        service = TenantService(index=index)
+        assert service.generate_unique_tenant_id() is not None
+        assert mock_pb.return_value.tenant_id_exists.call_count == 3
+
+
+class TestIterTenantIds:
+    @patch('httpx.Client')
+    def test_iter_tenant_ids_pages(self, mock_client):
+        """Test that tenant_ids are read page by page until a short page."""
+        from app.services.pocketbase_service import PocketBaseService
+
+        def page(items):
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = {"items": items}
+            return response
+
+        auth = MagicMock()
+        auth.status_code = 200
+        auth.json.return_value = {"token": "test-token"}
+        mock_client.return_value.post.return_value = auth
+        mock_client.return_value.get.side_effect = [
+            page([{"tenant_id": "a"}, {"tenant_id": "b"}]),
+            page([{"tenant_id": "c"}]),
+        ]
+
+        pb = PocketBaseService()
+        assert list(pb.iter_tenant_ids(page_size=2)) == ["a", "b", "c"]
+        second_page = mock_client.return_value.get.call_args_list[1]
+        assert second_page.kwargs["params"]["page"] == 2
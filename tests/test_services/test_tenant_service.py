@@ -1,5 +1,10 @@
+import json
+import asyncio
+import time
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+from app.schemas.provisioning_plan import compile_plan
+from app.services.pocketbase_service import TenantIdConflictError
 from app.services.tenant_service import TenantService
 
 class TestTenantService:
@@ -14,29 +19,22 @@ class TestTenantService:
         assert mock_pb.return_value.tenant_id_exists.call_count == 3
 
     @patch('app.services.tenant_service.PocketBaseService')
-    @patch('builtins.open')
-    @patch('json.load')
-    def test_create_tenant_configuration_success(self, mock_json, mock_open, mock_pb):
+    def test_create_tenant_configuration_success(self, mock_pb):
         """Test successful tenant configuration creation."""
-        # Setup mocks
-        mock_pb_instance = mock_pb.return_value
-        mock_pb_instance.generate_unique_tenant_id.return_value = "test1234"
-        mock_pb_instance.create_tenant.return_value = {"id": "rec123", "tenant_id": "test1234"}
-        mock_pb_instance.create_collection.return_value = {"id": "col123"}
-        mock_pb_instance.update_collection.return_value = {"id": "col123"}
-        
-        mock_json.return_value = [{
-            "id": "col1",
-            "name": "test_collection",
-            "schema": []
-        }]
-        
-        service = TenantService()
-        result = service.create_tenant_configuration("Test Tenant")
-        
+        pb = mock_pb.return_value
+        pb.tenant_id_exists.return_value = False
+        pb.create_tenant.return_value = {"id": "rec123"}
+        pb.create_collection.side_effect = lambda payload: {"id": f"id-{json.loads(payload)['name']}"}
+        pb.update_collection.side_effect = lambda collection_id, payload: {"id": collection_id}
+
+        service = TenantService(concurrency=1, strategy='collections')
+        with patch.object(TenantService, 'get_plan', return_value=compile_plan(CYCLIC_SCHEMA)):
+            result = service.create_tenant_configuration("Test Tenant")
+
         assert result["status"] == "success"
-        assert result["tenant_id"] == "test1234"
-        assert result["collections_created"] == 1
+        assert result["tenant_id"] == pb.create_tenant.call_args.args[0]["tenant_id"]
+        assert result["collections_created"] == 3
+        assert pb.create_collection.call_count == 3
 
     @patch('app.services.tenant_service.PocketBaseService')
     def test_create_tenant_configuration_failure(self, mock_pb):
@@ -46,4 +44,158 @@ class TestTenantService:
         
         service = TenantService()
         result = service.create_tenant_configuration("Test Tenant")
-        assert result is None
\ No newline at end of file
+        assert result is None
+
+    @patch('app.services.tenant_service.AsyncPocketBaseService')
+    @patch('app.services.tenant_service.PocketBaseService')
+    def test_provision_collections_async(self, mock_pb, mock_async_pb):
+        """Test concurrent provisioning resolves acyclic relations at creation time."""
+        schema = [
+            {"id": "col2", "name": "app_posts", "type": "base",
+             "schema": [{"name": "author", "type": "relation",
+                         "options": {"collectionId": "col1"}}]},
+            {"id": "col1", "name": "app_users", "type": "base",
+             "schema": [{"name": "email", "type": "text"}]},
+        ]
+        created = {"vms_t1_users": {"id": "new1"}, "vms_t1_posts": {"id": "new2"}}
+        async_pb = mock_async_pb.return_value.__aenter__.return_value
+        async_pb.create_collection = AsyncMock(
+            side_effect=lambda data: created[json.loads(data)["name"]])
+        async_pb.update_collection = AsyncMock(return_value={})
+
+        service = TenantService(concurrency=4)
+        id_mapping = asyncio.run(
+            service.provision_collections_async(compile_plan(schema), "t1"))
+
+        assert id_mapping == {"col1": "new1", "col2": "new2"}
+        posts = json.loads(async_pb.create_collection.await_args_list[1].args[0])
+        assert posts["schema"][0]["options"]["collectionId"] == "new1"
+        async_pb.update_collection.assert_not_awaited()
+
+    @patch('app.services.tenant_service.PocketBaseService')
+    def test_provision_collections_patches_only_cycles(self, mock_pb):
+        """Test that only relation fields on a cycle are added with a PATCH."""
+        schema = [
+            {"id": "col1", "name": "app_users", "type": "base",
+             "schema": [{"name": "team", "type": "relation",
+                         "options": {"collectionId": "col2"}}]},
+            {"id": "col2", "name": "app_teams", "type": "base",
+             "schema": [{"name": "owner", "type": "relation",
+                         "options": {"collectionId": "col1"}},
+                        {"name": "title", "type": "text"}]},
+            {"id": "col3", "name": "app_tags", "type": "base",
+             "schema": [{"name": "team", "type": "relation",
+                         "options": {"collectionId": "col2"}}]},
+        ]
+        pb = mock_pb.return_value
+        pb.create_collection.side_effect = lambda data: {"id": "new-" + json.loads(data)["name"]}
+
+        service = TenantService(concurrency=1)
+        id_mapping = service.provision_collections(compile_plan(schema), "t1")
+
+        assert len(id_mapping) == 3
+        assert pb.create_collection.call_count == 3
+        patched = sorted(c.args[0] for c in pb.update_collection.call_args_list)
+        assert patched == ["new-vms_t1_teams", "new-vms_t1_users"]
+        teams = json.loads(pb.create_collection.call_args_list[1].args[0])
+        assert [f["name"] for f in teams["schema"]] == ["title"]
+
+    @patch('app.services.tenant_service.PocketBaseService')
+    def test_optimistic_create_retries_on_conflict(self, mock_pb):
+        """Test that a taken tenant_id is retried with a fresh one without pre-checks."""
+        pb = mock_pb.return_value
+        pb.ensure_tenant_id_index.return_value = True
+        pb.create_tenant.side_effect = [
+            TenantIdConflictError("taken"),
+            {"id": "rec123"},
+        ]
+
+        service = TenantService()
+        service.id_mode = 'optimistic'
+        tenant_id = service.create_tenant_record("Test Tenant")
+
+        assert tenant_id == pb.create_tenant.call_args_list[1].args[0]["tenant_id"]
+        assert pb.create_tenant.call_count == 2
+        pb.tenant_id_exists.assert_not_called()
+
+    @patch('app.services.tenant_service.PocketBaseService')
+    def test_optimistic_falls_back_without_unique_index(self, mock_pb):
+        """Test that the check-then-create flow is used when the index cannot be ensured."""
+        pb = mock_pb.return_value
+        pb.ensure_tenant_id_index.return_value = False
+        pb.tenant_id_exists.return_value = False
+        pb.create_tenant.return_value = {"id": "rec123"}
+
+        service = TenantService()
+        service.id_mode = 'optimistic'
+        assert service.create_tenant_record("Test Tenant") is not None
+        pb.tenant_id_exists.assert_called_once()
+
+    @patch('app.services.tenant_service.PocketBaseService')
+    def test_sortable_tenant_ids(self, mock_pb):
+        """Test that the sortable strategy produces time-ordered IDs."""
+        service = TenantService()
+        service.id_strategy = 'sortable'
+        first = service.new_tenant_id()
+        time.sleep(0.002)
+        second = service.new_tenant_id()
+        assert len(first) == 12
+        assert first[:8] < second[:8]
+
+
+CYCLIC_SCHEMA = [
+    {"id": "col1", "name": "app_users", "type": "base",
+     "schema": [{"name": "team", "type": "relation", "options": {"collectionId": "col2"}}]},
+    {"id": "col2", "name": "app_teams", "type": "base",
+     "schema": [{"name": "owner", "type": "relation", "options": {"collectionId": "col1"}}]},
+    {"id": "col3", "name": "app_posts", "type": "base",
+     "schema": [{"name": "author", "type": "relation", "options": {"collectionId": "col1"}}]},
+]
+
+
+class TestImportStrategy:
+    def provision(self, strategy, concurrency=1):
+        service = TenantService(concurrency=concurrency, strategy=strategy)
+        with patch.object(TenantService, 'get_plan', return_value=compile_plan(CYCLIC_SCHEMA)):
+            return service.create_tenant_configuration("Acme")
+
+    def test_import_provisions_in_one_call(self, fake_pocketbase):
+        """Test that the import strategy creates every collection with a single PUT."""
+        result = self.provision('import')
+
+        assert result["strategy"] == "import"
+        assert result["collections_created"] == 3
+        assert fake_pocketbase.calls("PUT", "/api/collections/import") == 1
+        assert fake_pocketbase.calls("POST", "/api/collections") == 0
+        # Auth, unique-index check, tenant record and the import
+        assert len(fake_pocketbase.requests) == 4
+
+        tenant_id = result["tenant_id"]
+        users = fake_pocketbase.find_collection(f"vms_{tenant_id}_users")
+        teams = fake_pocketbase.find_collection(f"vms_{tenant_id}_teams")
+        assert len(users["id"]) == 15
+        # Cyclic relations are resolved without a second pass
+        assert users["schema"][0]["options"]["collectionId"] == teams["id"]
+        assert teams["schema"][0]["options"]["collectionId"] == users["id"]
+
+    @pytest.mark.parametrize("concurrency", [1, 4])
+    def test_import_falls_back_to_collections(self, fake_pocketbase, concurrency):
+        """Test that a server without the import API is provisioned collection by collection."""
+        fake_pocketbase.import_enabled = False
+        result = self.provision('import', concurrency)
+
+        assert result["strategy"] == "collections"
+        assert result["collections_created"] == 3
+        assert fake_pocketbase.calls("POST", "/api/collections") == 3
+
+    def test_collections_strategy_skips_import(self, fake_pocketbase):
+        """Test that the per-collection strategy never calls the import API."""
+        result = self.provision('collections')
+
+        assert result["strategy"] == "collections"
+        assert fake_pocketbase.calls("PUT", "/api/collections/import") == 0
+
+    def test_unknown_strategy(self):
+        """Test that an unknown strategy is rejected."""
+        with pytest.raises(ValueError):
+            TenantService(strategy="bulk")
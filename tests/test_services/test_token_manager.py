@@ -0,0 +1,104 @@
+import base64
+import json
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from app.services.pocketbase_service import PocketBaseService
+from app.services.token_manager import AdminTokenManager, decode_token_expiry
+
+
+def make_jwt(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).rstrip(b"=")
+    return f"header.{payload.decode()}.signature"
+
+
+def response(status_code, body=None):
+    mock = MagicMock()
+    mock.status_code = status_code
+    mock.json.return_value = body or {}
+    return mock
+
+
+class TestAdminTokenManager:
+    def test_decode_token_expiry(self):
+        """Test reading the exp claim of a JWT."""
+        assert decode_token_expiry(make_jwt(1700000000)) == 1700000000
+        assert decode_token_expiry("not-a-jwt") is None
+
+    def test_single_flight_refresh(self):
+        """Test that a burst of callers triggers a single authentication."""
+        manager = AdminTokenManager()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(1)
+            return "token"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(manager.get_token(fetch)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == ["token"] * 8
+        assert len(calls) == 1
+
+    def test_expiring_token_is_refreshed(self):
+        """Test that a token past its refresh point is replaced."""
+        manager = AdminTokenManager(refresh_margin=300)
+        manager.store(make_jwt(time.time() + 3600))
+        assert manager.is_fresh()
+        manager.store(make_jwt(time.time() - 1))
+        assert not manager.is_fresh()
+
+        fresh = make_jwt(time.time() + 3600)
+        assert manager.get_token(lambda: fresh) == fresh
+        assert manager.is_fresh()
+        manager.reset()
+
+    def test_background_refresh(self):
+        """Test that the timer re-authenticates before expiry."""
+        manager = AdminTokenManager(refresh_margin=0.5)
+        tokens = iter([make_jwt(time.time() + 0.6), make_jwt(time.time() + 3600)])
+        manager.get_token(lambda: next(tokens))
+        time.sleep(0.4)
+        assert manager.auth_count == 2
+        manager.reset()
+
+
+class TestPocketBaseServiceTokens:
+    @patch('httpx.Client')
+    def test_token_shared_between_instances(self, mock_client):
+        """Test that a second service instance reuses the cached token."""
+        mock_client.return_value.post.side_effect = [
+            response(200, {"token": "test-token"}),
+            response(200, {"id": "col1"}),
+            response(200, {"id": "col2"}),
+        ]
+
+        assert PocketBaseService().create_collection({"name": "a"}) == {"id": "col1"}
+        assert PocketBaseService().create_collection({"name": "b"}) == {"id": "col2"}
+        assert mock_client.return_value.post.call_count == 3
+
+    @patch('httpx.Client')
+    def test_retry_once_after_401(self, mock_client):
+        """Test that a 401 re-authenticates and retries the call exactly once."""
+        mock_client.return_value.post.side_effect = [
+            response(200, {"token": "old-token"}),
+            response(401),
+            response(200, {"token": "new-token"}),
+            response(200, {"id": "col1"}),
+        ]
+
+        pb = PocketBaseService()
+        assert pb.create_collection({"name": "a"}) == {"id": "col1"}
+        assert pb.token == "new-token"
+        last_call = mock_client.return_value.post.call_args_list[-1]
+        assert last_call.kwargs["headers"] == {"Authorization": "new-token"}
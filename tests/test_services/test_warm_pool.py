@@ -0,0 +1,120 @@
+import pytest
+from unittest.mock import patch
+from app.models import WarmSpare
+from app.schemas.provisioning_plan import compile_plan
+from app.services.orphan_sweep import OrphanSweeper
+from app.services.tenant_service import TenantService
+from app.services.warm_pool import SpareNotClaimedError, WarmPool
+
+SCHEMA = [
+    {"id": "col1", "name": "app_users", "type": "base",
+     "schema": [{"name": "email", "type": "email"},
+                {"name": "team", "type": "relation", "options": {"collectionId": "col2"}}]},
+    {"id": "col2", "name": "app_teams", "type": "base",
+     "schema": [{"name": "owner", "type": "relation", "options": {"collectionId": "col1"}}]},
+    {"id": "col3", "name": "app_posts", "type": "base",
+     "schema": [{"name": "author", "type": "relation", "options": {"collectionId": "col1"}}]},
+]
+PLAN = compile_plan(SCHEMA, "v1", "f1")
+
+
+@pytest.fixture
+def pool(app, fake_pocketbase):
+    pool = WarmPool()
+    pool.app = app
+    pool.size = 2
+    # Refills are driven by the tests instead of the background thread
+    with patch.object(pool, 'kick'), \
+            patch('app.services.tenant_service.warm_pool', pool), \
+            patch.object(TenantService, 'get_plan', return_value=PLAN):
+        yield pool
+
+
+def tenant_collections(fake, tenant_id):
+    return [c for c in fake.collections.values() if c["name"].startswith(f"vms_{tenant_id}_")]
+
+
+class TestWarmPool:
+    def test_refill_builds_spares(self, pool, fake_pocketbase):
+        """Test that a refill provisions spare collection sets without tenant records."""
+        assert pool.refill() == {"built": 2, "failed": 0, "deleted": 0}
+
+        spares = WarmSpare.query.all()
+        assert {spare.status for spare in spares} == {WarmSpare.READY}
+        for spare in spares:
+            assert len(tenant_collections(fake_pocketbase, spare.tenant_id)) == 3
+            assert set(spare.collections) == {"col1", "col2", "col3"}
+        assert fake_pocketbase.tenants == []
+        # Spares are not orphans
+        assert OrphanSweeper(app=pool.app).find_orphans() == {}
+
+        assert pool.refill() == {"built": 0, "failed": 0, "deleted": 0}
+
+    def test_onboarding_claims_a_spare(self, pool, fake_pocketbase):
+        """Test that a claimed spare is bound with a single tenant record call."""
+        pool.refill()
+        fake_pocketbase.requests.clear()
+        events = []
+
+        result = TenantService().create_tenant_configuration("Acme", progress=events.append)
+
+        assert result["strategy"] == "warm_pool"
+        assert result["collections_created"] == 3
+        assert fake_pocketbase.requests == [("POST", "/api/collections/vms_tenants/records")]
+        assert fake_pocketbase.tenants[0]["tenant_id"] == result["tenant_id"]
+        assert len(tenant_collections(fake_pocketbase, result["tenant_id"])) == 3
+        assert events[0]["warm"] is True
+        assert WarmSpare.query.count() == 1
+        assert TenantService().get_tenant_configuration(result["tenant_id"]) is not None
+
+    def test_each_spare_is_claimed_once(self, pool, fake_pocketbase):
+        """Test that a spare cannot be claimed twice and an empty pool falls back to provisioning."""
+        pool.size = 1
+        pool.refill()
+
+        assert pool.claim(PLAN) is not None
+        assert pool.claim(PLAN) is None
+
+        result = TenantService(concurrency=1).create_tenant_configuration("Acme")
+        assert result["strategy"] == "import"
+
+    def test_outdated_spares_are_replaced(self, pool, fake_pocketbase):
+        """Test that spares of another schema version are deleted and rebuilt."""
+        pool.refill()
+        old = {spare.tenant_id for spare in WarmSpare.query}
+
+        with patch.object(TenantService, 'get_plan', return_value=compile_plan(SCHEMA, "v2", "f2")):
+            counts = pool.refill()
+            assert pool.claim(PLAN) is None
+
+        assert counts == {"built": 2, "failed": 0, "deleted": 2}
+        assert {spare.plan_fingerprint for spare in WarmSpare.query} == {"f2"}
+        for tenant_id in old:
+            assert tenant_collections(fake_pocketbase, tenant_id) == []
+
+    def test_taken_tenant_id_discards_spare(self, pool, fake_pocketbase):
+        """Test that a spare whose tenant_id got taken is discarded, not bound."""
+        pool.size = 1
+        pool.refill()
+        spare = WarmSpare.query.one()
+        fake_pocketbase.tenants.append({"id": "rec1", "name": "Other", "tenant_id": spare.tenant_id})
+
+        result = TenantService(concurrency=1).create_tenant_configuration("Acme")
+
+        assert result["strategy"] != "warm_pool"
+        assert WarmSpare.query.filter_by(status=WarmSpare.DISCARDED).count() == 1
+
+    def test_unclaimed_spare_cannot_be_deleted_as_a_tenant(self, pool, fake_pocketbase, client):
+        """Test that deleting a ready spare's tenant_id is refused and leaves the spare usable."""
+        pool.refill()
+        spare = WarmSpare.query.first()
+
+        response = client.delete(f'/api/v1/tenants/{spare.tenant_id}')
+        assert response.status_code == 409
+        with pytest.raises(SpareNotClaimedError):
+            TenantService().delete_tenant_configuration(spare.tenant_id)
+        results = list(OrphanSweeper(app=pool.app).sweep([spare.tenant_id]))
+        assert [result["status"] for result in results] == ["skipped"]
+
+        assert len(tenant_collections(fake_pocketbase, spare.tenant_id)) == 3
+        assert TenantService().create_tenant_configuration("Acme")["strategy"] == "warm_pool"
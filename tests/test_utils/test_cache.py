@@ -0,0 +1,32 @@
+import time
+import pytest
+from app.utils.cache import TTLCache
+
+
+class TestTTLCache:
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_entries_expire(self):
+        """Test that entries older than the TTL are misses."""
+        cache = TTLCache(maxsize=10, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+        assert cache.stats()["misses"] == 1
+
+    def test_invalidate(self):
+        """Test explicit invalidation."""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+        cache.invalidate("a")
+        assert cache.get("a") is None
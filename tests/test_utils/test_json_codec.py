@@ -0,0 +1,39 @@
+import json
+import pytest
+from unittest.mock import patch
+from app.utils import json_codec
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request):
+    """Run against orjson when it is installed and always against the stdlib fallback."""
+    if request.param == "orjson":
+        if json_codec.orjson is None:
+            pytest.skip("orjson is not installed")
+        yield request.param
+    else:
+        with patch.object(json_codec, 'orjson', None):
+            yield request.param
+
+
+class TestJsonCodec:
+    def test_dumps_is_compact_utf8(self, backend):
+        """Test that both backends produce the same compact UTF-8 bytes."""
+        value = {"name": "vms_ab12_users", "rule": "@request.auth.id != ''",
+                 "label": "Zürich", "schema": [{"n": 1, "b": True, "x": None}]}
+        assert json_codec.dumps(value) == json.dumps(
+            value, separators=(',', ':'), ensure_ascii=False).encode()
+        assert json_codec.loads(json_codec.dumps(value)) == value
+
+    def test_escape_string(self, backend):
+        """Test that strings needing escapes are escaped and plain ones are passed through."""
+        assert json_codec.escape_string("abc123_x") == b"abc123_x"
+        assert json.loads(b'"' + json_codec.escape_string('a"b\\c\n') + b'"') == 'a"b\\c\n'
+
+    def test_object_id(self, backend):
+        """Test that a leading id is read without parsing and other layouts fall back to a parse."""
+        assert json_codec.object_id(b'{"id":"abc123","schema":[{"id":"f1"}') == "abc123"
+        assert json_codec.object_id(b' { "id" : "abc123" }') == "abc123"
+        assert json_codec.object_id(b'{"schema":[{"id":"f1"}],"id":"abc123"}') == "abc123"
+        assert json_codec.object_id(b'{"name":"x"}') is None
+        assert json_codec.object_id(b'[]') is None
@@ -0,0 +1,76 @@
+import json
+import logging
+import queue
+import pytest
+from app.utils.log import DroppingQueueHandler, JsonFormatter, LogPipeline, SamplingFilter
+
+
+def make_record(level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.makeLogRecord({"name": "app.test", "levelno": level,
+                                    "levelname": logging.getLevelName(level),
+                                    "msg": msg, "args": args})
+    record.__dict__.update(extra)
+    return record
+
+
+class TestJsonFormatter:
+    def test_includes_extra_fields(self):
+        """Test that extra fields become top-level JSON keys."""
+        line = JsonFormatter().format(make_record(tenant_id="abc", duration_ms=12.5, sample=True))
+        entry = json.loads(line)
+        assert entry["message"] == "hello world"
+        assert entry["level"] == "INFO"
+        assert entry["logger"] == "app.test"
+        assert entry["tenant_id"] == "abc"
+        assert entry["duration_ms"] == 12.5
+        assert "sample" not in entry
+
+
+class TestSamplingFilter:
+    def test_only_sampled_records_are_thinned(self):
+        """Test that a zero rate drops sampled records but keeps the others."""
+        sampler = SamplingFilter({logging.INFO: 0.0})
+        assert not sampler.filter(make_record(sample=True))
+        assert sampler.filter(make_record())
+        assert sampler.filter(make_record(level=logging.ERROR, sample=True))
+
+
+class TestDroppingQueueHandler:
+    def test_drops_when_full(self):
+        """Test that a full queue drops records instead of blocking."""
+        handler = DroppingQueueHandler(queue.Queue(1))
+        handler.handle(make_record())
+        handler.handle(make_record())
+        assert handler.queue.qsize() == 1
+        assert handler.dropped == 1
+
+
+class TestLogPipeline:
+    @pytest.fixture
+    def pipeline(self):
+        pipeline = LogPipeline("app.test_pipeline")
+        yield pipeline
+        pipeline.stop()
+
+    def test_round_trip(self, pipeline, capsys):
+        """Test that records logged on the caller's thread are written by the listener."""
+        pipeline.configure({"LOG_LEVEL": "DEBUG", "LOG_FORMAT": "json", "LOG_SAMPLE_INFO": 0.0})
+        logger = logging.getLogger("app.test_pipeline.child")
+        logger.info("Created collection %s", "users", extra={"tenant_id": "t1"})
+        logger.info("Sampled away", extra={"sample": True})
+        pipeline.stop()
+
+        lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert len(lines) == 1
+        assert lines[0]["message"] == "Created collection users"
+        assert lines[0]["tenant_id"] == "t1"
+
+    def test_reconfigure_replaces_handler(self, pipeline, capsys):
+        """Test that configuring twice leaves a single handler in place."""
+        pipeline.configure({"LOG_FORMAT": "text"})
+        pipeline.configure({"LOG_FORMAT": "text"})
+        handlers = [h for h in pipeline.logger.handlers if isinstance(h, DroppingQueueHandler)]
+        assert handlers == [pipeline.handler]
+        pipeline.logger.warning("Retrying", extra={"operation": "read"})
+        pipeline.stop()
+        assert "operation=read" in capsys.readouterr().out
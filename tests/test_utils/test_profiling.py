@@ -0,0 +1,100 @@
+import contextvars
+import os
+import threading
+import time
+from unittest.mock import patch
+import pytest
+from app import create_app
+from app.extensions import db
+from app.schemas.provisioning_plan import compile_plan
+from app.services.tenant_service import TenantService
+from app.utils.profiling import NetworkClock, _network_clock, network_wait, profiler
+from tests.conftest import TestConfig
+
+SCHEMA = [
+    {"id": "col1", "name": "app_users", "type": "base",
+     "schema": [{"name": "email", "type": "email"}]},
+    {"id": "col2", "name": "app_posts", "type": "base",
+     "schema": [{"name": "author", "type": "relation", "options": {"collectionId": "col1"}}]},
+]
+
+
+class TestNetworkClock:
+    def test_overlapping_calls_count_once(self):
+        """Test that concurrent calls add their union to the wait time, not their sum."""
+        clock = NetworkClock()
+        token = _network_clock.set(clock)
+        try:
+            def call():
+                with network_wait():
+                    time.sleep(0.05)
+            # Like tasks on the asyncio loop, each thread runs in a copy of the request's context
+            threads = [threading.Thread(target=contextvars.copy_context().run, args=(call,))
+                       for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            _network_clock.reset(token)
+
+        assert clock.calls == 4
+        assert clock.busy >= 0.2
+        assert 0.05 <= clock.waiting < clock.busy
+
+    def test_no_op_without_profile(self):
+        """Test that unprofiled calls are not tracked."""
+        with network_wait():
+            pass
+        assert _network_clock.get() is None
+
+
+class TestRequestProfiler:
+    @pytest.fixture
+    def profiled_client(self, tmp_path, fake_pocketbase):
+        class ProfilingConfig(TestConfig):
+            PROFILING_ENABLED = True
+            PROFILING_TOKEN = "let-me-profile"
+            PROFILING_DIR = str(tmp_path)
+            PROFILING_KEEP = 2
+
+        app = create_app(ProfilingConfig)
+        plan = compile_plan(SCHEMA, fingerprint="f1")
+        with app.app_context(), patch.object(TenantService, 'get_plan', return_value=plan):
+            db.create_all()
+            yield app.test_client()
+            db.session.remove()
+            db.drop_all()
+
+    def test_profiles_requests_with_token(self, profiled_client, tmp_path):
+        """Test that a request with the profiling token is profiled and summarized."""
+        response = profiled_client.post('/api/v1/tenants?sync=true', json={'name': 'Acme'},
+                                        headers={'X-Profile-Token': 'let-me-profile'})
+        assert response.status_code == 201
+        profile_id = response.headers['X-Profile-Id']
+
+        summary = profiled_client.get(f'/api/v1/admin/profiles/{profile_id}').json
+        assert summary["status"] == 201
+        assert summary["network_calls"] >= 2
+        assert 0 < summary["network_wait_ms"] <= summary["wall_ms"]
+        assert summary["frames"]
+        assert os.path.exists(summary["file"])
+
+        listing = profiled_client.get('/api/v1/admin/profiles').json
+        assert [p["id"] for p in listing["profiles"]] == [profile_id]
+        assert listing["top_frames"]
+
+    def test_skips_requests_without_token(self, profiled_client):
+        """Test that other requests are left alone."""
+        response = profiled_client.post('/api/v1/tenants?sync=true', json={'name': 'Acme'},
+                                        headers={'X-Profile-Token': 'wrong'})
+        assert 'X-Profile-Id' not in response.headers
+        assert profiler.summaries() == []
+
+    def test_keeps_newest_files(self, profiled_client, tmp_path):
+        """Test that only PROFILING_KEEP profile files are kept."""
+        for n in range(3):
+            profiled_client.get(f'/api/v1/tenants/missing{n}',
+                                headers={'X-Profile-Token': 'let-me-profile'})
+        assert len([name for name in os.listdir(tmp_path) if name.endswith('.prof')]) == 2
+        assert len(profiler.summaries()) == 2